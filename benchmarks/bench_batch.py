@@ -0,0 +1,89 @@
+"""
+Throughput of the batch endpoints vs. the single-record endpoints.
+
+Runs entirely in-process through the Flask test client, so it measures
+request handling + model inference without network noise. Every run
+posts the same records, so the prediction caches are cleared before each
+one: otherwise the batch runs would mostly be cache hits from the
+single-record run.
+
+Usage (from the project root, models must exist in models/):
+    python benchmarks/bench_batch.py --records 2000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+import prediction_cache  # noqa: E402
+from app_flask import app  # noqa: E402
+
+
+def make_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "month": int(rng.integers(1, 13)),
+            "lag1": float(rng.uniform(0, 300)),
+            "lag2": float(rng.uniform(0, 300)),
+            "lag3": float(rng.uniform(0, 300)),
+            "N": float(rng.uniform(0, 140)),
+            "P": float(rng.uniform(5, 145)),
+            "K": float(rng.uniform(5, 200)),
+            "temperature": float(rng.uniform(8, 44)),
+            "humidity": float(rng.uniform(14, 100)),
+            "pH": float(rng.uniform(3.5, 9.9)),
+        }
+        for _ in range(n)
+    ]
+
+
+def clear_prediction_cache():
+    prediction_cache.crop_cache.clear()
+    prediction_cache.rain_cache.clear()
+
+
+def run(client, path, records, batch_size):
+    clear_prediction_cache()
+    start = time.perf_counter()
+    if batch_size <= 1:
+        for rec in records:
+            res = client.post(path, json=rec)
+            assert res.status_code == 200, res.get_data(as_text=True)
+    else:
+        for i in range(0, len(records), batch_size):
+            res = client.post(f"{path}/batch", json=records[i:i + batch_size])
+            assert res.status_code == 200, res.get_data(as_text=True)
+    elapsed = time.perf_counter() - start
+    return len(records) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    client = app.test_client()
+
+    report = {}
+    rain_records = [{k: rec[k] for k in ("month", "lag1", "lag2", "lag3")} for rec in records]
+    for path, path_records in (("/api/recommend-crop", records), ("/api/predict-rainfall", rain_records)):
+        report[path] = {}
+        for bs in args.batch_sizes:
+            rps = run(client, path, path_records, bs)
+            report[path][f"batch_{bs}"] = round(rps, 1)
+            print(f"{path:<24} batch={bs:<6} {rps:>10.1f} records/s")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
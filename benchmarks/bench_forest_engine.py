@@ -0,0 +1,94 @@
+"""
+Check FlatForest against scikit-learn and benchmark both engines.
+
+1. Exactness: predict_proba / predict of the flat engine must equal
+   sklearn's output bit-for-bit on the full training CSVs.
+2. Latency: mean wall time per call at batch sizes 1, 100 and 100k.
+
+Usage (from the project root, models must exist in models/):
+    python benchmarks/bench_forest_engine.py
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+import project_config as cfg  # noqa: E402
+from forest_engine import FlatForest  # noqa: E402
+from rain_features import prepare_rain_data  # noqa: E402
+
+
+def resample(X, n, seed=0):
+    """n rows drawn from X with small noise, so batches aren't just repeats."""
+    rng = np.random.default_rng(seed)
+    rows = X[rng.integers(0, len(X), n)]
+    return rows * rng.uniform(0.9, 1.1, rows.shape)
+
+
+def time_call(fn, X, min_seconds=0.5):
+    fn(X)  # warm-up
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 100_000])
+    args = parser.parse_args()
+
+    X_crop = pd.read_csv(cfg.CROP_CSV)[cfg.CROP_FEATURE_COLS].to_numpy(dtype=float)
+    X_rain = prepare_rain_data()[0].to_numpy(dtype=float)
+
+    report = {}
+    for name, path, X, method in (
+        ("crop", cfg.CROP_MODEL_PATH, X_crop, "predict_proba"),
+        ("rainfall", cfg.RAINFALL_MODEL_PATH, X_rain, "predict"),
+    ):
+        sk_model = joblib.load(path)
+        start = time.perf_counter()
+        flat = FlatForest.from_sklearn(sk_model)
+        compile_s = time.perf_counter() - start
+
+        exact = bool(
+            np.array_equal(getattr(flat, method)(X), getattr(sk_model, method)(X))
+            and np.array_equal(flat.predict(X), sk_model.predict(X))
+        )
+        entry = {
+            "n_trees": flat.n_trees,
+            "n_nodes": flat.n_nodes,
+            "compile_seconds": round(compile_s, 4),
+            "exact_on_training_csv": exact,
+            "rows_checked": len(X),
+            "latency_ms": {},
+        }
+        for bs in args.batch_sizes:
+            Xb = resample(X, bs)
+            sk_s = time_call(getattr(sk_model, method), Xb)
+            flat_s = time_call(getattr(flat, method), Xb)
+            entry["latency_ms"][f"batch_{bs}"] = {
+                "sklearn": round(sk_s * 1000, 3),
+                "flat": round(flat_s * 1000, 3),
+                "speedup": round(sk_s / flat_s, 2),
+            }
+        report[name] = entry
+
+    print(json.dumps(report, indent=2))
+    if not all(e["exact_on_training_csv"] for e in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-request latency of the crop inference path.
+
+Compares the old handler logic (predict + predict_proba + full argsort,
+i.e. two forest passes) with inference.predict_crop (one predict_proba
+pass, argpartition top-k).
+
+Usage (from the project root, models must exist in models/):
+    python benchmarks/bench_inference.py --repeats 500
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+import project_config as cfg  # noqa: E402
+import inference  # noqa: E402
+
+
+def legacy_predict_crop(model, X):
+    pred_label = model.predict(X)[0]
+    proba = model.predict_proba(X)[0]
+    top_idx = np.argsort(proba)[::-1][:3]
+    return {
+        "crop": str(pred_label),
+        "confidence": float(max(proba)),
+        "top3": [str(model.classes_[i]) for i in top_idx],
+        "top3_probs": [float(proba[i]) for i in top_idx],
+    }
+
+
+def time_calls(fn, model, rows):
+    samples = []
+    for X in rows:
+        start = time.perf_counter()
+        fn(model, X)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95)], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+
+    model = joblib.load(cfg.CROP_MODEL_PATH)
+    rng = np.random.default_rng(0)
+    lo = np.array([0, 5, 5, 8, 14, 3.5, 20])
+    hi = np.array([140, 145, 205, 44, 100, 9.9, 300])
+    rows = [rng.uniform(lo, hi).reshape(1, -1) for _ in range(args.repeats)]
+
+    # warm-up
+    legacy_predict_crop(model, rows[0])
+    inference.predict_crop(model, rows[0])
+
+    report = {
+        "legacy_predict_plus_proba": time_calls(legacy_predict_crop, model, rows),
+        "inference_predict_crop": time_calls(inference.predict_crop, model, rows),
+    }
+    report["speedup_p50"] = round(
+        report["legacy_predict_plus_proba"]["p50_ms"] / report["inference_predict_crop"]["p50_ms"], 2
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Request latency with prediction logging off, synchronous and asynchronous.
+
+- off:   prediction_log replaced by a no-op writer
+- sync:  the previous behaviour, logger.info(... inputs=%s | output=%s ...)
+         on a RotatingFileHandler in the request thread
+- async: prediction_log.PredictionLogWriter (queue + background writer)
+
+Requests reuse a small pool of payloads so they are served from the
+prediction cache and the logging cost is not hidden behind model time.
+
+Usage (from the project root, models must exist in models/):
+    python benchmarks/bench_logging.py --requests 5000 --threads 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+import prediction_log  # noqa: E402
+from app_flask import app  # noqa: E402
+
+
+class NullWriter:
+    def log(self, *args, **kwargs):
+        pass
+
+
+class SyncLoggerWriter:
+    """The old handler-side logging call, for comparison."""
+
+    def __init__(self, path):
+        handler = RotatingFileHandler(path, maxBytes=1_000_000, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+        self.logger = logging.getLogger("bench.sync_predictions")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+
+    def log(self, kind, inputs=None, output=None, error=None):
+        self.logger.info("%s_PREDICTION | inputs=%s | output=%s", kind.upper(), inputs, output)
+
+
+def make_payloads(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"month": int(rng.integers(1, 13)), "lag1": float(rng.uniform(0, 300)),
+         "lag2": float(rng.uniform(0, 300)), "lag3": float(rng.uniform(0, 300)),
+         "N": float(rng.uniform(0, 140)), "P": float(rng.uniform(5, 145)),
+         "K": float(rng.uniform(5, 200)), "temperature": float(rng.uniform(8, 44)),
+         "humidity": float(rng.uniform(14, 100)), "pH": float(rng.uniform(3.5, 9.9))}
+        for _ in range(n)
+    ]
+
+
+def run(n_requests, n_threads, payloads):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(count):
+        client = app.test_client()
+        local = []
+        for i in range(count):
+            start = time.perf_counter()
+            res = client.post("/api/recommend-crop", json=payloads[i % len(payloads)])
+            local.append(time.perf_counter() - start)
+            assert res.status_code == 200
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n_requests // n_threads,))
+               for _ in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests_per_s": round(len(ms) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    payloads = make_payloads(50)
+    tmp_dir = tempfile.mkdtemp(prefix="bench_logging_")
+    client = app.test_client()
+    for p in payloads:  # warm models + prediction cache
+        client.post("/api/recommend-crop", json=p)
+
+    modes = {
+        "off": NullWriter(),
+        "sync": SyncLoggerWriter(os.path.join(tmp_dir, "predictions.log")),
+        "async": prediction_log.PredictionLogWriter(os.path.join(tmp_dir, "predictions.jsonl")),
+    }
+    report = {}
+    for name, writer in modes.items():
+        prediction_log.set_writer(writer)
+        report[name] = run(args.requests, args.threads, payloads)
+    modes["async"].close()
+    report["async_writer_stats"] = modes["async"].stats()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Per-request cost of the metrics instrumentation.
+
+Replays the instrumentation a /api/recommend-crop request performs
+(start_request, one mark() per stage, finish_request, plus the amortized
+bulk flush into the histograms) and compares it with the same number of
+empty Python function calls, which is the floor on this interpreter.
+
+Usage (from the project root):
+    python benchmarks/bench_metrics.py --requests 200000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+import metrics  # noqa: E402
+
+STAGES = ("parse", "model", "validate", "features", "cache", "predict", "topk", "postprocess", "log")
+
+
+def instrumented(n):
+    start = time.perf_counter()
+    for _ in range(n):
+        metrics.start_request("recommend_crop")
+        for stage in STAGES:
+            metrics.mark(stage)
+        metrics.finish_request(200)
+    metrics.flush()
+    return time.perf_counter() - start
+
+
+def noop_calls(n):
+    def noop(arg):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(n):
+        noop("recommend_crop")
+        for stage in STAGES:
+            noop(stage)
+        noop(200)
+    return time.perf_counter() - start
+
+
+def timed_render():
+    start = time.perf_counter()
+    metrics.render()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    best = min(instrumented(args.requests) for _ in range(args.repeat))
+    floor = min(noop_calls(args.requests) for _ in range(args.repeat))
+    print(json.dumps({
+        "requests": args.requests,
+        "marks_per_request": len(STAGES),
+        "us_per_request": round(best / args.requests * 1e6, 3),
+        "noop_calls_us_per_request": round(floor / args.requests * 1e6, 3),
+        "overhead_over_noop_us": round((best - floor) / args.requests * 1e6, 3),
+        "scrape_ms": round(timed_render() * 1e3, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Reproducible end-to-end benchmark of the prediction API.
+
+Runs offline on synthetic inputs drawn (with a fixed seed) from the field
+ranges of frontend/src/routes/CropForm.schema.js, with the open-ended
+fields bounded by the Streamlit presets (get_sample_scenarios()), and
+measures three layers:
+
+- inprocess: ml_service.recommend_crop / predict_rainfall called directly
+- flask:     /api/recommend-crop and /api/predict-rainfall via the Flask test client
+- gunicorn:  the same endpoints over HTTP, served by `gunicorn -c gunicorn.conf.py`,
+             with --concurrency client threads
+- asgi:      the same HTTP load against `uvicorn app_asgi:app` (micro-batching)
+
+Every result row has throughput, p50/p95/p99 latency and RSS. The report
+is JSON (with the git commit) so runs can be diffed between commits.
+
+Usage (from the project root, models must exist in models/):
+    python benchmarks/bench_suite.py --output bench-main.json
+    python benchmarks/bench_suite.py --targets inprocess,flask --compare bench-main.json
+
+Shadow scoring cost (model_versions): --shadow serves the same endpoints
+with a copy of the production crop model configured as a shadow version
+(SHADOW_SAMPLE_RATE etc. are read from the environment as usual), so
+
+    python benchmarks/bench_suite.py --targets flask,gunicorn --output shadow-off.json
+    python benchmarks/bench_suite.py --targets flask,gunicorn --shadow --compare shadow-off.json
+
+reports what the shadow threads cost the request path.
+
+Every target/endpoint starts with an empty prediction cache, and the
+measured inputs never repeat the warm-up ones, so with the default seed the
+numbers are model time rather than cache hits.
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_DIR / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+# -------------------------------------------------
+# Synthetic workload
+# -------------------------------------------------
+# CropForm.schema.js bounds; fields that are only nonnegative() there are
+# capped at 1.5x the largest value used by get_sample_scenarios().
+FIELD_RANGES = {
+    "month": (1, 12),
+    "lag1": (0.0, 390.0),
+    "lag2": (0.0, 345.0),
+    "lag3": (0.0, 315.0),
+    "N": (0.0, 150.0),
+    "P": (0.0, 82.5),
+    "K": (0.0, 90.0),
+    "temperature": (-10.0, 60.0),
+    "humidity": (0.0, 100.0),
+    "pH": (0.0, 14.0),
+}
+RAIN_FIELDS = ["month", "lag1", "lag2", "lag3"]
+
+
+def synthetic_payloads(n, seed=0):
+    """n crop-form payloads (dicts with every CropForm field), reproducible for a seed."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for field, (low, high) in FIELD_RANGES.items():
+        if field == "month":
+            columns[field] = rng.integers(low, high + 1, size=n).tolist()
+        else:
+            columns[field] = np.round(rng.uniform(low, high, size=n), 2).tolist()
+    return [{field: columns[field][i] for field in FIELD_RANGES} for i in range(n)]
+
+
+def rain_payload(payload):
+    return {field: payload[field] for field in RAIN_FIELDS}
+
+
+def enable_shadow_copy():
+    """
+    Point model_versions at a versions file with one shadow version: a copy of
+    the production crop model, so every comparison agrees and only the cost
+    shows. Must run before app_flask is imported or a server is started.
+    """
+    import project_config as cfg
+
+    fd, path = tempfile.mkstemp(prefix="bench-crop-versions-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"versions": {"shadow-copy": cfg.CROP_MODEL_PATH}, "shadow": ["shadow-copy"]}, f)
+    os.environ["CROP_VERSIONS_PATH"] = path
+    return path
+
+
+def clear_prediction_cache():
+    import prediction_cache
+
+    prediction_cache.crop_cache.clear()
+    prediction_cache.rain_cache.clear()
+
+
+# -------------------------------------------------
+# Measurement helpers
+# -------------------------------------------------
+def rss_mb(pid="self"):
+    """Resident set size from /proc (Linux); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def summarize(latencies, wall_seconds):
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(ms),
+        "throughput_rps": round(len(ms) / wall_seconds, 1),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def run_sequential(call, payloads):
+    latencies = []
+    start = time.perf_counter()
+    for payload in payloads:
+        t0 = time.perf_counter()
+        call(payload)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_concurrent(call, payloads, concurrency):
+    """Split payloads over `concurrency` threads that each send requests back to back."""
+    chunks = [payloads[i::concurrency] for i in range(concurrency)]
+    latencies = [[] for _ in chunks]
+    errors = []
+
+    def worker(i):
+        try:
+            for payload in chunks[i]:
+                t0 = time.perf_counter()
+                call(payload)
+                latencies[i].append(time.perf_counter() - t0)
+        except Exception as e:  # surfaced in the report instead of hanging the run
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"{len(errors)} client thread(s) failed, first: {errors[0]}")
+    return summarize([x for chunk in latencies for x in chunk], wall)
+
+
+# -------------------------------------------------
+# Targets
+# -------------------------------------------------
+def bench_inprocess(payloads, warmup):
+    import ml_service
+
+    def crop(p):
+        ml_service.recommend_crop(p["N"], p["P"], p["K"], p["temperature"], p["humidity"],
+                                  p["pH"], (p["lag1"] + p["lag2"] + p["lag3"]) / 3.0)
+
+    def rain(p):
+        ml_service.predict_rainfall(p["month"], p["lag1"], p["lag2"], p["lag3"])
+
+    results = []
+    for name, call in (("recommend_crop", crop), ("predict_rainfall", rain)):
+        for p in payloads[:warmup]:
+            call(p)
+        clear_prediction_cache()
+        results.append({"target": "inprocess", "endpoint": f"ml_service.{name}", "concurrency": 1,
+                        **run_sequential(call, payloads[warmup:]), "rss_mb": rss_mb()})
+    return results
+
+
+def bench_flask(payloads, warmup):
+    import prediction_log
+    from app_flask import app
+
+    client = app.test_client()
+
+    def post(path, body):
+        res = client.post(path, json=body)
+        if res.status_code != 200:
+            raise RuntimeError(f"{path} -> {res.status_code}: {res.get_data(as_text=True)}")
+
+    results = []
+    for path, make in (("/api/recommend-crop", dict), ("/api/predict-rainfall", rain_payload)):
+        call = lambda p, path=path, make=make: post(path, make(p))  # noqa: E731
+        for p in payloads[:warmup]:
+            call(p)
+        clear_prediction_cache()
+        results.append({"target": "flask", "endpoint": path, "concurrency": 1,
+                        **run_sequential(call, payloads[warmup:]), "rss_mb": rss_mb()})
+    prediction_log.get_writer().close()
+    return results
+
+
+def _server_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(p) for p in f.read().split()]
+    except OSError:
+        return None, None
+    workers = [rss_mb(p) for p in children]
+    master = rss_mb(pid)
+    if master is None or None in workers:
+        return None, None
+    return round(master + sum(workers), 1), workers
+
+
+SERVERS = {
+    "gunicorn": ["-m", "gunicorn", "-c", "gunicorn.conf.py", "app_flask:app"],
+    "asgi": ["-m", "uvicorn", "app_asgi:app", "--no-access-log"],
+}
+
+
+def bench_server(target, payloads, warmup, concurrency, workers, port):
+    """Serve the API with gunicorn (Flask) or uvicorn (app_asgi) and load it over HTTP."""
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}")
+    cmd = [sys.executable, *SERVERS[target]]
+    if target == "asgi":
+        cmd += ["--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    proc = subprocess.Popen(cmd, cwd=SRC_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+
+    def post(path, body):
+        req = urllib.request.Request(
+            base + path, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req, timeout=30) as res:
+            res.read()
+
+    results = []
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f"{base}/health", timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline or proc.poll() is not None:
+                    raise RuntimeError(f"{target} server did not come up")
+                time.sleep(0.2)
+
+        for path, make in (("/api/recommend-crop", dict), ("/api/predict-rainfall", rain_payload)):
+            call = lambda p, path=path, make=make: post(path, make(p))  # noqa: E731
+            run_concurrent(call, payloads[:warmup], concurrency)
+            summary = run_concurrent(call, payloads[warmup:], concurrency)
+            total_rss, worker_rss = _server_rss_mb(proc.pid)
+            results.append({"target": target, "endpoint": path, "concurrency": concurrency,
+                            "workers": workers, **summary,
+                            "rss_mb": total_rss, "worker_rss_mb": worker_rss})
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    return results
+
+
+# -------------------------------------------------
+# Report
+# -------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    """Per-row ratios against an earlier report (> 1 means slower / bigger now)."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["target"], r["endpoint"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = old.get((r["target"], r["endpoint"]))
+        if b is None:
+            continue
+        row = {"target": r["target"], "endpoint": r["endpoint"]}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rss_mb"):
+            if r.get(key) and b.get(key):
+                row[key] = round(r[key] / b[key], 3)
+        if r.get("throughput_rps") and b.get("throughput_rps"):
+            row["throughput_rps"] = round(r["throughput_rps"] / b["throughput_rps"], 3)
+        rows.append(row)
+    return {"baseline_commit": baseline["meta"].get("commit"), "ratios": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", default="inprocess,flask,gunicorn",
+                        help="comma-separated subset of inprocess,flask,gunicorn,asgi")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads (gunicorn, asgi)")
+    parser.add_argument("--workers", type=int, default=4, help="server worker processes")
+    parser.add_argument("--port", type=int, default=5079)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--compare", help="earlier report to compute ratios against")
+    parser.add_argument("--shadow", action="store_true",
+                        help="serve with a copy of the crop model as a shadow version")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - {"inprocess", "flask", "gunicorn", "asgi"}
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    payloads = synthetic_payloads(args.warmup + args.requests, args.seed)
+    shadow_config = enable_shadow_copy() if args.shadow else None
+
+    results = []
+    # Server runs go first so their RSS is not affected by this process.
+    for target in ("gunicorn", "asgi"):
+        if target in targets:
+            results += bench_server(target, payloads, args.warmup, args.concurrency,
+                                    args.workers, args.port)
+    if "inprocess" in targets:
+        results += bench_inprocess(payloads, args.warmup)
+    if "flask" in targets:
+        results += bench_flask(payloads, args.warmup)
+    if shadow_config:
+        os.remove(shadow_config)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "prediction_cache_size": os.environ.get("PREDICTION_CACHE_SIZE", "default"),
+            "shadow_sample_rate": (os.environ.get("SHADOW_SAMPLE_RATE", "default")
+                                   if args.shadow else None),
+        },
+        "results": results,
+    }
+    if args.compare:
+        report["compare"] = compare(report, args.compare)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
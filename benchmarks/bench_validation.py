@@ -0,0 +1,104 @@
+"""
+Parse + validate cost of a /api/recommend-crop payload.
+
+Compares the old handler logic (ten safe_float calls, then np.array of the
+7 features) with request_schema.parse_crop (one generated validation pass
+that builds the row), for valid and malformed payloads. The old chain
+accepted malformed payloads with defaults substituted and went on to score them;
+the schema rejects them before any model work, so --with-model also
+reports what a malformed request cost end to end before (parse + one
+uncached predict_proba) and after (parse + rejection).
+
+Usage (from the project root):
+    python benchmarks/bench_validation.py --repeats 100000 [--with-model]
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+import request_schema  # noqa: E402
+
+VALID = {"month": 11, "lag1": 60, "lag2": 55, "lag3": 50, "N": 60, "P": 40,
+         "K": 50, "temperature": 23, "humidity": 55, "pH": 6.2}
+MALFORMED = {**VALID, "N": "sixty", "pH": None, "humidity": "55"}
+
+
+def safe_float(d, key, default=0.0):
+    """Get float from dict safely."""
+    try:
+        return float(d.get(key, default))
+    except Exception:
+        return float(default)
+
+
+def legacy_parse_crop(data):
+    month = safe_float(data, "month", 1)  # noqa: F841 - read but unused, as before
+    lag1 = safe_float(data, "lag1", 0)
+    lag2 = safe_float(data, "lag2", 0)
+    lag3 = safe_float(data, "lag3", 0)
+    N = safe_float(data, "N", 0)
+    P = safe_float(data, "P", 0)
+    K = safe_float(data, "K", 0)
+    temperature = safe_float(data, "temperature", 0)
+    humidity = safe_float(data, "humidity", 0)
+    pH = safe_float(data, "pH", 7)
+    avg_rainfall = (lag1 + lag2 + lag3) / 3.0
+    return np.array([[N, P, K, temperature, humidity, pH, avg_rainfall]], dtype=float)
+
+
+def schema_parse_crop(data):
+    try:
+        return request_schema.parse_crop(data)
+    except request_schema.RequestValidationError as e:
+        return e
+
+
+def per_call_us(fn, payload, repeats):
+    best = min(timeit.repeat(lambda: fn(payload), number=repeats, repeat=5))
+    return round(best / repeats * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=100_000)
+    parser.add_argument("--with-model", action="store_true",
+                        help="also time malformed requests end to end (needs models/)")
+    args = parser.parse_args()
+
+    # same features for a valid payload
+    assert np.array_equal(legacy_parse_crop(VALID), request_schema.parse_crop(VALID))
+
+    report = {}
+    for name, payload in (("valid", VALID), ("malformed", MALFORMED)):
+        legacy = per_call_us(legacy_parse_crop, payload, args.repeats)
+        schema = per_call_us(schema_parse_crop, payload, args.repeats)
+        report[name] = {
+            "safe_float_us": legacy,
+            "schema_us": schema,
+            "speedup": round(legacy / schema, 2),
+        }
+    report["malformed"]["schema_errors"] = schema_parse_crop(MALFORMED).errors
+
+    if args.with_model:
+        import inference
+        from model_registry import get_crop_model
+
+        model = get_crop_model()
+        legacy_request = lambda p: inference.predict_crop_batch(model, legacy_parse_crop(p))  # noqa: E731
+        legacy = min(timeit.repeat(lambda: legacy_request(MALFORMED), number=50, repeat=5)) / 50
+        report["malformed_request"] = {
+            "safe_float_and_predict_us": round(legacy * 1e6, 1),
+            "schema_reject_us": report["malformed"]["schema_us"],
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
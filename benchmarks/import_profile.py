@@ -0,0 +1,80 @@
+"""
+Import-time profile of the app entry points (`python -X importtime`).
+
+For each module, imports it in a fresh interpreter --repeat times (from
+src/, like the servers do) and reports the median total import time and
+the slowest direct imports of that module (cumulative, i.e. including
+everything they pull in). This is what a cold container start pays before
+it can answer /health/live.
+
+(app_streamlit is left out by default: importing it runs the whole page
+script in bare mode, so its number is a full render, not a cold import.)
+
+Usage (from the project root):
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py app_flask --repeat 7 --top 15
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_DIR / "src"
+
+
+def importtime(module):
+    """[(imported module, self us, cumulative us, depth)] in -X importtime order."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def direct_imports(rows, module):
+    """{name: cumulative us} of the imports done by module itself."""
+    # -X importtime lists a module after everything it imported; those are
+    # the rows since the previous top-level entry, one level deeper.
+    end = next(i for i, row in enumerate(rows) if row[0] == module)
+    start = end
+    while start > 0 and rows[start - 1][3] > rows[end][3]:
+        start -= 1
+    return {name: cum for name, _, cum, depth in rows[start:end] if depth == rows[end][3] + 1}
+
+
+def profile(module, repeat, top):
+    runs = [importtime(module) for _ in range(repeat)]
+    total = statistics.median(next(cum for name, _, cum, _ in run if name == module) for run in runs)
+    children = [direct_imports(run, module) for run in runs]
+    slowest = sorted(
+        ((name, statistics.median(c.get(name, 0) for c in children)) for name in children[0]),
+        key=lambda item: -item[1],
+    )[:top]
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["app_flask", "app_asgi"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps([profile(m, args.repeat, args.top) for m in args.modules], indent=2))
+
+
+if __name__ == "__main__":
+    main()
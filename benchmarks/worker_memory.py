@@ -0,0 +1,113 @@
+"""
+Per-worker memory of the gunicorn-served API, with and without preloading.
+
+Starts `gunicorn -c gunicorn.conf.py app_flask:app` twice (MODEL_PRELOAD=0
+and MODEL_PRELOAD=1), sends enough requests that every worker has used
+both models, then reads /proc/<pid>/smaps_rollup (Linux only) for each
+worker. RSS counts shared pages in every process; PSS splits them between
+the processes sharing them, so sum(PSS) is the real footprint.
+
+Usage (from the project root, models must exist in models/):
+    python benchmarks/worker_memory.py --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_DIR / "src"
+
+CROP_PAYLOAD = {"month": 7, "lag1": 200, "lag2": 150, "lag3": 100, "N": 90,
+                "P": 40, "K": 40, "temperature": 25, "humidity": 60, "pH": 6.5}
+RAIN_PAYLOAD = {"month": 7, "lag1": 200, "lag2": 150, "lag3": 100}
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f.readlines()[1:]:
+            key, value = line.split(":", 1)
+            fields[key] = int(value.split()[0])  # kB
+    return {
+        "rss_mb": round(fields["Rss"] / 1024, 1),
+        "pss_mb": round(fields["Pss"] / 1024, 1),
+        "private_mb": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def post(url, payload):
+    req = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=30) as res:
+        res.read()
+
+
+def wait_until_up(base, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base}/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def measure(preload, workers, port):
+    env = dict(os.environ, MODEL_PRELOAD="1" if preload else "0",
+               GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app_flask:app"],
+        cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(base)
+        # Requests are spread over workers by the kernel; send plenty so each one
+        # has touched both models.
+        for _ in range(workers * 20):
+            post(f"{base}/api/recommend-crop", CROP_PAYLOAD)
+            post(f"{base}/api/predict-rainfall", RAIN_PAYLOAD)
+        time.sleep(0.5)
+
+        per_worker = [smaps_rollup(pid) for pid in child_pids(proc.pid)]
+        return {
+            "master": smaps_rollup(proc.pid),
+            "workers": per_worker,
+            "total_pss_mb": round(
+                smaps_rollup(proc.pid)["pss_mb"] + sum(w["pss_mb"] for w in per_worker), 1
+            ),
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5077)
+    args = parser.parse_args()
+
+    report = {
+        "workers": args.workers,
+        "no_preload": measure(False, args.workers, args.port),
+        "preload": measure(True, args.workers, args.port + 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
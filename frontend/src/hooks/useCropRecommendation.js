@@ -1,9 +1,9 @@
 // src/hooks/useCropRecommendation.js
 import { useMutation } from "@tanstack/react-query";
-import { recommendCrop } from "../lib/cropApi";
+import { recommendCropPipeline } from "../lib/cropApi";
 
 export const useCropRecommendation = () => {
   return useMutation({
-    mutationFn: recommendCrop,
+    mutationFn: recommendCropPipeline,
   });
 };
@@ -4,3 +4,9 @@ export const recommendCrop = async (payload) => {
   const { data } = await api.post("/api/recommend-crop", payload);
   return data; // { crop, confidence?, top3?, top3_probs? }
 };
+
+// Rainfall predicted from month + lag1-3 feeds the crop model (one round trip).
+export const recommendCropPipeline = async (payload) => {
+  const { data } = await api.post("/api/pipeline", payload);
+  return data; // { rainfall, crop, confidence, top3, top3_probs }
+};
@@ -1,6 +1,6 @@
 import React, { useState } from "react";
 import { useMutation } from "@tanstack/react-query";
-import { recommendCrop } from "../lib/cropApi";
+import { recommendCropPipeline } from "../lib/cropApi";
 import { usePrediction } from "../context/PredictionContext";
 import { useTheme } from "../context/ThemeContext";
 import {
@@ -392,7 +392,8 @@ function CropForm() {
   const { setLastCrop, lastRain } = usePrediction();
 
   const { mutate, data, isPending, isError, error } = useMutation({
-    mutationFn: recommendCrop,
+    // Same chain as the Streamlit app: predicted rainfall feeds the crop model.
+    mutationFn: recommendCropPipeline,
     onSuccess: (result) => {
       setLastCrop({
         ...result,
@@ -448,18 +449,12 @@ function CropForm() {
     { name: "K", value: Number(formValues.K) || 0 },
   ];
 
-  const rainfallEst =
-    (Number(formValues.lag1) +
-      Number(formValues.lag2) +
-      Number(formValues.lag3)) /
-      3 || 0;
-
   const envData = [
     {
       name: "Environment",
       Temperature: Number(formValues.temperature) || 0,
       Humidity: Number(formValues.humidity) || 0,
-      Rainfall: Number(rainfallEst.toFixed(2)),
+      Rainfall: data ? Number(data.rainfall.toFixed(2)) : 0,
     },
   ];
 
@@ -737,6 +732,10 @@ function CropForm() {
                   {data.crop}
                 </p>
 
+                <p className={`text-sm font-semibold ${subText}`}>
+                  Predicted rainfall: {data.rainfall.toFixed(1)} mm
+                </p>
+
                 {data.confidence && (
                   <p className={`text-sm font-semibold ${subText}`}>
                     Confidence: {(data.confidence * 100).toFixed(1)}%
@@ -1084,7 +1083,7 @@ function CropForm() {
             className={`${cardClass} rounded-xl shadow-sm p-5 transition-all duration-300 hover:-translate-y-1 hover:shadow-xl hover:shadow-emerald-500/25`}
           >
             <h4 className={`text-sm font-bold mb-1 ${baseText}`}>
-              Environment: Temp · Humidity · Estimated Rainfall
+              Environment: Temp · Humidity · Predicted Rainfall
             </h4>
             <div className="h-44">
               <ResponsiveContainer width="100%" height="100%">
@@ -0,0 +1,319 @@
+"""
+ASGI serving mode with dynamic micro-batching.
+
+Same JSON contracts as app_flask for the two endpoints the frontend calls
+(POST /api/recommend-crop, POST /api/predict-rainfall) and the chained
+POST /api/pipeline, plus /, /health (= /health/live) and /health/ready.
+Instead of one forest traversal per request, concurrent requests are
+queued per model and coalesced into micro-batches: a batch is closed when
+it reaches MAX_BATCH_SIZE rows or MAX_WAIT_MS after its first row arrived,
+scored once in a worker thread (ml_service.*_batch, so the prediction
+cache still applies) and the results are fanned back out to the waiting
+requests.
+
+Run from src/ (any ASGI server works; uvicorn is in requirements.txt):
+    uvicorn app_asgi:app --host 127.0.0.1 --port 5000 --workers 2
+
+Environment:
+    ASGI_MAX_BATCH_SIZE   rows per micro-batch (default 64)
+    ASGI_MAX_WAIT_MS      max time a request waits for its batch to fill (default 2)
+    ASGI_BATCH_THREADS    batches scored concurrently per process (default 1)
+    ASGI_CORS_ORIGIN      Access-Control-Allow-Origin value (default "*", like flask-cors)
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import drift_monitor
+import ml_service
+import prediction_log
+import request_schema
+from request_schema import RequestValidationError
+from model_registry import registry, CROP, RAINFALL
+
+MAX_BATCH_SIZE = int(os.environ.get("ASGI_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.environ.get("ASGI_MAX_WAIT_MS", "2"))
+BATCH_THREADS = int(os.environ.get("ASGI_BATCH_THREADS", "1"))
+CORS_ORIGIN = os.environ.get("ASGI_CORS_ORIGIN", "*")
+MAX_BODY_BYTES = 1_000_000
+
+logger = logging.getLogger("predictions")
+
+
+# -------------------------------------------------
+# Micro-batching
+# -------------------------------------------------
+class MicroBatcher:
+    """
+    Coalesce single rows submitted from the event loop into batches.
+
+    compute(X) runs in the executor and must return one output per row of X.
+    """
+
+    def __init__(self, name, compute, executor, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, max_concurrent=BATCH_THREADS):
+        self.name = name
+        self.compute = compute
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, row):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    # take whatever is already queued, without waiting
+                    while len(batch) < self.max_batch_size and not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            loop.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            X = np.array([row for row, _ in batch], dtype=float)
+            outputs = await asyncio.get_running_loop().run_in_executor(self.executor, self.compute, X)
+            self.batches += 1
+            self.rows += len(batch)
+            for future, out in zip(futures, outputs):
+                if not future.done():
+                    future.set_result(out)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+class ModelNotLoaded(RuntimeError):
+    pass
+
+
+def _crop_batch(X):
+    model = registry.get_or_none(CROP)
+    if model is None:
+        raise ModelNotLoaded("Crop model not loaded on server")
+    return ml_service.recommend_crop_batch(X, model)
+
+
+def _rain_batch(X):
+    model = registry.get_or_none(RAINFALL)
+    if model is None:
+        raise ModelNotLoaded("Rainfall model not loaded on server")
+    return [{"rainfall": v} for v in ml_service.predict_rainfall_batch(X, model)]
+
+
+def _pipeline_batch(X):
+    rain_model, crop_model = registry.get_or_none(RAINFALL), registry.get_or_none(CROP)
+    if rain_model is None or crop_model is None:
+        missing = "Rainfall" if rain_model is None else "Crop"
+        raise ModelNotLoaded(f"{missing} model not loaded on server")
+    return ml_service.recommend_crop_pipeline_batch(X, rain_model, crop_model)
+
+
+PIPELINE = "pipeline"
+BATCH_COMPUTE = {CROP: _crop_batch, RAINFALL: _rain_batch, PIPELINE: _pipeline_batch}
+
+
+_executor = ThreadPoolExecutor(max_workers=max(1, BATCH_THREADS), thread_name_prefix="batch")
+_batchers = {}
+
+
+def get_batcher(name):
+    """The process-wide batcher for a model (created on first use)."""
+    batcher = _batchers.get(name)
+    if batcher is None:
+        batcher = _batchers[name] = MicroBatcher(name, BATCH_COMPUTE[name], _executor)
+    return batcher
+
+
+# -------------------------------------------------
+# Request handling (same schemas and feature order as app_flask)
+# -------------------------------------------------
+async def predict(kind, name, parse, data):
+    try:
+        X = parse(data)
+    except RequestValidationError as e:
+        prediction_log.log(kind, data, error=str(e))
+        return 400, {"error": f"invalid request: {e}", "fields": e.errors}
+    if kind in drift_monitor.KINDS:
+        drift_monitor.observe(kind, X)
+    try:
+        response = await get_batcher(name).submit(X[0])
+    except ModelNotLoaded as e:
+        logger.error("%s_PREDICTION | model not loaded | inputs=%s", kind.upper(), data)
+        return 500, {"error": str(e)}
+    except Exception as e:
+        logger.exception("%s_PREDICTION_ERROR | inputs=%s", kind.upper(), data)
+        return 500, {"error": str(e)}
+    prediction_log.log(kind, data, response)
+    return 200, response
+
+
+# -------------------------------------------------
+# ASGI plumbing
+# -------------------------------------------------
+def _cors_headers():
+    return [
+        (b"access-control-allow-origin", CORS_ORIGIN.encode()),
+        (b"vary", b"Origin"),
+    ]
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *_cors_headers(),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_preflight(send, scope):
+    requested = dict(scope["headers"]).get(b"access-control-request-headers", b"content-type")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            *_cors_headers(),
+            (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+            (b"access-control-allow-headers", requested),
+            (b"content-length", b"0"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # load both models in the background; /health/ready turns 200 when done
+            registry.warm_in_background()
+            for name in BATCH_COMPUTE:
+                get_batcher(name).start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            for batcher in list(_batchers.values()):
+                await batcher.stop()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+ROUTES = {
+    "/api/recommend-crop": ("crop", CROP, request_schema.parse_crop),
+    "/api/predict-rainfall": ("rainfall", RAINFALL, request_schema.parse_rain),
+    "/api/pipeline": ("pipeline", PIPELINE, request_schema.parse_pipeline),
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if method == "OPTIONS":
+        await _send_preflight(send, scope)
+        return
+
+    if path in ROUTES:
+        if method != "POST":
+            await _send_json(send, 405, {"error": "method not allowed"})
+            return
+        try:
+            body = await _read_body(receive)
+        except ValueError as e:
+            await _send_json(send, 413, {"error": str(e)})
+            return
+        if body is None:
+            return
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = None  # rejected by the schema like any other non-object body
+        kind, name, parse = ROUTES[path]
+        status, payload = await predict(kind, name, parse, data)
+        await _send_json(send, status, payload)
+    elif path == "/" and method == "GET":
+        await _send_json(send, 200, {"status": "ok", "message": "ASGI API running"})
+    elif path in ("/health", "/health/live") and method == "GET":
+        await _send_json(send, 200, {"status": "ok"})
+    elif path == "/health/ready" and method == "GET":
+        ready, details = registry.readiness()
+        await _send_json(send, 200 if ready else 503,
+                         {"status": "ready" if ready else "warming up", **details})
+    elif path == "/api/batch/stats" and method == "GET":
+        await _send_json(send, 200, {name: b.stats() for name, b in _batchers.items()})
+    else:
+        await _send_json(send, 404, {"error": "not found"})
@@ -1,12 +1,30 @@
 import os
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 
 from flask import Flask, request, jsonify
+from flask.logging import default_handler
 from flask_cors import CORS
-import joblib
 import numpy as np
 
+import drift_monitor
+import explain
+import forecast_table
+import lag_index
+import metrics
+import ml_service
+import model_versions
+import prediction_log
+import prediction_cache
+import project_config as cfg
+import request_schema
+import similar_fields
+import whatif
+from request_schema import (
+    CROP_FEATURE_SCHEMA, CROP_SCHEMA, PIPELINE_SCHEMA, RAIN_SCHEMA, RequestValidationError,
+)
+from model_registry import registry, CROP, RAINFALL
+
 # -------------------------------------------------
 # Flask app setup
 # -------------------------------------------------
@@ -16,14 +34,17 @@ CORS(app)  # Allow requests from React (localhost:5173 etc.)
 # -------------------------------------------------
 # Logging setup
 # -------------------------------------------------
-os.makedirs("logs", exist_ok=True)
+# Errors and tracebacks go to logs/predictions.<slot or pid>.log (one file
+# per process, see prediction_log); successful predictions are written off
+# the request thread by prediction_log (JSON lines).
+os.makedirs(cfg.LOG_DIR, exist_ok=True)
 
 log_formatter = logging.Formatter(
     "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
 )
-log_file_path = os.path.join("logs", "predictions.log")
+log_file_path = os.path.join(cfg.LOG_DIR, "predictions.log")
 
-file_handler = RotatingFileHandler(
+file_handler = prediction_log.ProcessRotatingFileHandler(
     log_file_path, maxBytes=1_000_000, backupCount=3, encoding="utf-8"
 )
 file_handler.setFormatter(log_formatter)
@@ -38,48 +59,229 @@ app_logger = app.logger
 app_logger.setLevel(logging.INFO)
 
 # -------------------------------------------------
-# Model loading (paths relative to this file)
+# Models (shared registry, loaded lazily on first request)
 # -------------------------------------------------
-# __file__ = src/app_flask.py
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))         # .../src
-PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))  # project root
-MODEL_DIR = os.path.join(PROJECT_ROOT, "models")
-
-CROP_MODEL_PATH = os.path.join(MODEL_DIR, "crop_model.pkl")
-RAINFALL_MODEL_PATH = os.path.join(MODEL_DIR, "rainfall_model.pkl")
+# Paths come from project_config; the registry also hot-reloads a model
+# when its .pkl file is replaced on disk.
+registry_logger = logging.getLogger("model_registry")
+registry_logger.setLevel(logging.INFO)
+registry_logger.addHandler(default_handler)
+
+# MODEL_WARMUP=background: start loading both models (and the drift and
+# similar-fields indexes) in daemon threads at import instead of on the
+# first request; /health/ready reports the models' progress.
+# (Under gunicorn, gunicorn.conf.py does the warm-up instead.)
+if os.environ.get("MODEL_WARMUP") == "background":
+    registry.warm_in_background()
+    drift_monitor.warm_in_background()
+    similar_fields.warm_in_background()
 
-crop_model = None
-rainfall_model = None
-
-# Crop model
-try:
-    if os.path.exists(CROP_MODEL_PATH):
-        crop_model = joblib.load(CROP_MODEL_PATH)
-        app_logger.info(f"[MODEL] Loaded crop model from {CROP_MODEL_PATH}")
-    else:
-        app_logger.error(f"[MODEL] Crop model file not found at {CROP_MODEL_PATH}")
-except Exception as e:
-    app_logger.exception(f"[MODEL] Failed to load crop model: {e}")
-
-# Rainfall model
-try:
-    if os.path.exists(RAINFALL_MODEL_PATH):
-        rainfall_model = joblib.load(RAINFALL_MODEL_PATH)
-        app_logger.info(f"[MODEL] Loaded rainfall model from {RAINFALL_MODEL_PATH}")
-    else:
-        app_logger.error(f"[MODEL] Rainfall model file not found at {RAINFALL_MODEL_PATH}")
-except Exception as e:
-    app_logger.exception(f"[MODEL] Failed to load rainfall model: {e}")
+# -------------------------------------------------
+# Metrics (Prometheus text format on /metrics)
+# -------------------------------------------------
+# Every request gets a stage timer; handlers and the inference layer call
+# metrics.mark("stage") as each step finishes.
+@app.before_request
+def _start_request_timer():
+    metrics.start_request(request.endpoint)
+
+
+@app.after_request
+def _finish_request_timer(response):
+    metrics.finish_request(response.status_code)
+    return response
+
+
+@app.teardown_request
+def _finish_failed_request(exc):
+    # after_request is skipped when an exception propagates out of the view
+    # (PROPAGATE_EXCEPTIONS / debug): still count it, as a 500. No-op otherwise.
+    metrics.finish_request(500)
+
+
+@metrics.register_collector
+def _model_metrics():
+    status = registry.status()
+    samples = [((name,), s) for name, s in sorted(status.items())]
+    return (
+        metrics.gauge_lines("agro_model_loaded", "1 if the model is loaded.",
+                            [(k, int(s["loaded"])) for k, s in samples], ("model",))
+        + metrics.gauge_lines("agro_model_version", "Number of times the model has been (re)loaded.",
+                              [(k, s["version"]) for k, s in samples], ("model",))
+        + metrics.gauge_lines("agro_model_load_seconds", "Duration of the last model load.",
+                              [(k, s["load_seconds"] or 0) for k, s in samples], ("model",))
+    )
+
+
+@metrics.register_collector
+def _cache_metrics():
+    stats = prediction_cache.stats()
+    caches = sorted(stats.items())
+    return (
+        metrics.gauge_lines("agro_prediction_cache_hits_total", "Prediction cache hits.",
+                            [((k,), s["hits"]) for k, s in caches], ("cache",), "counter")
+        + metrics.gauge_lines("agro_prediction_cache_misses_total", "Prediction cache misses.",
+                              [((k,), s["misses"]) for k, s in caches], ("cache",), "counter")
+        + metrics.gauge_lines("agro_prediction_cache_hit_ratio", "Prediction cache hit ratio.",
+                              [((k,), s["hit_rate"]) for k, s in caches], ("cache",))
+        + metrics.gauge_lines("agro_prediction_cache_entries", "Entries in the prediction cache.",
+                              [((k,), s["size"]) for k, s in caches], ("cache",))
+    )
+
+
+@metrics.register_collector
+def _log_metrics():
+    stats = prediction_log.stats()
+    return metrics.gauge_lines(
+        "agro_prediction_log_records", "Prediction log records by outcome.",
+        [((k,), v) for k, v in sorted(stats.items()) if k != "enabled"], ("state",),
+    )
+
+
+@metrics.register_collector
+def _version_metrics():
+    stats = model_versions.stats()
+    lines = metrics.gauge_lines(
+        "agro_crop_version_requests_total", "Crop requests served per model version.",
+        [((name,), v["served"]) for name, v in stats["versions"].items()], ("version",), "counter",
+    )
+    if stats["shadow"] is None:
+        return lines
+    shadow = [((name,), s) for name, s in stats["shadow"]["versions"].items()]
+    return (
+        lines
+        + metrics.gauge_lines("agro_shadow_compared_total", "Predictions compared per shadow version.",
+                              [(k, s["compared"]) for k, s in shadow], ("version",), "counter")
+        + metrics.gauge_lines("agro_shadow_agreement", "Share of shadow predictions with the served crop.",
+                              [(k, s["agreement"]) for k, s in shadow if s["compared"]], ("version",))
+        + metrics.gauge_lines("agro_shadow_dropped_total", "Shadow requests dropped (queue full).",
+                              [((), stats["shadow"]["dropped"])], (), "counter")
+    )
+
+
+@metrics.register_collector
+def _drift_metrics():
+    scores = drift_monitor.scores()
+    samples = [
+        ((kind, feature), entry)
+        for kind in drift_monitor.KINDS
+        for feature, entry in scores[kind].get("features", {}).items()
+        if "psi" in entry
+    ]
+    return (
+        metrics.gauge_lines("agro_drift_psi", "Population stability index of live inputs vs training data.",
+                            [(k, e["psi"]) for k, e in samples], ("model", "feature"))
+        + metrics.gauge_lines("agro_drift_ks", "KS distance of live inputs vs training data.",
+                              [(k, e["ks"]) for k, e in samples], ("model", "feature"))
+    )
 
 # -------------------------------------------------
 # Helper functions
 # -------------------------------------------------
-def safe_float(d, key, default=0.0):
-    """Get float from dict safely."""
+def request_payload():
+    """JSON body of the request: {} when empty, None when it is not valid JSON."""
+    if not request.get_data(cache=True):
+        return {}
+    return request.get_json(force=True, silent=True)
+
+
+def explain_requested():
+    """?explain=1: add per-feature path contributions (explain.py) to each result."""
+    return request.args.get("explain", "").lower() in ("1", "true", "yes")
+
+
+def cache_unless_explained(cache):
+    """
+    The prediction cache to use, or None when the results are explained: a
+    quantized cache hit can be a neighbouring row's prediction, and the
+    explanation is always computed for the exact row.
+    """
+    return None if explain_requested() else cache
+
+
+def crop_version():
+    """
+    Crop model version serving this request (model_versions: weighted split,
+    or pinned with ?model_version=), or None if the pinned one is unknown.
+    """
     try:
-        return float(d.get(key, default))
-    except Exception:
-        return float(default)
+        return model_versions.route(request.args.get("model_version"))
+    except model_versions.UnknownVersionError:
+        return None
+
+
+def unknown_version_error():
+    expected = ", ".join(model_versions.VERSIONS)
+    return jsonify({"error": f"unknown model_version; expected one of {expected}"}), 400
+
+
+def validation_error(kind, data, err):
+    """400 response with one message per invalid field (request_schema)."""
+    prediction_log.log(kind, data, error=str(err))
+    return jsonify({"error": f"invalid request: {err}", "fields": err.errors}), 400
+
+
+# -------------------------------------------------
+# Batch helpers
+# -------------------------------------------------
+MAX_BATCH_SIZE = 10_000
+
+
+class BatchError(Exception):
+    """Raised when a batch body cannot be parsed as a whole."""
+
+
+def parse_batch_body():
+    """
+    Read a batch request body.
+
+    Accepts either a JSON array of objects or NDJSON (one object per line).
+    Returns a list where each item is either a dict (the record) or a str
+    (a per-record parse error), so results can be reported in input order.
+    """
+    raw = request.get_data(cache=False, as_text=True) or ""
+    content_type = (request.mimetype or "").lower()
+
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        items = []
+        for line in raw.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(f"invalid JSON: {e}")
+    else:
+        try:
+            items = json.loads(raw)
+        except ValueError as e:
+            raise BatchError(f"invalid JSON body: {e}")
+        if isinstance(items, dict) and isinstance(items.get("records"), list):
+            items = items["records"]
+        if not isinstance(items, list):
+            raise BatchError("expected a JSON array of records")
+
+    if len(items) > MAX_BATCH_SIZE:
+        raise BatchError(f"batch too large ({len(items)} > {MAX_BATCH_SIZE})")
+
+    return [
+        item if isinstance(item, (dict, str)) else "record must be a JSON object"
+        for item in items
+    ]
+
+
+def batch_response(n_items, outputs, valid_idx, errors):
+    """Merge per-record outputs and errors back into input order."""
+    results = [None] * n_items
+    for i, out in zip(valid_idx, outputs):
+        results[i] = {"index": i, **out}
+    for i, err in errors.items():
+        if isinstance(err, RequestValidationError):
+            results[i] = {"index": i, "error": str(err), "fields": err.errors}
+        else:
+            results[i] = {"index": i, "error": err}
+    return {"count": n_items, "errors": len(errors), "results": results}
 
 
 # -------------------------------------------------
@@ -91,10 +293,46 @@ def root():
 
 
 @app.route("/health", methods=["GET"])
+@app.route("/health/live", methods=["GET"])
 def health():
+    """Liveness: the process serves requests. Never touches the models."""
     return jsonify({"status": "ok"}), 200
 
 
+@app.route("/health/ready", methods=["GET"])
+def readiness():
+    """Readiness: 200 once both models are loaded, 503 (with per-model state) until then."""
+    ready, details = registry.readiness()
+    return jsonify({"status": "ready" if ready else "warming up", **details}), 200 if ready else 503
+
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(prediction_cache.stats()), 200
+
+
+@app.route("/api/log/stats", methods=["GET"])
+def log_stats():
+    return jsonify(prediction_log.stats()), 200
+
+
+@app.route("/api/model-versions", methods=["GET"])
+def model_version_stats():
+    """Crop model versions, traffic split and shadow agreement (model_versions)."""
+    return jsonify(model_versions.stats()), 200
+
+
+@app.route("/api/drift", methods=["GET"])
+def drift_scores():
+    """Input drift per feature over the last DRIFT_WINDOW requests (drift_monitor)."""
+    return jsonify(drift_monitor.scores()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # -------------------------------------------------
 # Crop recommendation endpoint
 # -------------------------------------------------
@@ -117,62 +355,44 @@ def recommend_crop():
 
     Internally we build 7 features:
       N, P, K, temperature, humidity, pH, avg_rainfall (derived from lag1-3)
+
+    ?explain=1 adds "explanation": {"crop", "bias", "contributions"}.
+    ?model_version=<name> pins a crop model version (model_versions.py);
+    the X-Model-Version response header names the version that answered.
     """
-    data = request.get_json() or {}
+    data = request_payload()
+    metrics.mark("parse")
 
+    # Ranges and defaults: request_schema.CROP_SCHEMA. Feature row:
+    # [N, P, K, temperature, humidity, pH, avg_rainfall]
+    try:
+        X = request_schema.parse_crop(data)
+    except RequestValidationError as e:
+        return validation_error("crop", data, e)
+    drift_monitor.observe("crop", X)
+    metrics.mark("validate")
+
+    version = crop_version()
+    if version is None:
+        return unknown_version_error()
+    crop_model = model_versions.get_model(version)
+    metrics.mark("model")
     if crop_model is None:
-        logger.error("CROP_PREDICTION | model not loaded | inputs=%s", data)
+        logger.error("CROP_PREDICTION | model %s not loaded | inputs=%s", version, data)
         return jsonify({"error": "Crop model not loaded on server"}), 500
 
     try:
-        month = safe_float(data, "month", 1)
-        lag1 = safe_float(data, "lag1", 0)
-        lag2 = safe_float(data, "lag2", 0)
-        lag3 = safe_float(data, "lag3", 0)
-
-        N = safe_float(data, "N", 0)
-        P = safe_float(data, "P", 0)
-        K = safe_float(data, "K", 0)
-        temperature = safe_float(data, "temperature", 0)
-        humidity = safe_float(data, "humidity", 0)
-        pH = safe_float(data, "pH", 7)
-
-        avg_rainfall = (lag1 + lag2 + lag3) / 3.0
-
-        # Feature vector (align this with how you trained crop_model)
-        # Example: [N, P, K, temperature, humidity, pH, avg_rainfall]
-        X = np.array([[N, P, K, temperature, humidity, pH, avg_rainfall]], dtype=float)
-
-        pred_label = crop_model.predict(X)[0]
-
-        confidence = None
-        top3_labels = []
-        top3_probs = []
-
-        if hasattr(crop_model, "predict_proba"):
-            proba = crop_model.predict_proba(X)[0]  # shape (n_classes,)
-            classes = crop_model.classes_
-
-            sorted_idx = np.argsort(proba)[::-1]
-            top_idx = sorted_idx[:3]
-
-            top3_labels = [str(classes[i]) for i in top_idx]
-            top3_probs = [float(proba[i]) for i in top_idx]
-            confidence = float(max(proba))
-        else:
-            confidence = 1.0
-            top3_labels = [str(pred_label)]
-            top3_probs = [1.0]
-
-        response = {
-            "crop": str(pred_label),
-            "confidence": confidence,
-            "top3": top3_labels,
-            "top3_probs": top3_probs,
-        }
-
-        logger.info("CROP_PREDICTION | inputs=%s | output=%s", data, response)
-        return jsonify(response), 200
+        cache = cache_unless_explained(model_versions.cache_for(version))
+        response = ml_service.recommend_crop_batch(X, crop_model, cache)[0]
+        model_versions.shadow(version, X, [response])
+        metrics.mark("postprocess")
+        if explain_requested():
+            response = {**response, "explanation": explain.explain_crop(crop_model, X)[0]}
+            metrics.mark("explain")
+
+        prediction_log.log("crop", data, {**response, "model_version": version})
+        metrics.mark("log")
+        return jsonify(response), 200, {"X-Model-Version": version}
 
     except Exception as e:
         logger.exception("CROP_PREDICTION_ERROR | inputs=%s", data)
@@ -195,27 +415,37 @@ def predict_rainfall():
 
     Example feature order for model:
       [month, lag1, lag2, lag3]
+
+    ?explain=1 adds "explanation": {"bias", "contributions"}.
     """
-    data = request.get_json() or {}
+    data = request_payload()
+    metrics.mark("parse")
 
+    try:
+        X = request_schema.parse_rain(data)
+    except RequestValidationError as e:
+        return validation_error("rainfall", data, e)
+    drift_monitor.observe("rainfall", X)
+    metrics.mark("validate")
+
+    rainfall_model = registry.get_or_none(RAINFALL)
+    metrics.mark("model")
     if rainfall_model is None:
         logger.error("RAINFALL_PREDICTION | model not loaded | inputs=%s", data)
         return jsonify({"error": "Rainfall model not loaded on server"}), 500
 
     try:
-        month = safe_float(data, "month", 1)
-        lag1 = safe_float(data, "lag1", 0)
-        lag2 = safe_float(data, "lag2", 0)
-        lag3 = safe_float(data, "lag3", 0)
-
-        X = np.array([[month, lag1, lag2, lag3]], dtype=float)
-
-        pred_value = rainfall_model.predict(X)[0]
-        rainfall_value = float(pred_value)
+        cache = cache_unless_explained(prediction_cache.rain_cache)
+        rainfall_value = ml_service.predict_rainfall_batch(X, rainfall_model, cache)[0]
+        metrics.mark("postprocess")
 
         response = {"rainfall": rainfall_value}
+        if explain_requested():
+            response["explanation"] = explain.explain_rainfall(rainfall_model, X)[0]
+            metrics.mark("explain")
 
-        logger.info("RAINFALL_PREDICTION | inputs=%s | output=%s", data, response)
+        prediction_log.log("rainfall", data, response)
+        metrics.mark("log")
         return jsonify(response), 200
 
     except Exception as e:
@@ -223,9 +453,437 @@ def predict_rainfall():
         return jsonify({"error": str(e)}), 500
 
 
+# -------------------------------------------------
+# Batch endpoints
+# -------------------------------------------------
+@app.route("/api/recommend-crop/batch", methods=["POST"])
+def recommend_crop_batch():
+    """
+    Body: JSON array (or NDJSON) of /api/recommend-crop payloads.
+
+    All valid records are scored with a single predict_proba call.
+    Results come back in input order; invalid records get an "error" entry
+    instead of failing the whole batch.
+    """
+    version = crop_version()
+    if version is None:
+        return unknown_version_error()
+    crop_model = model_versions.get_model(version)
+    metrics.mark("model")
+    if crop_model is None:
+        logger.error("CROP_BATCH | model %s not loaded", version)
+        return jsonify({"error": "Crop model not loaded on server"}), 500
+
+    try:
+        items = parse_batch_body()
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    metrics.mark("parse")
+
+    try:
+        # rows are already [N, P, K, temperature, humidity, pH, avg_rainfall]
+        X, valid_idx, errors = request_schema.parse_many(items, CROP_SCHEMA)
+        drift_monitor.observe("crop", X)
+        metrics.mark("validate")
+
+        cache = cache_unless_explained(model_versions.cache_for(version))
+        outputs = ml_service.recommend_crop_batch(X, crop_model, cache)
+        model_versions.shadow(version, X, outputs)
+        metrics.mark("postprocess")
+        if explain_requested():
+            outputs = [{**out, "explanation": ex}
+                       for out, ex in zip(outputs, explain.explain_crop(crop_model, X))]
+            metrics.mark("explain")
+
+        response = batch_response(len(items), outputs, valid_idx, errors)
+        prediction_log.log("crop_batch", output={"count": len(items), "errors": len(errors),
+                                                 "model_version": version})
+        return jsonify(response), 200, {"X-Model-Version": version}
+
+    except Exception as e:
+        logger.exception("CROP_BATCH_ERROR | count=%d", len(items))
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/predict-rainfall/batch", methods=["POST"])
+def predict_rainfall_batch():
+    """
+    Body: JSON array (or NDJSON) of /api/predict-rainfall payloads.
+
+    All valid records are scored with a single predict call.
+    """
+    rainfall_model = registry.get_or_none(RAINFALL)
+    metrics.mark("model")
+    if rainfall_model is None:
+        logger.error("RAINFALL_BATCH | model not loaded")
+        return jsonify({"error": "Rainfall model not loaded on server"}), 500
+
+    try:
+        items = parse_batch_body()
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    metrics.mark("parse")
+
+    try:
+        X, valid_idx, errors = request_schema.parse_many(items, RAIN_SCHEMA)
+        drift_monitor.observe("rainfall", X)
+        metrics.mark("validate")
+
+        cache = cache_unless_explained(prediction_cache.rain_cache)
+        preds = ml_service.predict_rainfall_batch(X, rainfall_model, cache)
+        metrics.mark("postprocess")
+        outputs = [{"rainfall": float(v)} for v in preds]
+        if explain_requested():
+            for out, ex in zip(outputs, explain.explain_rainfall(rainfall_model, X)):
+                out["explanation"] = ex
+            metrics.mark("explain")
+
+        response = batch_response(len(items), outputs, valid_idx, errors)
+        prediction_log.log("rainfall_batch", output={"count": len(items), "errors": len(errors)})
+        return jsonify(response), 200
+
+    except Exception as e:
+        logger.exception("RAINFALL_BATCH_ERROR | count=%d", len(items))
+        return jsonify({"error": str(e)}), 500
+
+
+# -------------------------------------------------
+# Rainfall -> crop pipeline endpoints
+# -------------------------------------------------
+def pipeline_models():
+    """(rainfall model, crop model), or a 500 response if either is missing."""
+    rainfall_model = registry.get_or_none(RAINFALL)
+    crop_model = registry.get_or_none(CROP)
+    metrics.mark("model")
+    if rainfall_model is None or crop_model is None:
+        missing = "Rainfall" if rainfall_model is None else "Crop"
+        return None, (jsonify({"error": f"{missing} model not loaded on server"}), 500)
+    return (rainfall_model, crop_model), None
+
+
+@app.route("/api/pipeline", methods=["POST"])
+def recommend_crop_pipeline():
+    """
+    Same JSON as /api/recommend-crop, but the crop model's rainfall feature
+    is the rainfall model's prediction from month and lag1-lag3 (as in the
+    Streamlit app) instead of the mean of the lags.
+
+    Response: {"rainfall", "crop", "confidence", "top3", "top3_probs"}
+    """
+    data = request_payload()
+    metrics.mark("parse")
+
+    try:
+        X = request_schema.parse_pipeline(data)
+    except RequestValidationError as e:
+        return validation_error("pipeline", data, e)
+    metrics.mark("validate")
+
+    models, error = pipeline_models()
+    if error:
+        logger.error("PIPELINE_PREDICTION | model not loaded | inputs=%s", data)
+        return error
+
+    try:
+        response = ml_service.recommend_crop_pipeline_batch(X, *models)[0]
+        metrics.mark("postprocess")
+
+        prediction_log.log("pipeline", data, response)
+        metrics.mark("log")
+        return jsonify(response), 200
+
+    except Exception as e:
+        logger.exception("PIPELINE_PREDICTION_ERROR | inputs=%s", data)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/pipeline/batch", methods=["POST"])
+def recommend_crop_pipeline_batch():
+    """
+    Body: JSON array (or NDJSON) of /api/pipeline payloads.
+
+    One rainfall predict and one crop predict_proba for all valid records.
+    """
+    models, error = pipeline_models()
+    if error:
+        logger.error("PIPELINE_BATCH | model not loaded")
+        return error
+
+    try:
+        items = parse_batch_body()
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    metrics.mark("parse")
+
+    try:
+        X, valid_idx, errors = request_schema.parse_many(items, PIPELINE_SCHEMA)
+        metrics.mark("validate")
+
+        outputs = ml_service.recommend_crop_pipeline_batch(X, *models)
+        metrics.mark("postprocess")
+
+        response = batch_response(len(items), outputs, valid_idx, errors)
+        prediction_log.log("pipeline_batch", output={"count": len(items), "errors": len(errors)})
+        return jsonify(response), 200
+
+    except Exception as e:
+        logger.exception("PIPELINE_BATCH_ERROR | count=%d", len(items))
+        return jsonify({"error": str(e)}), 500
+
+
+# -------------------------------------------------
+# What-if sweeps
+# -------------------------------------------------
+@app.route("/api/whatif", methods=["POST"])
+def whatif_sweep():
+    """
+    Crop probabilities over a grid of one or two varied fields:
+    {
+      "profile": { ...same fields as /api/pipeline... },
+      "vary": {"temperature": {"min": 10, "max": 40, "steps": 31},
+               "humidity": [40, 60, 80]}
+    }
+    Response: axes, classes, and per grid point crop, confidence,
+    rainfall and proba (the full surface, shape [*axes, classes]).
+    """
+    data = request_payload()
+    metrics.mark("parse")
+
+    models, error = pipeline_models()
+    if error:
+        return error
+
+    try:
+        grid = whatif.sweep(data, *models)
+    except RequestValidationError as e:
+        return validation_error("whatif", data, e)
+    metrics.mark("predict")
+    prediction_log.log("whatif", data, {"points": grid.n_points})
+    return jsonify(grid.to_dict()), 200
+
+
+@app.route("/api/whatif/presets", methods=["GET"])
+def whatif_presets():
+    return jsonify({
+        "presets": whatif.PRESETS,
+        "axes": [{"name": name, "values": values.tolist()}
+                 for name, values in whatif.PRESET_AXES.items()],
+        "materialized": whatif.preset_stats(),
+    }), 200
+
+
+@app.route("/api/whatif/presets/<name>", methods=["GET"])
+def whatif_preset_lookup(name):
+    """
+    Lookup in a preset's precomputed month x temperature x humidity grid,
+    e.g. ?month=7&temperature=25&humidity=70 (nearest grid point). Fields
+    left out stay as axes of the returned surface.
+    """
+    if name not in whatif.PRESETS:
+        return jsonify({"error": f"unknown preset {name!r}"}), 404
+
+    _, error = pipeline_models()
+    if error:
+        return error
+
+    point = {}
+    for field in whatif.PRESET_AXES:
+        if field in request.args:
+            try:
+                point[field] = float(request.args[field])
+            except ValueError:
+                point[field] = None  # rejected by select() like an out-of-range value
+    try:
+        result = whatif.preset_grid(name).select(point)
+    except RequestValidationError as e:
+        return jsonify({"error": f"invalid request: {e}", "fields": e.errors}), 400
+    metrics.mark("lookup")
+    return jsonify(result if isinstance(result, dict) else result.to_dict()), 200
+
+
+# -------------------------------------------------
+# Similar fields (nearest rows of the crop dataset)
+# -------------------------------------------------
+def neighbour_count():
+    """?k= query parameter (default 5), or None when it is not 1..MAX_K."""
+    try:
+        k = int(request.args.get("k", 5))
+    except ValueError:
+        return None
+    return k if 1 <= k <= similar_fields.MAX_K else None
+
+
+@app.route("/api/similar-fields", methods=["POST"])
+def similar_fields_lookup():
+    """
+    Closest rows of Crop_recommendation.csv to one crop feature row:
+    {"N": 90, "P": 42, "K": 43, "temperature": 20.8, "humidity": 82, "pH": 6.5, "rainfall": 202.9}
+
+    ?k=5 neighbours (max similar_fields.MAX_K), each with its dataset row,
+    label, standardized distance and features.
+    """
+    k = neighbour_count()
+    if k is None:
+        return jsonify({"error": f"k must be an integer 1-{similar_fields.MAX_K}"}), 400
+
+    data = request_payload()
+    try:
+        X = request_schema.parse_crop_features(data)
+    except RequestValidationError as e:
+        return jsonify({"error": f"invalid request: {e}", "fields": e.errors}), 400
+    metrics.mark("validate")
+
+    neighbours = similar_fields.get_field_index().neighbours(X, k)[0]
+    metrics.mark("lookup")
+    return jsonify({"k": k, "neighbours": neighbours}), 200
+
+
+@app.route("/api/similar-fields/batch", methods=["POST"])
+def similar_fields_batch():
+    """Body: JSON array (or NDJSON) of /api/similar-fields payloads; one tree query for all."""
+    k = neighbour_count()
+    if k is None:
+        return jsonify({"error": f"k must be an integer 1-{similar_fields.MAX_K}"}), 400
+
+    try:
+        items = parse_batch_body()
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    metrics.mark("parse")
+
+    X, valid_idx, errors = request_schema.parse_many(items, CROP_FEATURE_SCHEMA)
+    metrics.mark("validate")
+
+    outputs = [{"neighbours": n} for n in similar_fields.get_field_index().neighbours(X, k)]
+    metrics.mark("lookup")
+    return jsonify(batch_response(len(items), outputs, valid_idx, errors)), 200
+
+
+# -------------------------------------------------
+# Rainfall by location (server-side lag lookup)
+# -------------------------------------------------
+@app.route("/api/predict-rainfall/by-location", methods=["POST"])
+def predict_rainfall_by_location():
+    """
+    Expected JSON:
+    {
+      "state": "Kerala",
+      "district": "Idukki",   # optional: omit for every district in the state
+      "month": 7
+    }
+
+    lag1-lag3 are looked up from the IMD history (lag_index) instead of
+    being sent by the client.
+    """
+    data = request_payload()
+    metrics.mark("parse")
+
+    # month: request_schema.MONTH_FIELD (an integer 1-12, like /api/predict-rainfall)
+    try:
+        month = request_schema.parse_month(data)
+    except RequestValidationError as e:
+        return validation_error("rainfall_by_location", data, e)
+
+    state = data.get("state")
+    district = data.get("district")
+    if not isinstance(state, str) or not state.strip():
+        return jsonify({"error": "field 'state' is required"}), 400
+    if district is not None and not isinstance(district, str):
+        return jsonify({"error": "field 'district' must be a string"}), 400
+    metrics.mark("validate")
+
+    rainfall_model = registry.get_or_none(RAINFALL)
+    metrics.mark("model")
+    if rainfall_model is None:
+        logger.error("RAINFALL_BY_LOCATION | model not loaded | inputs=%s", data)
+        return jsonify({"error": "Rainfall model not loaded on server"}), 500
+
+    try:
+        index = lag_index.get_lag_index()
+
+        if district:
+            (state_name, district_name), lags = index.lags(state, district, month)
+            rainfall_value = ml_service.predict_rainfall_batch(
+                np.array([[month, *lags]], dtype=float), rainfall_model
+            )[0]
+            response = {
+                "state": state_name,
+                "district": district_name,
+                "month": month,
+                "lag1": lags[0],
+                "lag2": lags[1],
+                "lag3": lags[2],
+                "rainfall": rainfall_value,
+            }
+            prediction_log.log("rainfall_by_location", data, response)
+            return jsonify(response), 200
+
+        names, lags, has_history = index.state_lags(state, month)
+        X = np.column_stack([np.full(int(has_history.sum()), month), lags[has_history]])
+        preds = iter(ml_service.predict_rainfall_batch(X, rainfall_model))
+
+        results = []
+        for (state_name, district_name), row, ok in zip(names, lags.tolist(), has_history):
+            entry = {"district": district_name}
+            if ok:
+                entry.update(lag1=row[0], lag2=row[1], lag3=row[2], rainfall=next(preds))
+            else:
+                entry["error"] = "no rainfall history for the lag months"
+            results.append(entry)
+
+        response = {"state": names[0][0], "month": month, "count": len(results), "results": results}
+        prediction_log.log("rainfall_by_location", data, {"districts": len(results)})
+        return jsonify(response), 200
+
+    except lag_index.LocationNotFoundError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except lag_index.MissingHistoryError as e:
+        return jsonify({"error": str(e)}), 422
+    except Exception as e:
+        logger.exception("RAINFALL_BY_LOCATION_ERROR | inputs=%s", data)
+        return jsonify({"error": str(e)}), 500
+
+
+# -------------------------------------------------
+# Precomputed all-districts forecast
+# -------------------------------------------------
+@app.route("/api/rainfall-forecast", methods=["GET"])
+def rainfall_forecast():
+    """
+    Next-month predicted rainfall per district, served from the table built
+    by forecast_table.py (no model call on this path).
+
+    Optional query params: ?state=Kerala&district=Idukki
+    """
+    try:
+        table, by_state = forecast_table.load_forecast()
+    except forecast_table.ForecastNotAvailableError as e:
+        return jsonify({"error": str(e)}), 503
+
+    # same name matching as /api/predict-rainfall/by-location (lag_index)
+    state = lag_index.normalize_name(request.args.get("state") or "")
+    district = lag_index.normalize_name(request.args.get("district") or "")
+
+    if state:
+        rows = by_state.get(state, [])
+    else:
+        rows = [row for state_rows in by_state.values() for row in state_rows]
+    if district:
+        rows = [row for row in rows if lag_index.normalize_name(row["district"]) == district]
+
+    return jsonify({
+        "generated_at": table["generated_at"],
+        "count": len(rows),
+        "results": rows,
+    }), 200
+
+
 # -------------------------------------------------
 # Main entry
 # -------------------------------------------------
 if __name__ == "__main__":
     # Debug for development. In production, use a WSGI server (gunicorn, etc.)
+    registry.warm_in_background()
+    drift_monitor.warm_in_background()
+    similar_fields.warm_in_background()
     app.run(host="127.0.0.1", port=5000, debug=True)
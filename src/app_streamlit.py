@@ -2,18 +2,7 @@ import sys
 from pathlib import Path
 import io
 
-import joblib
-import numpy as np
-import pandas as pd
 import streamlit as st
-from sklearn.metrics import (
-    accuracy_score,
-    classification_report,
-    confusion_matrix,
-    mean_absolute_error,
-    mean_squared_error,
-)
-import matplotlib.pyplot as plt
 
 # ----------------- Paths & Config -----------------
 APP_DIR = Path(__file__).resolve().parent
@@ -23,63 +12,65 @@ sys.path.insert(0, str(PROJECT_DIR / "src"))
 sys.path.insert(0, str(PROJECT_DIR))
 
 import project_config as cfg
-
-# ----------------- Load Models & Data -----------------
-rf_rain = joblib.load(cfg.RAINFALL_MODEL_PATH)
-rf_crop = joblib.load(cfg.CROP_MODEL_PATH)
-
-df_crop = pd.read_csv(cfg.CROP_CSV)
-df_rain = pd.read_csv(cfg.RAINFALL_CSV, sep=";")
-df_rain.columns = df_rain.columns.str.replace('"', "")
+import ml_service
+import evaluation
+import explain
+from model_registry import registry, get_crop_model
+
+# ----------------- Load Models -----------------
+# Shared registry: loaded once per process and reused across reruns. The
+# first render doesn't wait for the unpickling: the models load in a
+# background thread and a prediction blocks only if they are not in yet.
+registry.warm_in_background()
+
+
+# ----------------- Evaluation Artifacts -----------------
+# Metrics are precomputed once per model version (see evaluation.py) and
+# cached here per fingerprint, so widget changes never re-run full-dataset
+# inference or redraw the figures.
+@st.cache_data(show_spinner="Loading rainfall model metrics…")
+def load_rainfall_eval(model_sha256, data_sha256):
+    return evaluation.rainfall_eval()
+
+
+@st.cache_data(show_spinner="Loading crop model metrics…")
+def load_crop_eval(model_sha256, data_sha256):
+    return evaluation.crop_eval()
+
+
+@st.cache_resource
+def importance_figure(features, importances):
+    import matplotlib.pyplot as plt  # ~1 s of imports, only once the charts are drawn
+
+    fig, ax = plt.subplots()
+    ax.bar(features, importances)
+    ax.set_ylabel("Importance")
+    ax.set_xlabel("Feature")
+    return fig
+
+
+@st.cache_resource
+def confusion_figure(model_sha256, data_sha256, _labels, _cm):
+    # keyed like load_crop_eval: the matrix changes with the model or the data
+    import matplotlib.pyplot as plt
+
+    labels, cm = _labels, _cm
+    fig, ax = plt.subplots(figsize=(8, 8))
+    im = ax.imshow(cm, cmap="Blues")
+    ax.set_xticks(range(len(labels)))
+    ax.set_yticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=90)
+    ax.set_yticklabels(labels)
+    ax.set_xlabel("Predicted")
+    ax.set_ylabel("True")
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            ax.text(j, i, cm[i, j], ha="center", va="center", color="black", fontsize=6)
+    fig.colorbar(im)
+    return fig
 
 
 # ----------------- Helper Functions -----------------
-def prepare_rain_data(df: pd.DataFrame):
-    daily_cols = [c for c in cfg.DAILY_COLS if c in df.columns]
-    rain = df[[cfg.STATE_COL, cfg.DIST_COL, cfg.MONTH_COL] + daily_cols].copy()
-
-    for c in daily_cols:
-        rain[c] = pd.to_numeric(rain[c], errors="coerce")
-
-    rain["total_rainfall"] = rain[daily_cols].sum(axis=1)
-    rain = rain.sort_values([cfg.STATE_COL, cfg.DIST_COL, cfg.MONTH_COL])
-
-    rain["lag1"] = rain.groupby([cfg.STATE_COL, cfg.DIST_COL])["total_rainfall"].shift(1)
-    rain["lag2"] = rain.groupby([cfg.STATE_COL, cfg.DIST_COL])["total_rainfall"].shift(2)
-    rain["lag3"] = rain.groupby([cfg.STATE_COL, cfg.DIST_COL])["total_rainfall"].shift(3)
-
-    rain = rain.dropna(subset=["lag1", "lag2", "lag3"])
-
-    feature_cols = [cfg.MONTH_COL, "lag1", "lag2", "lag3"]
-    X = rain[feature_cols]
-    y = rain["total_rainfall"]
-    return X, y, feature_cols
-
-
-def predict_monthly_rainfall(month: int, lag1: float, lag2: float, lag3: float) -> float:
-    """
-    Uses rf_rain model to predict rainfall.
-    Equivalent to your snippet:
-
-        X_rain = np.array([[month, lag1, lag2, lag3]])
-        pred_rain = rf_rain.predict(X_rain)[0]
-    """
-    X = np.array([[month, lag1, lag2, lag3]])
-    return float(rf_rain.predict(X)[0])
-
-
-def recommend_crop(N, P, K, T, H, pH, rainfall):
-    """
-    Uses rf_crop model to predict crop.
-    Equivalent to your snippet:
-
-        X_crop = np.array([[N, P, K, temperature, humidity, ph, pred_rain]])
-        recommended_crop = rf_crop.predict(X_crop)[0]
-    """
-    X = np.array([[N, P, K, T, H, pH, rainfall]])
-    return rf_crop.predict(X)[0]
-
-
 def crop_display_name(crop):
     mapping = {
         "rice": "🍚 Rice",
@@ -109,43 +100,11 @@ def crop_display_name(crop):
 
 
 def get_sample_scenarios():
+    """project_config.SAMPLE_SCENARIOS (also the what-if presets), keyed by label, T/H as in the form."""
+    renamed = {"temperature": "T", "humidity": "H"}
     return {
-        "High rainfall – tropical": {
-            "month": 9,
-            "lag1": 260.0,
-            "lag2": 230.0,
-            "lag3": 210.0,
-            "N": 100.0,
-            "P": 55.0,
-            "K": 60.0,
-            "T": 28.0,
-            "H": 85.0,
-            "pH": 6.4,
-        },
-        "Dry region – pulses": {
-            "month": 2,
-            "lag1": 40.0,
-            "lag2": 35.0,
-            "lag3": 20.0,
-            "N": 40.0,
-            "P": 20.0,
-            "K": 30.0,
-            "T": 22.0,
-            "H": 50.0,
-            "pH": 7.0,
-        },
-        "Moderate – fruits": {
-            "month": 6,
-            "lag1": 120.0,
-            "lag2": 90.0,
-            "lag3": 60.0,
-            "N": 70.0,
-            "P": 45.0,
-            "K": 50.0,
-            "T": 26.0,
-            "H": 65.0,
-            "pH": 6.2,
-        },
+        scenario["label"]: {renamed.get(k, k): v for k, v in scenario["profile"].items()}
+        for scenario in cfg.SAMPLE_SCENARIOS.values()
     }
 
 
@@ -210,8 +169,13 @@ with header_left:
 with header_right:
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.markdown("### **System Status**")
-    st.write("✅ Rainfall model loaded")
-    st.write("✅ Crop model loaded")
+    for name, model in registry.readiness()[1]["models"].items():
+        if model["state"] == "loaded":
+            st.write(f"✅ {name.capitalize()} model loaded")
+        elif model["state"] == "failed":
+            st.write(f"❌ {name.capitalize()} model failed to load")
+        else:
+            st.write(f"⏳ {name.capitalize()} model loading…")
     st.write("📊 Dataset: IMD Rainfall + Crop Recommendation")
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -275,9 +239,13 @@ with tab_pred:
 
     st.markdown("")
     if st.button("✨ Predict Rainfall & Recommend Crop"):
-        # --- This part is equivalent to your snippet ---
-        pred_rain = predict_monthly_rainfall(month, lag1, lag2, lag3)
-        crop_raw = recommend_crop(N, P, K, T, H, pH, pred_rain)
+        # Rainfall prediction feeds the crop model's rainfall feature
+        # (same chain as the API's /api/pipeline). The crop step skips the
+        # prediction cache: "Why this crop?" explains this exact row.
+        crop_result = ml_service.recommend_crop_pipeline(month, lag1, lag2, lag3, N, P, K, T, H, pH,
+                                                         crop_cache=None)
+        pred_rain = crop_result["rainfall"]
+        crop_raw = crop_result["crop"]
         crop = crop_display_name(crop_raw)
 
         colA, colB = st.columns(2)
@@ -288,6 +256,7 @@ with tab_pred:
         with colB:
             st.markdown('<div class="metric-card">', unsafe_allow_html=True)
             st.metric("Recommended Crop", crop)
+            st.caption(f"Confidence: {crop_result['confidence']:.0%}")
             st.markdown("</div>", unsafe_allow_html=True)
 
         with st.expander("View detailed input summary"):
@@ -305,16 +274,26 @@ with tab_pred:
                     "pH": pH,
                     "predicted_rainfall": pred_rain,
                     "recommended_crop": crop_raw,
+                    "top3": dict(zip(crop_result["top3"], crop_result["top3_probs"])),
                 }
             )
 
+        with st.expander("Why this crop?"):
+            why = explain.explain_crop(get_crop_model(), [[N, P, K, T, H, pH, pred_rain]])[0]
+            st.caption(
+                f"Contribution of each input to the {crop_display_name(why['crop'])} probability "
+                f"(base rate {why['bias']:.0%})"
+            )
+            st.bar_chart(why["contributions"])
+
 # ----------------- Evaluation Tab -----------------
 with tab_eval:
     st.markdown('<div class="section-title">Rainfall Model Metrics</div>', unsafe_allow_html=True)
-    Xr, yr, features_r = prepare_rain_data(df_rain)
-    pred_r = rf_rain.predict(Xr)
-    mae = mean_absolute_error(yr, pred_r)
-    rmse = np.sqrt(mean_squared_error(yr, pred_r))
+    rain_eval = load_rainfall_eval(
+        evaluation.fingerprint(cfg.RAINFALL_MODEL_PATH), evaluation.fingerprint(cfg.RAINFALL_CSV)
+    )
+    mae = rain_eval["mae"]
+    rmse = rain_eval["rmse"]
 
     c1, c2 = st.columns(2)
     with c1:
@@ -323,50 +302,29 @@ with tab_eval:
         st.metric("RMSE", f"{rmse:.2f} mm")
 
     st.markdown("### Feature Importance (Rainfall)")
-    fig1, ax1 = plt.subplots()
-    ax1.bar(features_r, rf_rain.feature_importances_)
-    ax1.set_ylabel("Importance")
-    ax1.set_xlabel("Feature")
-    st.pyplot(fig1)
+    st.pyplot(importance_figure(tuple(rain_eval["features"]), tuple(rain_eval["feature_importances"])))
 
     st.markdown("---")
     st.markdown('<div class="section-title">Crop Model Metrics</div>', unsafe_allow_html=True)
 
-    Xc = df_crop[cfg.CROP_FEATURE_COLS]
-    yc = df_crop[cfg.CROP_TARGET_COL]
-    yc_pred = rf_crop.predict(Xc)
+    crop_model_sha = evaluation.fingerprint(cfg.CROP_MODEL_PATH)
+    crop_data_sha = evaluation.fingerprint(cfg.CROP_CSV)
+    crop_metrics, crop_arrays = load_crop_eval(crop_model_sha, crop_data_sha)
 
-    acc = accuracy_score(yc, yc_pred)
+    acc = crop_metrics["accuracy"]
     st.metric("Accuracy", f"{acc:.3f}")
 
     st.markdown("### Classification Report")
-    report_text = classification_report(yc, yc_pred)
+    report_text = crop_metrics["report_text"]
     st.text(report_text)
 
     st.markdown("### Feature Importance (Crop)")
-    fig2, ax2 = plt.subplots()
-    ax2.bar(cfg.CROP_FEATURE_COLS, rf_crop.feature_importances_)
-    ax2.set_ylabel("Importance")
-    ax2.set_xlabel("Feature")
-    st.pyplot(fig2)
+    st.pyplot(importance_figure(tuple(crop_metrics["features"]), tuple(crop_metrics["feature_importances"])))
 
     st.markdown("### Confusion Matrix")
-    labels = sorted(df_crop[cfg.CROP_TARGET_COL].unique())
-    cm = confusion_matrix(yc, yc_pred, labels=labels)
-
-    fig3, ax3 = plt.subplots(figsize=(8, 8))
-    im = ax3.imshow(cm, cmap="Blues")
-    ax3.set_xticks(range(len(labels)))
-    ax3.set_yticks(range(len(labels)))
-    ax3.set_xticklabels(labels, rotation=90)
-    ax3.set_yticklabels(labels)
-    ax3.set_xlabel("Predicted")
-    ax3.set_ylabel("True")
-    for i in range(len(labels)):
-        for j in range(len(labels)):
-            ax3.text(j, i, cm[i, j], ha="center", va="center", color="black", fontsize=6)
-    fig3.colorbar(im)
-    st.pyplot(fig3)
+    st.pyplot(confusion_figure(
+        crop_model_sha, crop_data_sha, list(crop_arrays["labels"]), crop_arrays["confusion_matrix"]
+    ))
 
     summary_buf = io.StringIO()
     summary_buf.write("Rainfall Model:\n")
@@ -0,0 +1,294 @@
+"""
+Score large CSV / Parquet files with the crop model, outside the API.
+
+The input needs the CROP_FEATURE_COLS columns (N, P, K, temperature,
+humidity, ph, rainfall); other columns are ignored unless listed with
+--keep. It is streamed in --chunk-rows chunks, so memory stays flat
+whatever the file size:
+
+    read chunk -> feature matrix -> crop_top_k (one predict_proba) -> append
+
+With --jobs > 1, chunks are scored in a process pool (each worker loads
+the model once) with a bounded number of chunks in flight. Results are
+still written in input order.
+
+Output columns: the --keep columns, then crop, confidence,
+top3_1..top3_3 and top3_prob_1..top3_prob_3. Rows with a missing or
+non-numeric feature get an empty crop and an error message.
+    .csv      one CSV file, appended chunk by chunk
+    .parquet  a directory of part-NNNNN.parquet files, one per chunk
+              (pandas.read_parquet / pyarrow read it as one table)
+
+Resuming: after every chunk is flushed to disk, <output>.progress.json
+records how many input rows are done. If the run is interrupted, run the
+same command again. It drops any partially written chunk and continues
+from the next row. The file is removed when the run completes.
+
+Usage (from src/):
+    python bulk_score.py soil_tests.csv predictions.csv
+    python bulk_score.py soil_tests.parquet predictions.parquet --jobs 4 --keep sample_id
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import inference
+import project_config as cfg
+from model_registry import ENGINES, CROP, cached_checksum, make_loader
+
+TOP_K = 3
+
+
+def is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+# -------------------------------------------------
+# Reading
+# -------------------------------------------------
+def read_chunks(path, columns, chunk_rows, skip_rows=0):
+    """DataFrames of at most chunk_rows rows, starting after skip_rows data rows."""
+    if is_parquet(path):
+        yield from _read_parquet(path, columns, chunk_rows, skip_rows)
+        return
+    with open(path, newline="") as f:
+        header = next(csv.reader([f.readline()]))
+        # Skip done rows line by line (a skiprows list would hold them all in memory).
+        deque(itertools.islice(f, skip_rows), maxlen=0)
+        reader = pd.read_csv(f, header=None, names=header, usecols=columns,
+                             chunksize=chunk_rows)
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def _read_parquet(path, columns, chunk_rows, skip_rows):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    # Whole row groups before skip_rows are never read.
+    first_group, skipped = 0, 0
+    while (first_group < parquet.num_row_groups
+           and skipped + parquet.metadata.row_group(first_group).num_rows <= skip_rows):
+        skipped += parquet.metadata.row_group(first_group).num_rows
+        first_group += 1
+
+    row_groups = range(first_group, parquet.num_row_groups)
+    pending = skip_rows - skipped
+    for batch in parquet.iter_batches(batch_size=chunk_rows, row_groups=row_groups,
+                                      columns=columns):
+        if pending:
+            drop = min(pending, batch.num_rows)
+            batch, pending = batch.slice(drop), pending - drop
+            if not batch.num_rows:
+                continue
+        yield batch.to_pandas()
+
+
+def feature_matrix(chunk):
+    """float64 matrix in CROP_FEATURE_COLS order; non-numeric cells become NaN."""
+    features = chunk[cfg.CROP_FEATURE_COLS]
+    if any(dtype.kind not in "biuf" for dtype in features.dtypes):
+        features = features.apply(pd.to_numeric, errors="coerce")
+    return features.to_numpy(dtype=np.float64)
+
+
+# -------------------------------------------------
+# Scoring (runs in the pool workers with --jobs > 1)
+# -------------------------------------------------
+_model = None
+
+
+def init_worker(model_path, engine):
+    global _model
+    _model = make_loader(engine)(model_path)
+
+
+def score(X):
+    """Output columns for one chunk's feature matrix."""
+    n = X.shape[0]
+    valid = np.isfinite(X).all(axis=1)
+    labels = np.full((n, TOP_K), "", dtype=object)
+    probs = np.full((n, TOP_K), np.nan)
+    if valid.any():
+        top_labels, top_proba = inference.crop_top_k(_model, X[valid], TOP_K)
+        k = top_labels.shape[1]
+        labels[valid, :k] = top_labels
+        probs[valid, :k] = top_proba
+
+    columns = {"crop": labels[:, 0], "confidence": probs[:, 0]}
+    for i in range(TOP_K):
+        columns[f"top3_{i + 1}"] = labels[:, i]
+    for i in range(TOP_K):
+        columns[f"top3_prob_{i + 1}"] = probs[:, i]
+    columns["error"] = np.where(valid, "", "missing or non-numeric feature")
+    return columns
+
+
+def scored_chunks(chunks, jobs, model_path, engine):
+    """(chunk, output columns) pairs in input order."""
+    if jobs <= 1:
+        init_worker(model_path, engine)
+        for chunk in chunks:
+            yield chunk, score(feature_matrix(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(model_path, engine)) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, pool.submit(score, feature_matrix(chunk))))
+            if len(in_flight) >= 2 * jobs:  # bounds memory: never more than 2 chunks per worker
+                chunk, future = in_flight.popleft()
+                yield chunk, future.result()
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield chunk, future.result()
+
+
+# -------------------------------------------------
+# Writing + checkpoints
+# -------------------------------------------------
+class Checkpoint:
+    """<output>.progress.json: rows done so far, and where the output ended then."""
+
+    def __init__(self, output, source):
+        self.path = output + ".progress.json"
+        self.source = source  # identifies the input, model and output columns of this run
+        self.state = {"rows_done": 0, "output_bytes": 0, "parts": 0}
+
+    def load(self):
+        """True if a matching checkpoint was found; raises on a mismatched one."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return False
+        if saved.get("source") != self.source:
+            raise SystemExit(f"{self.path} belongs to a different input, model or "
+                             "--keep list; use --overwrite to start over")
+        self.state = saved["state"]
+        return True
+
+    def save(self, **state):
+        self.state.update(state)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "state": self.state}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CsvWriter:
+    def __init__(self, path, checkpoint):
+        self.path = path
+        mode = "r+b" if checkpoint.state["output_bytes"] else "wb"
+        self.file = open(path, mode)
+        self.file.truncate(checkpoint.state["output_bytes"])  # drop a half-written chunk
+        self.file.seek(0, os.SEEK_END)
+
+    def write(self, frame):
+        frame.to_csv(self.file, header=self.file.tell() == 0, index=False,
+                     lineterminator="\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"output_bytes": self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, checkpoint):
+        self.path = path
+        self.parts = checkpoint.state["parts"]
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):  # parts written after the last checkpoint
+            if name.startswith("part-") and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    def write(self, frame):
+        part = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        frame.to_parquet(part + ".tmp", index=False)
+        os.replace(part + ".tmp", part)
+        self.parts += 1
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def run(args):
+    columns = list(dict.fromkeys(args.keep + cfg.CROP_FEATURE_COLS))
+    stat = os.stat(args.input)
+    checkpoint = Checkpoint(args.output, {
+        "input": os.path.abspath(args.input),
+        "input_bytes": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "model_sha256": cached_checksum(args.model),
+        "keep": args.keep,
+    })
+
+    if args.overwrite:
+        checkpoint.remove()
+    elif checkpoint.load():
+        print(f"resuming after {checkpoint.state['rows_done']} rows", file=sys.stderr)
+    elif os.path.exists(args.output):
+        raise SystemExit(f"{args.output} exists and has no progress file "
+                         "(already complete?); use --overwrite to replace it")
+
+    writer = (ParquetWriter if is_parquet(args.output) else CsvWriter)(args.output, checkpoint)
+    rows_done = checkpoint.state["rows_done"]
+    start, rows_this_run = time.perf_counter(), 0
+    try:
+        chunks = read_chunks(args.input, columns, args.chunk_rows, rows_done)
+        for chunk, outputs in scored_chunks(chunks, args.jobs, args.model, args.engine):
+            frame = chunk[args.keep].reset_index(drop=True).assign(**outputs)
+            position = writer.write(frame)
+            rows_done += len(frame)
+            rows_this_run += len(frame)
+            checkpoint.save(rows_done=rows_done, **position)
+            if args.progress:
+                elapsed = time.perf_counter() - start
+                print(f"{rows_done} rows ({rows_this_run / elapsed:,.0f} rows/s)", file=sys.stderr)
+    finally:
+        writer.close()
+
+    checkpoint.remove()
+    elapsed = time.perf_counter() - start
+    return {"rows": rows_done, "rows_this_run": rows_this_run, "seconds": round(elapsed, 2),
+            "rows_per_second": round(rows_this_run / elapsed) if elapsed else None,
+            "output": args.output}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-score a CSV/Parquet file with the crop model.")
+    parser.add_argument("input", help=".csv or .parquet with CROP_FEATURE_COLS columns")
+    parser.add_argument("output", help=".csv file or .parquet directory")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=1, help="scoring processes (default 1: in-process)")
+    parser.add_argument("--keep", nargs="+", default=[], help="input columns to copy to the output")
+    parser.add_argument("--model", default=cfg.CROP_MODEL_PATH)
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default=ENGINES[CROP])
+    parser.add_argument("--overwrite", action="store_true", help="start over, ignoring progress")
+    parser.add_argument("--progress", action="store_true", help="report every chunk on stderr")
+    args = parser.parse_args()
+    try:
+        print(json.dumps(run(args)))
+    except KeyboardInterrupt:
+        sys.exit("interrupted; run the same command again to resume")
+
+
+if __name__ == "__main__":
+    main()
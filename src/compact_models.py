@@ -0,0 +1,231 @@
+"""
+Shrink the served forests and report what each compaction costs.
+
+Every variant is a FlatForest (forest_engine) derived from the served
+model with FlatForest.compact():
+
+    t<N>     keep the first N trees
+    d<D>     cap the depth at D (deeper subtrees collapse into one leaf)
+    f32      float32 thresholds and node values (branching is unchanged)
+    i32      int32 node indices
+
+For the sklearn model, the uncompacted FlatForest and every
+trees x depths x dtypes combination, the report gives the model quality
+on the project dataset (accuracy for crop, MAE for rainfall, the same
+in-sample evaluation as evaluation.py) and how far each variant moves
+from the served predictions, next to node count, file size, load time,
+single-row latency and per-row latency in a 1000-row batch.
+The served models were fit on all rows, so the dataset metric is
+in-sample and favours deep trees; the shift from the served predictions is
+the better guide for depth caps.
+
+A chosen point is written like train_models.py writes a model:
+models/versions/<name>-<version>.pkl + .json and, unless --no-promote,
+atomically promoted to models/<name>.pkl. The artifact is a pickled
+FlatForest, which serves under either engine (it has predict,
+predict_proba, classes_ and feature_importances_) and loads without
+scikit-learn's per-tree unpickling.
+
+Usage (from src/):
+    python compact_models.py                                  # sweep both models
+    python compact_models.py --only rainfall --trees 100 50 --depths none 16 12
+    python compact_models.py --only rainfall --trees 50 --depths 16 --write
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+import project_config as cfg
+from forest_engine import FlatForest
+from model_registry import load_model
+from train_models import load_crop, load_rainfall, write_artifacts
+
+MODELS = {
+    "crop": (cfg.CROP_MODEL_PATH, load_crop),
+    "rainfall": (cfg.RAINFALL_MODEL_PATH, load_rainfall),
+}
+BATCH_ROWS = 1000
+
+
+# -------------------------------------------------
+# Measurements
+# -------------------------------------------------
+def quality(name, model, X, y, reference):
+    """Dataset metric, plus agreement with the served model's predictions."""
+    pred = model.predict(X)
+    if name == "crop":
+        return {"accuracy": float(np.mean(pred == y)),
+                "agreement": float(np.mean(pred == reference))}
+    pred = np.asarray(pred, dtype=float)
+    return {"mae": float(np.mean(np.abs(pred - y))),
+            "mean_abs_shift": float(np.mean(np.abs(pred - reference)))}
+
+
+def median_seconds(fn, repeats):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def footprint(model, tmp_dir, load_repeats=3):
+    path = os.path.join(tmp_dir, "variant.pkl")
+    joblib.dump(model, path, compress=0)
+    load_seconds = []
+    for _ in range(load_repeats):
+        start = time.perf_counter()
+        load_model(path)
+        load_seconds.append(time.perf_counter() - start)
+    return {"file_mb": round(os.path.getsize(path) / 1e6, 2),
+            "load_ms": round(min(load_seconds) * 1e3, 1)}
+
+
+def latency(name, model, X, repeats):
+    # what inference.py calls: predict_proba for crop, predict for rainfall
+    score = model.predict_proba if name == "crop" else model.predict
+    row = X[:1]
+    batch = X[np.random.default_rng(0).integers(0, len(X), BATCH_ROWS)]
+    return {
+        "latency_us": round(median_seconds(lambda: score(row), repeats) * 1e6, 1),
+        "batch_us_per_row": round(median_seconds(lambda: score(batch), max(3, repeats // 20))
+                                  / BATCH_ROWS * 1e6, 2),
+    }
+
+
+def n_nodes(model):
+    if isinstance(model, FlatForest):
+        return model.n_nodes
+    return int(sum(est.tree_.node_count for est in model.estimators_))
+
+
+def describe(name, variant, model, X, y, reference, args, tmp_dir):
+    return {
+        "variant": variant,
+        "n_nodes": n_nodes(model),
+        **quality(name, model, X, y, reference),
+        **footprint(model, tmp_dir),
+        **latency(name, model, X, args.repeats),
+    }
+
+
+# -------------------------------------------------
+# Variants
+# -------------------------------------------------
+def parse_depth(value):
+    return None if value.lower() == "none" else int(value)
+
+
+DTYPES = {
+    # --dtypes choice: (float32, int32) arguments of FlatForest.compact
+    "float64": (False, False),
+    "float32": (True, False),
+    "float32-int32": (True, True),
+}
+
+
+def variant_name(n_trees, max_depth, dtype):
+    float32, int32 = DTYPES[dtype]
+    parts = [f"t{n_trees}", f"d{max_depth}" if max_depth is not None else "dfull"]
+    return "-".join(parts + (["f32"] if float32 else []) + (["i32"] if int32 else []))
+
+
+def sweep(name, args, tmp_dir):
+    model_path, load_data = MODELS[name]
+    model = load_model(model_path)
+    X, y, _, _ = load_data()
+    flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+    reference = model.predict(X)
+    tree_counts = args.trees or sorted({flat.n_trees, flat.n_trees // 2, flat.n_trees // 4},
+                                       reverse=True)
+
+    rows = [describe(name, "served", model, X, y, reference, args, tmp_dir)]
+    if flat is not model:
+        rows.append(describe(name, "flat", flat, X, y, reference, args, tmp_dir))
+    for n_trees in tree_counts:
+        for max_depth in args.depths:
+            for dtype in args.dtypes:
+                compact = flat.compact(n_trees, max_depth, *DTYPES[dtype])
+                rows.append(describe(name, variant_name(n_trees, max_depth, dtype),
+                                     compact, X, y, reference, args, tmp_dir))
+
+    metric = "accuracy" if name == "crop" else "mae"
+    for row in rows:
+        row[f"{metric}_change"] = round(row[metric] - rows[0][metric], 6) + 0.0  # no -0.0
+    return rows
+
+
+def write(name, args):
+    """Compact the served model to the single --trees/--depths/--dtypes point and save it."""
+    model_path, load_data = MODELS[name]
+    model = load_model(model_path)
+    flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+    n_trees, max_depth, dtype = args.trees[0], args.depths[0], args.dtypes[0]
+    compact = flat.compact(n_trees, max_depth, *DTYPES[dtype])
+
+    X, y, feature_cols, _ = load_data()
+    variant = variant_name(compact.n_trees, max_depth, dtype)
+    metadata = {
+        "name": f"{name}_model",
+        "version": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + f"-{variant}",
+        "model_type": "FlatForest",
+        "compacted_from": os.path.relpath(model_path, cfg.BASE_DIR),
+        "compaction": {"n_trees": compact.n_trees, "max_depth": max_depth, "dtype": dtype},
+        "feature_order": feature_cols,
+        "classes": [str(c) for c in compact.classes_] if compact.classes_ is not None else [],
+        "n_nodes": compact.n_nodes,
+        **quality(name, compact, X, y, model.predict(X)),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    path = write_artifacts(f"{name}_model", compact, metadata, args.model_dir, not args.no_promote)
+    return path, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the forests and report the tradeoffs.")
+    parser.add_argument("--only", choices=list(MODELS), help="just one model")
+    parser.add_argument("--trees", type=int, nargs="+",
+                        help="tree counts to keep (default: all, half, a quarter)")
+    parser.add_argument("--depths", type=parse_depth, nargs="+", default=[None, 16, 12, 8],
+                        help="depth caps, 'none' = uncapped (default: none 16 12 8)")
+    parser.add_argument("--dtypes", choices=list(DTYPES), nargs="+",
+                        default=["float32", "float32-int32"],
+                        help="array precision (default: float32 float32-int32)")
+    parser.add_argument("--repeats", type=int, default=200, help="single-row timing calls")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--write", action="store_true",
+                        help="save the single given --trees/--depths/--dtypes point as a model")
+    parser.add_argument("--model-dir", default=cfg.MODEL_DIR)
+    parser.add_argument("--no-promote", action="store_true",
+                        help="with --write: only write models/versions/")
+    args = parser.parse_args()
+    names = [args.only] if args.only else list(MODELS)
+
+    if args.write:
+        if not args.trees or len(args.trees) != 1 or len(args.depths) != 1 or len(args.dtypes) != 1:
+            parser.error("--write needs exactly one --trees, --depths and --dtypes value")
+        for name in names:
+            path, meta = write(name, args)
+            print(f"{name}: {meta['version']}, {meta['n_nodes']} nodes, "
+                  f"{meta['file_bytes'] / 1e6:.1f} MB -> {path}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = {name: sweep(name, args, tmp_dir) for name in names}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
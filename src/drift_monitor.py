@@ -0,0 +1,238 @@
+"""
+Input drift monitoring: live feature distributions vs the training data.
+
+For each monitored feature (CROP_FEATURE_COLS of /api/recommend-crop, and
+lag1-lag3 of /api/predict-rainfall) the reference distribution is cut
+into N_BINS equal-mass bins at the training CSV's quantiles. Live inputs
+are kept as a rolling window of the last WINDOW rows, stored only as bin
+numbers in a ring buffer plus running bin counts, so adding or evicting
+a row costs O(1) and nothing else is retained.
+
+Request threads only call observe(), which appends the already-validated
+feature matrix to a bounded queue (like metrics.finish_request). A
+background thread per process builds the reference histograms and bins
+the queued rows in bulk with NumPy, woken every FLUSH_EVERY observations
+(and at least every FLUSH_INTERVAL seconds); scores() also bins what is
+queued. The reference build never runs on a request thread: until it is
+done, that model's scores report "warming up".
+
+Scores per feature, on the binned distributions:
+    psi  population stability index (< 0.1 stable, 0.1-0.25 moderate, > 0.25 drift)
+    ks   largest gap between the live and reference CDFs at the bin edges
+         (a lower bound of the exact two-sample KS statistic)
+
+Environment:
+    DRIFT_WINDOW   rows in the rolling window per model (default 5000)
+"""
+import logging
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+import project_config as cfg
+from rain_features import prepare_rain_data
+
+logger = logging.getLogger(__name__)
+
+WINDOW = int(os.environ.get("DRIFT_WINDOW", "5000"))
+N_BINS = 20
+FLUSH_EVERY = 256
+MIN_SAMPLES = 100
+PSI_WARN, PSI_DRIFT = 0.1, 0.25
+# floor for empty bins in the PSI log ratio
+EPSILON = 1e-4
+
+
+class DriftMonitor:
+    """
+    Rolling-window histograms of selected columns of one model's input.
+
+    reference: (n_rows, n_features) training values of the monitored columns
+    columns:   positions of those features in the matrices given to add()
+    """
+
+    def __init__(self, features, reference, columns, window=WINDOW, n_bins=N_BINS):
+        self.features = list(features)
+        self.columns = np.asarray(columns)
+        self.window = window
+        quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+        # Inner edges per feature; repeated quantiles (discrete features) merge bins.
+        self.edges = [np.unique(np.quantile(reference[:, j], quantiles))
+                      for j in range(len(self.features))]
+        sizes = np.array([len(e) + 1 for e in self.edges])
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.n_total_bins = int(sizes.sum())
+
+        ref_counts = np.bincount(self._bins(reference).ravel(), minlength=self.n_total_bins)
+        self.reference = ref_counts / len(reference)
+
+        self.ring = np.full((window, len(self.features)), -1, dtype=np.int32)  # -1 = empty
+        self.pos = 0
+        self.count = 0
+        self.counts = np.zeros(self.n_total_bins, dtype=np.int64)
+        self.seen = 0
+
+    def _bins(self, values):
+        """Global bin number of every value, shape (n_rows, n_features)."""
+        return np.column_stack([
+            np.searchsorted(edges, values[:, j], side="right") + self.offsets[j]
+            for j, edges in enumerate(self.edges)
+        ])
+
+    def add(self, X):
+        X = np.asarray(X, dtype=np.float64)[-self.window:, self.columns]
+        m = len(X)
+        if not m:
+            return
+        bins = self._bins(X)
+        slots = (self.pos + np.arange(m)) % self.window
+        evicted = self.ring[slots].ravel()
+        # +1 shifts the empty marker (-1) into a bin that is dropped
+        self.counts -= np.bincount(evicted + 1, minlength=self.n_total_bins + 1)[1:]
+        self.counts += np.bincount(bins.ravel(), minlength=self.n_total_bins)
+        self.ring[slots] = bins
+        self.pos = (self.pos + m) % self.window
+        self.count = min(self.count + m, self.window)
+        self.seen += m
+
+    def scores(self):
+        out = {}
+        for j, feature in enumerate(self.features):
+            lo, hi = self.offsets[j], self.offsets[j] + len(self.edges[j]) + 1
+            ref = self.reference[lo:hi]
+            entry = {"window_rows": self.count}
+            if self.count < MIN_SAMPLES:
+                entry["status"] = "insufficient data"
+                out[feature] = entry
+                continue
+            live = self.counts[lo:hi] / self.count
+            p, q = np.maximum(live, EPSILON), np.maximum(ref, EPSILON)
+            psi = float(np.sum((p - q) * np.log(p / q)))
+            ks = float(np.max(np.abs(np.cumsum(live) - np.cumsum(ref))))
+            entry.update(
+                psi=round(psi, 4),
+                ks=round(ks, 4),
+                status="drift" if psi > PSI_DRIFT else "warn" if psi > PSI_WARN else "ok",
+            )
+            out[feature] = entry
+        return out
+
+
+# -------------------------------------------------
+# Reference data (training CSVs)
+# -------------------------------------------------
+def _crop_monitor():
+    import pandas as pd
+
+    reference = pd.read_csv(cfg.CROP_CSV)[cfg.CROP_FEATURE_COLS].to_numpy(dtype=np.float64)
+    return DriftMonitor(cfg.CROP_FEATURE_COLS, reference, range(len(cfg.CROP_FEATURE_COLS)))
+
+
+def _rainfall_monitor():
+    X, _, feature_cols = prepare_rain_data()
+    lags = feature_cols[1:]  # [month, lag1, lag2, lag3] -> lags only
+    return DriftMonitor(lags, X[lags].to_numpy(dtype=np.float64), [1, 2, 3])
+
+
+_FACTORIES = {"crop": _crop_monitor, "rainfall": _rainfall_monitor}
+KINDS = tuple(_FACTORIES)
+_monitors = {}
+# Queued input matrices; bounded, since the window never keeps more than WINDOW rows anyway.
+_pending = {kind: deque(maxlen=WINDOW) for kind in _FACTORIES}
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+
+def get_monitor(kind):
+    """The kind's monitor, building its reference histograms first if needed (slow)."""
+    monitor = _monitors.get(kind)
+    if monitor is None:
+        with _lock:
+            monitor = _monitors.get(kind)
+            if monitor is None:
+                monitor = _monitors[kind] = _FACTORIES[kind]()
+    return monitor
+
+
+def warm():
+    """Build the reference histograms now (e.g. in the gunicorn master before fork)."""
+    for kind in _FACTORIES:
+        get_monitor(kind)
+
+
+# -------------------------------------------------
+# Request path
+# -------------------------------------------------
+def observe(kind, X):
+    """Queue a validated input matrix ("crop": CROP_FEATURE_COLS, "rainfall": [month, lag1-3])."""
+    pending = _pending[kind]
+    pending.append(X)
+    if len(pending) >= FLUSH_EVERY:
+        _wake_flusher()
+
+
+def _flush(kind):
+    """Bin the queued rows into an already built monitor's window."""
+    pending = _pending[kind]
+    with _flush_lock:
+        batch = []
+        while pending:
+            batch.append(pending.popleft())
+        if batch:
+            _monitors[kind].add(np.concatenate(batch))
+
+
+def scores():
+    """Current scores; a kind whose reference is still being built reports "warming up"."""
+    _wake_flusher()
+    out = {"window": WINDOW, "bins": N_BINS}
+    for kind in _FACTORIES:
+        monitor = _monitors.get(kind)
+        if monitor is None:
+            out[kind] = {"status": "warming up"}
+            continue
+        _flush(kind)
+        with _flush_lock:
+            out[kind] = {"rows_seen": monitor.seen, "features": monitor.scores()}
+    return out
+
+
+# -------------------------------------------------
+# Background flusher (one thread per process)
+# -------------------------------------------------
+# Builds the reference histograms (a CSV read, ~0.5 s) and bins the queued
+# rows, so neither ever runs on a request thread.
+FLUSH_INTERVAL = 1.0
+
+_wake = threading.Event()
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def warm_in_background():
+    """Start this process's flusher now, so the references are built before traffic."""
+    _wake_flusher()
+
+
+def _wake_flusher():
+    global _flusher_pid
+    if _flusher_pid != os.getpid():
+        with _flusher_lock:
+            if _flusher_pid != os.getpid():
+                threading.Thread(target=_run_flusher, name="drift-monitor", daemon=True).start()
+                _flusher_pid = os.getpid()
+    _wake.set()
+
+
+def _run_flusher():
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        for kind in _FACTORIES:
+            try:
+                get_monitor(kind)
+                _flush(kind)
+            except Exception:
+                logger.exception("[DRIFT] updating the %s monitor failed", kind)
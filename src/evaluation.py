@@ -0,0 +1,172 @@
+"""
+Precomputed model evaluation artifacts for the Streamlit "Model Evaluation" tab.
+
+Metrics are computed once per model version (sha256 of the .pkl plus the
+dataset it is evaluated on) and stored next to the pickle. The model is
+unpickled from that same file, not taken from the registry, whose
+in-memory copy can lag behind a replaced file:
+
+    models/rainfall_model.eval.json   MAE, RMSE, feature importances
+    models/crop_model.eval.json       accuracy, classification report, importances
+    models/crop_model.eval.npz        confusion matrix + label order
+
+Usage (from src/), e.g. right after training:
+    python evaluation.py            # (re)build stale artifacts
+    python evaluation.py --force    # rebuild everything
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import project_config as cfg
+from model_registry import cached_checksum, load_model
+
+ARTIFACT_VERSION = 1
+
+fingerprint = cached_checksum
+
+
+def artifact_paths(model_path):
+    base, _ = os.path.splitext(model_path)
+    return base + ".eval.json", base + ".eval.npz"
+
+
+def _source_key(model_path, data_path):
+    return {
+        "artifact_version": ARTIFACT_VERSION,
+        "model_sha256": fingerprint(model_path),
+        "data_sha256": fingerprint(data_path),
+    }
+
+
+def _evaluate(model_path, data_path, compute):
+    """
+    (source key, compute(model)) with the model unpickled from model_path.
+
+    The key is checked again once compute() is done, so the result is never
+    stored under a model or dataset that changed while it ran.
+    """
+    for _ in range(3):
+        key = _source_key(model_path, data_path)
+        result = compute(load_model(model_path))
+        if _source_key(model_path, data_path) == key:
+            return key, result
+    raise RuntimeError(f"{model_path} or {data_path} kept changing during evaluation")
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# -------------------------------------------------
+# Rainfall model
+# -------------------------------------------------
+def compute_rainfall_eval(model):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    from rain_features import prepare_rain_data
+
+    Xr, yr, features_r = prepare_rain_data()
+    pred_r = model.predict(Xr.to_numpy(dtype=float))
+
+    return {
+        "mae": float(mean_absolute_error(yr, pred_r)),
+        "rmse": float(np.sqrt(mean_squared_error(yr, pred_r))),
+        "n_rows": int(len(yr)),
+        "features": list(features_r),
+        "feature_importances": [float(v) for v in model.feature_importances_],
+    }
+
+
+def rainfall_eval(force=False):
+    json_path, _ = artifact_paths(cfg.RAINFALL_MODEL_PATH)
+    key = _source_key(cfg.RAINFALL_MODEL_PATH, cfg.RAINFALL_CSV)
+
+    cached = None if force else _read_json(json_path)
+    if cached and cached.get("source") == key:
+        return cached
+
+    start = time.perf_counter()
+    key, metrics = _evaluate(cfg.RAINFALL_MODEL_PATH, cfg.RAINFALL_CSV, compute_rainfall_eval)
+    payload = {"source": key, **metrics}
+    payload["compute_seconds"] = round(time.perf_counter() - start, 3)
+    _write_json(json_path, payload)
+    return payload
+
+
+# -------------------------------------------------
+# Crop model
+# -------------------------------------------------
+def compute_crop_eval(model):
+    import pandas as pd
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
+    df_crop = pd.read_csv(cfg.CROP_CSV)
+    yc = df_crop[cfg.CROP_TARGET_COL]
+    yc_pred = model.predict(df_crop[cfg.CROP_FEATURE_COLS].to_numpy(dtype=float))
+
+    labels = sorted(yc.unique())
+    metrics = {
+        "accuracy": float(accuracy_score(yc, yc_pred)),
+        "n_rows": int(len(yc)),
+        "report_text": classification_report(yc, yc_pred),
+        "report": classification_report(yc, yc_pred, output_dict=True),
+        "features": list(cfg.CROP_FEATURE_COLS),
+        "feature_importances": [float(v) for v in model.feature_importances_],
+    }
+    arrays = {
+        "labels": np.array(labels, dtype=str),
+        "confusion_matrix": confusion_matrix(yc, yc_pred, labels=labels),
+    }
+    return metrics, arrays
+
+
+def crop_eval(force=False):
+    """Returns (metrics dict, {"labels", "confusion_matrix"})."""
+    json_path, npz_path = artifact_paths(cfg.CROP_MODEL_PATH)
+    key = _source_key(cfg.CROP_MODEL_PATH, cfg.CROP_CSV)
+
+    cached = None if force else _read_json(json_path)
+    if cached and cached.get("source") == key and os.path.exists(npz_path):
+        with np.load(npz_path) as npz:
+            return cached, {k: npz[k] for k in npz.files}
+
+    start = time.perf_counter()
+    key, (metrics, arrays) = _evaluate(cfg.CROP_MODEL_PATH, cfg.CROP_CSV, compute_crop_eval)
+    payload = {"source": key, **metrics}
+    payload["compute_seconds"] = round(time.perf_counter() - start, 3)
+
+    tmp_path = npz_path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, npz_path)
+    _write_json(json_path, payload)
+    return payload, arrays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build model evaluation artifacts.")
+    parser.add_argument("--force", action="store_true", help="recompute even if up to date")
+    args = parser.parse_args()
+
+    rain = rainfall_eval(force=args.force)
+    print(f"rainfall: MAE {rain['mae']:.2f} mm, RMSE {rain['rmse']:.2f} mm "
+          f"-> {artifact_paths(cfg.RAINFALL_MODEL_PATH)[0]}")
+    crop, _ = crop_eval(force=args.force)
+    print(f"crop: accuracy {crop['accuracy']:.3f} -> {artifact_paths(cfg.CROP_MODEL_PATH)[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Per-prediction explanations: Saabas-style path contributions.
+
+Walking a tree from the root to a leaf, every split moves the node value
+(class probabilities / mean rainfall) by value[child] - value[parent];
+that delta is credited to the parent's split feature. The prediction is
+then exactly
+
+    bias (mean root value over the trees) + sum of per-feature contributions
+
+Because the deltas only depend on the path, PathExplainer precomputes
+once per model, for every leaf, the summed contribution of each feature
+along the path to that leaf (an (n_leaves, n_features, n_outputs) table,
+built level by level with NumPy). Explaining a batch is then one forest
+traversal to find the leaves (FlatForest.apply) plus a gather per tree.
+
+Explainers are cached per model object, so a hot-reloaded model gets a
+new one and the old one is freed with it.
+"""
+import threading
+import weakref
+
+import numpy as np
+
+import project_config as cfg
+from forest_engine import FlatForest
+
+# Bound the (rows, trees, features, outputs) gather of one pass (float64 elements).
+MAX_GATHER_ELEMENTS = 2_000_000
+
+
+class PathExplainer:
+    def __init__(self, model):
+        flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+        value = flat.value.astype(np.float64)
+        n_features, n_outputs = flat.n_features_in_, value.shape[1]
+
+        # Contribution totals from the root down to every node, one tree level at a time.
+        path = np.zeros((flat.n_nodes, n_features, n_outputs))
+        frontier = np.asarray(flat.roots, dtype=np.int64)
+        while frontier.size:
+            parents = frontier[~flat.is_leaf[frontier]]
+            for children in (flat.left[parents], flat.right[parents]):
+                children = np.asarray(children, dtype=np.int64)
+                path[children] = path[parents]
+                path[children, flat.feature[parents]] += value[children] - value[parents]
+            frontier = np.concatenate([flat.left[parents], flat.right[parents]]).astype(np.int64)
+
+        # Only leaves end a path: keep their rows.
+        self.leaf_row = np.cumsum(flat.is_leaf) - 1
+        self.table = np.ascontiguousarray(path[flat.is_leaf])
+        self.bias = value[flat.roots].mean(axis=0)
+        self.flat = flat
+        self.classes_ = flat.classes_
+
+    def contributions(self, X):
+        """(n_rows, n_features, n_outputs) contributions; bias + sum over features = prediction."""
+        leaves = self.flat.apply(X)
+        n_rows, n_trees = leaves.shape
+        rows = self.leaf_row[leaves]
+        out = np.empty((n_rows,) + self.table.shape[1:])
+        step = max(1, MAX_GATHER_ELEMENTS // (n_trees * self.table[0].size))
+        for start in range(0, n_rows, step):
+            out[start:start + step] = self.table[rows[start:start + step]].sum(axis=1)
+        out /= n_trees
+        return out
+
+
+_explainers = weakref.WeakKeyDictionary()  # model object -> PathExplainer
+_lock = threading.Lock()
+
+
+def get_explainer(model):
+    with _lock:
+        explainer = _explainers.get(model)
+        if explainer is None:
+            explainer = _explainers[model] = PathExplainer(model)
+    return explainer
+
+
+def _named(names, values):
+    return {name: round(float(v), 6) for name, v in zip(names, values)}
+
+
+def explain_crop(model, X):
+    """
+    One explanation per row of a CROP_FEATURE_COLS matrix, for the
+    predicted crop: {"crop", "bias", "contributions": {feature: delta}}.
+    """
+    explainer = get_explainer(model)
+    contrib = explainer.contributions(X)                   # (n, features, classes)
+    proba = explainer.bias + contrib.sum(axis=1)
+    best = proba.argmax(axis=1)
+    per_class = np.take_along_axis(contrib, best[:, None, None], axis=2)[:, :, 0]
+    return [
+        {"crop": str(explainer.classes_[c]), "bias": round(float(explainer.bias[c]), 6),
+         "contributions": _named(cfg.CROP_FEATURE_COLS, row)}
+        for c, row in zip(best, per_class)
+    ]
+
+
+def explain_rainfall(model, X):
+    """One {"bias", "contributions"} explanation per row of a [month, lag1, lag2, lag3] matrix."""
+    explainer = get_explainer(model)
+    contrib = explainer.contributions(X)[:, :, 0]
+    bias = round(float(explainer.bias[0]), 6)
+    return [{"bias": bias, "contributions": _named(cfg.RAIN_FEATURE_COLS, row)} for row in contrib]
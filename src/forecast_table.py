@@ -0,0 +1,194 @@
+"""
+Precomputed next-month rainfall forecast for every district.
+
+For each (state, district) the forecast month is the one after its last
+recorded month, and lag1-lag3 are that month's calendar lags
+(rain_features.lag_months, the same lags the model was trained on and
+lag_index serves). All districts that
+need a forecast are scored with one vectorized rf_rain call, and the
+table is written to project_config.FORECAST_TABLE_PATH for the Flask app
+to serve directly.
+
+Refreshes are incremental: every row stores a hash of its district's
+source rows, and only districts whose rows changed (or that are new) are
+re-scored. A different rainfall model forces a full rebuild.
+
+Usage (from src/):
+    python forecast_table.py          # incremental refresh
+    python forecast_table.py --full   # recompute every district
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import project_config as cfg
+from model_registry import cached_checksum, get_rainfall_model
+from lag_index import normalize_name
+from rain_features import feature_table, lag_months
+
+TABLE_VERSION = 2
+
+
+def _district_inputs(table):
+    """
+    Per (state, district): source-row hash, forecast month and lags.
+
+    Districts missing one of the lag months are skipped.
+    """
+    states = table[cfg.STATE_COL].to_numpy()
+    districts = table[cfg.DIST_COL].to_numpy()
+    months = table[cfg.MONTH_COL].to_numpy(dtype=np.int64)
+    totals = table["total_rainfall"].to_numpy(dtype=np.float64)
+
+    # table is sorted by (state, district, month): find contiguous groups
+    new_group = np.ones(len(table), dtype=bool)
+    new_group[1:] = (states[1:] != states[:-1]) | (districts[1:] != districts[:-1])
+    starts = np.flatnonzero(new_group)
+    ends = np.append(starts[1:], len(table))
+
+    inputs, skipped = {}, []
+    for start, end in zip(starts, ends):
+        key = (str(states[start]), str(districts[start]))
+        month = int(months[end - 1] % 12 + 1)
+        monthly = np.full(12, np.nan)
+        monthly[months[start:end] - 1] = totals[start:end]
+        lags = monthly[lag_months(month)]
+        if np.isnan(lags).any():
+            skipped.append(key)
+            continue
+        h = hashlib.sha1()
+        h.update(months[start:end].tobytes())
+        h.update(totals[start:end].tobytes())
+        inputs[key] = {
+            "source_hash": h.hexdigest(),
+            "month": month,
+            "lags": lags.tolist(),
+        }
+    return inputs, skipped
+
+
+def _read_table(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_forecast_table(full=False, path=cfg.FORECAST_TABLE_PATH):
+    """Build or incrementally refresh the forecast table. Returns (table, stats)."""
+    start = time.perf_counter()
+    model_sha256 = cached_checksum(cfg.RAINFALL_MODEL_PATH)
+
+    inputs, skipped = _district_inputs(feature_table())
+
+    previous = None if full else _read_table(path)
+    if previous and (previous.get("version") != TABLE_VERSION
+                     or previous.get("model_sha256") != model_sha256):
+        previous = None
+    reusable = {}
+    if previous:
+        for row in previous["rows"]:
+            reusable[(row["state"], row["district"])] = row
+
+    rows, todo = {}, []
+    for key, inp in inputs.items():
+        old = reusable.get(key)
+        if old is not None and old["source_hash"] == inp["source_hash"]:
+            rows[key] = old
+        else:
+            todo.append(key)
+
+    if todo:
+        X = np.array([[inputs[k]["month"], *inputs[k]["lags"]] for k in todo], dtype=float)
+        preds = get_rainfall_model().predict(X)
+        for key, pred in zip(todo, preds):
+            inp = inputs[key]
+            rows[key] = {
+                "state": key[0],
+                "district": key[1],
+                "month": inp["month"],
+                "lag1": inp["lags"][0],
+                "lag2": inp["lags"][1],
+                "lag3": inp["lags"][2],
+                "rainfall": float(pred),
+                "source_hash": inp["source_hash"],
+            }
+
+    table = {
+        "version": TABLE_VERSION,
+        "model_sha256": model_sha256,
+        "data_sha256": cached_checksum(cfg.RAINFALL_CSV),
+        "generated_at": time.time(),
+        "rows": [rows[k] for k in sorted(rows)],
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table, f)
+    os.replace(tmp_path, path)
+
+    stats = {
+        "districts": len(rows),
+        "recomputed": len(todo),
+        "reused": len(rows) - len(todo),
+        "removed": len(set(reusable) - set(rows)),
+        "skipped_missing_history": len(skipped),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return table, stats
+
+
+# -------------------------------------------------
+# Serving (used by app_flask)
+# -------------------------------------------------
+class ForecastNotAvailableError(RuntimeError):
+    """The forecast table has not been built yet."""
+
+
+_lock = threading.Lock()
+_served = {"stat": None, "table": None, "by_state": None}
+
+
+def load_forecast(path=cfg.FORECAST_TABLE_PATH):
+    """
+    The current table as (table, {normalize_name(state): [rows]}), re-read
+    only when the file on disk changes.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise ForecastNotAvailableError(
+            "rainfall forecast table not built yet (run: python forecast_table.py)"
+        )
+    stat_key = (st.st_mtime_ns, st.st_size)
+    if _served["stat"] != stat_key:
+        with _lock:
+            if _served["stat"] != stat_key:
+                table = _read_table(path)
+                if table is None:
+                    raise ForecastNotAvailableError(f"could not read {path}")
+                by_state = {}
+                for row in table["rows"]:
+                    public = {k: v for k, v in row.items() if k != "source_hash"}
+                    by_state.setdefault(normalize_name(row["state"]), []).append(public)
+                _served.update(table=table, by_state=by_state, stat=stat_key)
+    return _served["table"], _served["by_state"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the all-districts rainfall forecast table.")
+    parser.add_argument("--full", action="store_true", help="recompute every district")
+    args = parser.parse_args()
+
+    _, stats = build_forecast_table(full=args.full)
+    print(f"{cfg.FORECAST_TABLE_PATH}: {json.dumps(stats)}")
+
+
+if __name__ == "__main__":
+    main()
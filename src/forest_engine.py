@@ -0,0 +1,241 @@
+"""
+Flattened-tree inference engine for the RandomForest models.
+
+FlatForest copies every tree of a fitted RandomForestClassifier /
+RandomForestRegressor into a handful of contiguous NumPy arrays
+(feature, threshold, left, right, node value) and evaluates all trees at
+once with vectorized gathers. That removes scikit-learn's per-call input
+validation and thread-pool dispatch, which dominate single-row latency.
+
+Results are bit-for-bit identical to scikit-learn:
+- inputs are cast to float32 before comparing, as sklearn's trees do;
+- per-tree outputs are accumulated in tree order and divided by the
+  number of trees, exactly like ForestClassifier.predict_proba /
+  ForestRegressor.predict with n_jobs=1.
+
+A FlatForest is a plain object of NumPy arrays, so joblib.dump/load with
+mmap_mode="r" maps it without copying (shared across gunicorn workers).
+
+FlatForest.compact() derives a smaller forest (fewer trees, capped depth,
+float32/int32 arrays); see compact_models.py for the size/accuracy report.
+"""
+import numpy as np
+
+# Bound the (row, tree) working set of one traversal pass (~2 MB per int64 array).
+MAX_PAIRS_PER_CHUNK = 262_144
+# Levels descended between checks for finished (sample, tree) pairs.
+LEVELS_PER_CHECK = 4
+# Up to this many rows, per-tree outputs are summed with one gather instead of
+# a Python loop over the trees (the loop dominates single-row latency).
+GATHER_MAX_ROWS = 32
+
+
+def round_down_float32(values):
+    """Largest float32 <= each float64 value (inf stays inf)."""
+    rounded = values.astype(np.float32)
+    up = rounded > values
+    rounded[up] = np.nextafter(rounded[up], np.float32(-np.inf))
+    return rounded
+
+
+class FlatForest:
+    """
+    Leaves point to themselves (left == right == own index, threshold = +inf),
+    so a pair that reached its leaf can keep "descending" harmlessly and
+    finished pairs only need to be filtered out every few levels.
+    """
+
+    def __init__(self, feature, threshold, left, right, is_leaf, value, roots,
+                 n_features_in_, feature_importances_, classes_=None):
+        # int64 / float64 as built by from_sklearn; int32 / float32 after compact()
+        self.feature = feature            # (n_nodes,) int, 0 for leaves
+        self.threshold = threshold        # (n_nodes,) float, +inf for leaves
+        self.left = left                  # (n_nodes,) int global index, self for leaves
+        self.right = right                # (n_nodes,) int global index, self for leaves
+        self.is_leaf = is_leaf            # (n_nodes,) bool
+        self.value = value           # (n_nodes, n_outputs) float, normalised like sklearn
+        self.roots = roots                # (n_trees,) int
+        self.n_features_in_ = n_features_in_
+        self.feature_importances_ = feature_importances_
+        self.classes_ = classes_          # None for regressors
+
+    # ---------- construction ----------
+    @classmethod
+    def from_sklearn(cls, model):
+        is_classifier = hasattr(model, "classes_")
+        feature, threshold, left, right, leaf, values, roots = [], [], [], [], [], [], []
+        offset = 0
+
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+
+            own = np.arange(offset, offset + n)
+
+            roots.append(offset)
+            leaf.append(is_leaf)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+
+            if is_classifier:
+                # Same normalisation as DecisionTreeClassifier.predict_proba
+                value = tree.value[:, 0, :len(model.classes_)].astype(np.float64)
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            else:
+                value = tree.value[:, 0, :1].astype(np.float64)
+            values.append(value)
+            offset += n
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(feature), dtype=np.int64),
+            threshold=np.ascontiguousarray(np.concatenate(threshold), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(left), dtype=np.int64),
+            right=np.ascontiguousarray(np.concatenate(right), dtype=np.int64),
+            is_leaf=np.concatenate(leaf),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int64),
+            n_features_in_=model.n_features_in_,
+            feature_importances_=np.asarray(model.feature_importances_),
+            classes_=np.asarray(model.classes_) if is_classifier else None,
+        )
+
+    def compact(self, n_trees=None, max_depth=None, float32=False, int32=False):
+        """
+        A smaller copy of this forest.
+
+        n_trees:   keep only the first n_trees trees (a random forest's trees
+                   are exchangeable, so any prefix is a smaller forest).
+        max_depth: turn every node at that depth into a leaf predicting its
+                   own node value (the training-sample mean / class fractions)
+                   and drop the subtrees below it.
+        float32:   float32 thresholds and values. Thresholds are rounded
+                   *down* to float32, so `x <= t` gives the same branch for
+                   every float32 input; only the float32 leaf values change
+                   predictions, by rounding.
+        int32:     int32 node indices and features (smaller, but every
+                   gather converts them back to intp, so traversal is slower).
+
+        feature_importances_ are carried over unchanged.
+        """
+        roots = self.roots[:n_trees]
+        keep = np.zeros(self.n_nodes, dtype=bool)
+        is_leaf = self.is_leaf.copy()
+
+        # Walk all trees level by level; nodes never reached are dropped.
+        frontier, depth = roots.astype(np.int64), 0
+        while frontier.size:
+            keep[frontier] = True
+            if max_depth is not None and depth >= max_depth:
+                is_leaf[frontier] = True
+                break
+            inner = frontier[~self.is_leaf[frontier]]
+            frontier = np.concatenate([self.left[inner], self.right[inner]])
+            depth += 1
+
+        nodes = np.flatnonzero(keep)  # ascending, so trees stay contiguous and in order
+        remap = np.cumsum(keep) - 1   # old global index -> new global index
+        is_leaf = is_leaf[nodes]
+        own = np.arange(len(nodes))
+        index_dtype = np.int32 if int32 else np.int64
+        float_dtype = np.float32 if float32 else np.float64
+
+        threshold = np.where(is_leaf, np.inf, self.threshold[nodes])
+        if float32:
+            threshold = round_down_float32(threshold)
+        return FlatForest(
+            feature=np.where(is_leaf, 0, self.feature[nodes]).astype(index_dtype),
+            threshold=np.ascontiguousarray(threshold, dtype=float_dtype),
+            left=np.where(is_leaf, own, remap[self.left[nodes]]).astype(index_dtype),
+            right=np.where(is_leaf, own, remap[self.right[nodes]]).astype(index_dtype),
+            is_leaf=is_leaf,
+            value=np.ascontiguousarray(self.value[nodes], dtype=float_dtype),
+            roots=remap[roots].astype(index_dtype),
+            n_features_in_=self.n_features_in_,
+            feature_importances_=self.feature_importances_,
+            classes_=self.classes_,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    # ---------- traversal ----------
+    def _prepare(self, X):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has shape {X.shape}, expected (n_samples, {self.n_features_in_})"
+            )
+        # sklearn trees see float32 inputs; compare in float64 like the Cython code
+        # does, or in float32 against rounded-down float32 thresholds (same branches).
+        return np.ascontiguousarray(X, dtype=np.float32).astype(self.threshold.dtype, copy=False)
+
+    def apply(self, X):
+        """Global leaf index for every (sample, tree): shape (n_samples, n_trees)."""
+        X = self._prepare(X)
+        n_samples, n_trees = X.shape[0], self.n_trees
+        leaves = np.empty((n_samples, n_trees), dtype=np.int64)
+        rows_per_chunk = max(1, MAX_PAIRS_PER_CHUNK // max(n_trees, 1))
+
+        for start in range(0, n_samples, rows_per_chunk):
+            stop = min(start + rows_per_chunk, n_samples)
+            leaves[start:stop] = self._apply_chunk(X[start:stop])
+        return leaves
+
+    def _apply_chunk(self, X):
+        n_samples, n_features = X.shape
+        n_trees = self.n_trees
+        X_flat = X.ravel()
+
+        # Active (sample, tree) pairs; finished pairs are dropped every few levels.
+        pair = np.arange(n_samples * n_trees, dtype=np.int64)
+        node = np.tile(self.roots, n_samples)
+        row_base = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, n_trees)
+        out = np.empty(n_samples * n_trees, dtype=np.int64)
+
+        left, right, feature, threshold = self.left, self.right, self.feature, self.threshold
+        while pair.size:
+            for _ in range(LEVELS_PER_CHECK):
+                x = X_flat[row_base + feature[node]]
+                node = np.where(x <= threshold[node], left[node], right[node])
+            done = self.is_leaf[node]
+            if done.any():
+                out[pair[done]] = node[done]
+                keep = ~done
+                pair, node, row_base = pair[keep], node[keep], row_base[keep]
+
+        return out.reshape(n_samples, n_trees)
+
+    def _accumulate(self, X):
+        leaves = self.apply(X)
+        if leaves.shape[0] <= GATHER_MAX_ROWS:
+            # One gather; cumsum adds the trees strictly in order, like the loop below.
+            acc = np.cumsum(self.value[leaves], axis=1, dtype=np.float64)[:, -1]
+        else:
+            acc = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+            # Tree-by-tree in estimator order so float rounding matches sklearn.
+            for t in range(self.n_trees):
+                acc += self.value[leaves[:, t]]
+        acc /= self.n_trees
+        return acc
+
+    # ---------- sklearn-compatible API ----------
+    def predict_proba(self, X):
+        if self.classes_ is None:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._accumulate(X)
+
+    def predict(self, X):
+        acc = self._accumulate(X)
+        if self.classes_ is None:
+            return acc[:, 0]
+        return self.classes_.take(np.argmax(acc, axis=1), axis=0)
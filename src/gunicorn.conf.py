@@ -0,0 +1,87 @@
+"""
+Gunicorn settings for the Flask API.
+
+Run from src/:
+    gunicorn -c gunicorn.conf.py app_flask:app
+
+With MODEL_PRELOAD=1 (default) the app, both models, the rainfall lag
+index and the similar-fields index are loaded once in the master before
+forking. Workers then share the forests' pages copy-on-write instead of
+each unpickling its own copy; gc.freeze() moves
+the loaded objects out of the collector's generations so a worker's GC
+passes don't write to (and un-share) those pages.
+
+A hot reload (model_registry) happens per worker, so after a model file
+is replaced each worker holds a private copy. `kill -HUP <master>` shares
+again: gunicorn does not re-import a preloaded app on HUP, so on_reload
+reloads the changed models and indexes in the master itself before the
+new workers are forked from it.
+
+With MODEL_PRELOAD=0 each worker instead starts loading the models in a
+background thread as soon as it is up (post_worker_init), so it answers
+/health/live at once and /health/ready turns 200 when the models are in.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+preload_app = os.environ.get("MODEL_PRELOAD", "1") != "0"
+
+
+def pre_fork(server, worker):
+    # Master: give the new worker the lowest free slot, so a recycled
+    # worker's replacement reuses its log files (prediction_log).
+    used = {getattr(w, "slot", None) for w in server.WORKERS.values()}
+    worker.slot = next(i for i in range(len(used) + 1) if i not in used)
+
+
+def post_fork(server, worker):
+    import prediction_log
+
+    prediction_log.set_worker_slot(worker.slot)
+
+
+def post_worker_init(worker):
+    # Runs in each worker after fork; nothing to do if the master preloaded.
+    if preload_app:
+        return
+    import drift_monitor
+    import similar_fields
+    from model_registry import registry
+
+    registry.warm_in_background()
+    drift_monitor.warm_in_background()
+    similar_fields.warm_in_background()
+
+
+def _preload_master(server, action):
+    import drift_monitor
+    from lag_index import get_lag_index
+    from model_registry import registry
+    from similar_fields import get_field_index
+
+    registry.reload_all()
+    get_lag_index()      # both indexes rebuild themselves when their CSV changed
+    get_field_index()
+    drift_monitor.warm()
+    # Unfreeze first so objects replaced by a reload can be collected.
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+    server.log.info("%s models in master: %s", action, {
+        name: s["version"] for name, s in registry.status().items()
+    })
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported, before workers fork.
+    if preload_app:
+        _preload_master(server, "Preloaded")
+
+
+def on_reload(server):
+    # Runs in the master on HUP, before the new workers are forked.
+    if preload_app:
+        _preload_master(server, "Reloaded")
@@ -0,0 +1,93 @@
+"""
+Shared inference helpers used by the Flask API, ml_service and Streamlit.
+
+The crop model is only ever evaluated once per input: class probabilities
+are computed with predict_proba and the label, confidence and top-k are
+all derived from that single matrix.
+"""
+import numpy as np
+
+import metrics
+
+# Above this many classes a partial sort (argpartition) beats a full argsort.
+ARGPARTITION_MIN_CLASSES = 16
+
+
+def top_k_indices(proba, k=3):
+    """
+    Column indices of the k largest probabilities per row, best first.
+
+    Ties are broken by the lower class index, which keeps the first entry
+    identical to np.argmax (and therefore to RandomForestClassifier.predict).
+    """
+    proba = np.asarray(proba)
+    n_classes = proba.shape[1]
+    k = min(k, n_classes)
+
+    if n_classes >= ARGPARTITION_MIN_CLASSES and k < n_classes:
+        cand = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+        cand.sort(axis=1)  # lower index first so the stable sort breaks ties like argmax
+        cand_proba = np.take_along_axis(proba, cand, axis=1)
+        order = np.argsort(-cand_proba, axis=1, kind="stable")
+        return np.take_along_axis(cand, order, axis=1)
+
+    return np.argsort(-proba, axis=1, kind="stable")[:, :k]
+
+
+def crop_top_k(model, X, k=3):
+    """
+    The k most likely crops per row of a 2D feature matrix, best first.
+
+    Returns (labels, probs): a (n_rows, k) array of class labels and the
+    matching (n_rows, k) probabilities. Models without predict_proba give
+    k = 1 with probability 1.0.
+    """
+    if not hasattr(model, "predict_proba"):
+        labels = np.asarray(model.predict(X)).reshape(-1, 1)
+        return labels, np.ones(labels.shape, dtype=float)
+
+    proba = model.predict_proba(X)  # shape (n_rows, n_classes)
+    metrics.mark("predict")
+    top_idx = top_k_indices(proba, k)
+    top_proba = np.take_along_axis(proba, top_idx, axis=1)
+    metrics.mark("topk")
+    return np.asarray(model.classes_).take(top_idx), top_proba
+
+
+def predict_crop_batch(model, X, k=3):
+    """
+    Score a 2D feature matrix with the crop model.
+
+    Returns one dict per row:
+      {"crop", "confidence", "top3", "top3_probs"}
+    """
+    X = np.asarray(X, dtype=float)
+    if X.shape[0] == 0:
+        return []
+
+    top_labels, top_proba = crop_top_k(model, X, k)
+    results = []
+    for row_labels, probs in zip(top_labels, top_proba):
+        labels = [str(label) for label in row_labels]
+        results.append({
+            "crop": labels[0],
+            "confidence": float(probs[0]),
+            "top3": labels,
+            "top3_probs": [float(p) for p in probs],
+        })
+    return results
+
+
+def predict_crop(model, X, k=3):
+    """Single-row version of predict_crop_batch."""
+    return predict_crop_batch(model, np.asarray(X, dtype=float).reshape(1, -1), k)[0]
+
+
+def predict_rainfall_batch(model, X):
+    """Predicted rainfall (mm) for each row of a [month, lag1, lag2, lag3] matrix."""
+    X = np.asarray(X, dtype=float)
+    if X.shape[0] == 0:
+        return np.empty(0, dtype=float)
+    preds = np.asarray(model.predict(X), dtype=float)
+    metrics.mark("predict")
+    return preds
@@ -0,0 +1,112 @@
+"""
+In-memory lag lookup over the IMD rainfall history.
+
+For every (state, district) the monthly totals are stored as one contiguous
+float64 array of length 12 (index = month - 1, NaN where the month is
+missing), and every state keeps a stacked (n_districts, 12) matrix so all
+of its districts can be resolved with one fancy-index.
+
+Lags for a target month m are the totals of months m-1, m-2 and m-3
+(rain_features.lag_months, the definition the rainfall model is trained
+on), wrapping around the single recorded year for January-March.
+"""
+import threading
+
+import numpy as np
+
+import project_config as cfg
+from model_registry import cached_checksum
+from rain_features import feature_table, lag_months
+
+
+def normalize_name(name):
+    """Lookup key for a state or district name: whitespace collapsed, lower case."""
+    return " ".join(str(name).split()).lower()
+
+
+class LocationNotFoundError(KeyError):
+    """Unknown state or district."""
+
+
+class MissingHistoryError(ValueError):
+    """A district has no recorded rainfall for one of the lag months."""
+
+
+class LagIndex:
+    def __init__(self, table):
+        states = table[cfg.STATE_COL].to_numpy()
+        districts = table[cfg.DIST_COL].to_numpy()
+        months = table[cfg.MONTH_COL].to_numpy(dtype=np.int64)
+        totals = table["total_rainfall"].to_numpy(dtype=np.float64)
+
+        keys = [(normalize_name(s), normalize_name(d)) for s, d in zip(states, districts)]
+        unique_keys = list(dict.fromkeys(keys))
+        row_of = {k: i for i, k in enumerate(unique_keys)}
+
+        monthly = np.full((len(unique_keys), 12), np.nan)
+        rows = np.fromiter((row_of[k] for k in keys), dtype=np.int64, count=len(keys))
+        valid = (months >= 1) & (months <= 12)
+        monthly[rows[valid], months[valid] - 1] = totals[valid]
+
+        names = {}
+        for k, s, d in zip(keys, states, districts):
+            names.setdefault(k, (str(s), str(d)))
+
+        self._district = {}   # (state, district) -> 12-month array (view into a state block)
+        self._state = {}      # state -> (display names, (n, 12) matrix)
+        by_state = {}
+        for i, k in enumerate(unique_keys):
+            by_state.setdefault(k[0], []).append(i)
+        for state_key, idx in by_state.items():
+            block = np.ascontiguousarray(monthly[idx])
+            display = [names[unique_keys[i]] for i in idx]
+            self._state[state_key] = (display, block)
+            for j, i in enumerate(idx):
+                self._district[unique_keys[i]] = (display[j], block[j])
+
+    def states(self):
+        return sorted(names[0][0] for names, _ in self._state.values())
+
+    def lags(self, state, district, month):
+        """(display (state, district), [lag1, lag2, lag3]) for one district."""
+        entry = self._district.get((normalize_name(state), normalize_name(district)))
+        if entry is None:
+            raise LocationNotFoundError(f"unknown district '{district}' in state '{state}'")
+        display, monthly = entry
+        lags = monthly[lag_months(month)]
+        if np.isnan(lags).any():
+            raise MissingHistoryError(
+                f"no rainfall history for {display[1]} ({display[0]}) before month {month}"
+            )
+        return display, lags.tolist()
+
+    def state_lags(self, state, month):
+        """
+        Lags for every district of a state.
+
+        Returns (display names, (n, 3) lag matrix, has_history mask).
+        """
+        entry = self._state.get(normalize_name(state))
+        if entry is None:
+            raise LocationNotFoundError(f"unknown state '{state}'")
+        display, block = entry
+        lags = block[:, lag_months(month)]
+        return display, lags, ~np.isnan(lags).any(axis=1)
+
+
+# -------------------------------------------------
+# Process-wide index (rebuilt when rainfall.csv changes)
+# -------------------------------------------------
+_lock = threading.Lock()
+_current = {"sha256": None, "index": None}
+
+
+def get_lag_index(path=cfg.RAINFALL_CSV):
+    sha256 = cached_checksum(path)
+    if _current["sha256"] == sha256:
+        return _current["index"]
+    with _lock:
+        if _current["sha256"] != sha256:
+            _current["index"] = LagIndex(feature_table(path))
+            _current["sha256"] = sha256
+    return _current["index"]
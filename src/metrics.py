@@ -0,0 +1,209 @@
+"""
+Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+- Counter / Histogram with fixed label names, no external dependency.
+- Per-request stage timing: app_flask opens a RequestTimer for every
+  request; handlers and the inference layer call metrics.mark("stage"),
+  which closes the stage that started at the previous mark. The time from
+  the last mark to the end of the request is recorded as stage "respond".
+- Model-load state, prediction-cache and prediction-log stats are read
+  from their modules at scrape time, so they cost nothing per request.
+
+The request path only appends stage names and perf_counter() readings to
+a per-request list held in a ContextVar (no locks, no bucket search). Finished requests are queued and folded
+into the histograms in bulk with NumPy every FLUSH_EVERY requests and on
+every scrape, which keeps the per-request overhead in the low microseconds.
+"""
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+FLUSH_EVERY = 256
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    """Exposition value: integers exactly, floats at full precision (no %g rounding)."""
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _label_str(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_str(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = np.asarray(buckets, dtype=float)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        self.observe_many(np.array([value], dtype=float), labels)
+
+    def observe_many(self, values, labels=()):
+        """Add an array of observations to one label set."""
+        # side="left": a value equal to a bound belongs to that bucket (le = "<=")
+        idx = np.searchsorted(self.buckets, values, side="left")
+        counts = np.bincount(idx, minlength=len(self.buckets) + 1)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [np.zeros(len(self.buckets) + 1, dtype=np.int64), 0.0, 0]
+            series[0] += counts
+            series[1] += float(values.sum())
+            series[2] += len(values)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, [v[0].cumsum(), v[1], v[2]]) for k, v in self._series.items())
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        for labels, (cumulative, total, count) in items:
+            for le, n in zip(bounds, cumulative.tolist()):
+                label_str = _label_str(self.label_names, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{label_str} {n}")
+            lines.append(f"{self.name}_sum{_label_str(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.label_names, labels)} {count}")
+        return lines
+
+
+# -------------------------------------------------
+# Request / stage instrumentation
+# -------------------------------------------------
+REQUESTS = Counter("agro_requests_total", "HTTP requests by endpoint and status.", ("endpoint", "status"))
+ERRORS = Counter("agro_request_errors_total", "HTTP responses with status >= 400.", ("endpoint", "status"))
+REQUEST_SECONDS = Histogram("agro_request_duration_seconds", "Request latency.", ("endpoint",))
+STAGE_SECONDS = Histogram(
+    "agro_stage_duration_seconds", "Time spent per request stage.", ("endpoint", "stage")
+)
+
+_timer = contextvars.ContextVar("request_timer", default=None)  # per thread / per task
+_pending = deque()          # finished requests waiting to be folded into the metrics
+_flush_lock = threading.Lock()
+_perf_counter = time.perf_counter
+
+
+def start_request(endpoint):
+    # [endpoint, t0, stage1, t1, stage2, t2, ...] - a flat list keeps mark() to two appends
+    _timer.set([endpoint or "unknown", _perf_counter()])
+
+
+def mark(stage):
+    """Close the current stage of the request being handled on this thread (no-op outside one)."""
+    timer = _timer.get()
+    if timer is not None:
+        timer.append(stage)
+        timer.append(_perf_counter())
+
+
+def finish_request(status):
+    timer = _timer.get()
+    if timer is None:
+        return
+    _timer.set(None)
+    timer.append("respond")
+    timer.append(_perf_counter())
+    timer.append(status)
+    _pending.append(timer)
+    if len(_pending) >= FLUSH_EVERY:
+        flush(blocking=False)
+
+
+def flush(blocking=True):
+    """Fold queued requests into the counters and histograms."""
+    if not _flush_lock.acquire(blocking):
+        return  # another thread is already flushing
+    try:
+        groups = {}
+        for _ in range(len(_pending)):
+            timer = _pending.popleft()
+            # key = (endpoint, stage1, ..., "respond", status)
+            groups.setdefault(tuple(timer[0::2]), []).append(timer[1::2])
+        for key, rows in groups.items():
+            endpoint, stages, status = key[0], key[1:-1], key[-1]
+            times = np.array(rows, dtype=float)           # (n requests, len(stages) + 1)
+            labels = (endpoint, str(status))
+            REQUESTS.inc(labels, len(rows))
+            if status >= 400:
+                ERRORS.inc(labels, len(rows))
+            REQUEST_SECONDS.observe_many(times[:, -1] - times[:, 0], (endpoint,))
+            durations = np.diff(times, axis=1)
+            for j, stage in enumerate(stages):
+                STAGE_SECONDS.observe_many(durations[:, j], (endpoint, stage))
+    finally:
+        _flush_lock.release()
+
+
+# -------------------------------------------------
+# Exposition
+# -------------------------------------------------
+_collectors = []
+
+
+def register_collector(fn):
+    """fn() -> list of exposition lines, called on every scrape."""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    flush()
+    lines = []
+    for metric in (REQUESTS, ERRORS, REQUEST_SECONDS, STAGE_SECONDS):
+        lines.extend(metric.collect())
+    for fn in _collectors:
+        lines.extend(fn())
+    return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name, help_text, samples, label_names=(), metric_type="gauge"):
+    """Format [(label values, value), ...] as one gauge (or counter) family."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_label_str(label_names, labels)} {_format_value(value)}")
+    return lines
@@ -1,17 +1,61 @@
-import joblib
 import numpy as np
 from pathlib import Path
-import project_config as cfg
+import inference
+from model_registry import get_crop_model, get_rainfall_model
+from prediction_cache import cached_batch, crop_cache, rain_cache
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-rf_rain = joblib.load(cfg.RAINFALL_MODEL_PATH)
-rf_crop = joblib.load(cfg.CROP_MODEL_PATH)
-
 def predict_rainfall(month, lag1, lag2, lag3):
     X = np.array([[month, lag1, lag2, lag3]])
-    return float(rf_rain.predict(X)[0])
+    return predict_rainfall_batch(X)[0]
 
 def recommend_crop(N, P, K, T, H, pH, rainfall):
+    return recommend_crop_details(N, P, K, T, H, pH, rainfall)["crop"]
+
+def recommend_crop_details(N, P, K, T, H, pH, rainfall):
+    """Label, confidence and top-3 from a single predict_proba call."""
     X = np.array([[N, P, K, T, H, pH, rainfall]])
-    return rf_crop.predict(X)[0]
+    return recommend_crop_batch(X)[0]
+
+def predict_rainfall_batch(X, model=None, cache=rain_cache):
+    """Cached rainfall predictions (list of floats) for a [month, lag1, lag2, lag3] matrix."""
+    model = model if model is not None else get_rainfall_model()
+    return cached_batch(
+        cache, X,
+        lambda M: [float(v) for v in inference.predict_rainfall_batch(model, M)],
+        model,
+    )
+
+def recommend_crop_batch(X, model=None, cache=crop_cache):
+    """
+    Cached crop results (list of dicts) for a matrix in CROP_FEATURE_COLS order.
+    Pass the model version's own cache with a model other than crop_model.pkl,
+    or cache=None to score every row (results that will be explained).
+    """
+    model = model if model is not None else get_crop_model()
+    return cached_batch(cache, X, lambda M: inference.predict_crop_batch(model, M), model)
+
+def recommend_crop_pipeline_batch(X, rain_model=None, crop_model=None, crop_cache=crop_cache):
+    """
+    Rainfall prediction chained into crop recommendation, for a matrix of
+    [month, lag1, lag2, lag3, N, P, K, T, H, pH] rows (as in the Streamlit app).
+
+    One predict over all rows gives the rainfall column, which becomes the
+    last crop feature; one predict_proba then scores all rows. Returns one
+    dict per row: {"rainfall", "crop", "confidence", "top3", "top3_probs"}.
+    crop_cache=None scores the crop step uncached (see recommend_crop_batch).
+    """
+    X = np.asarray(X, dtype=float)
+    rainfall = predict_rainfall_batch(X[:, :4], rain_model)
+
+    X_crop = np.empty((X.shape[0], 7))
+    X_crop[:, :6] = X[:, 4:]     # N, P, K, T, H, pH
+    X_crop[:, 6] = rainfall
+    crops = recommend_crop_batch(X_crop, crop_model, crop_cache)
+    return [{"rainfall": r, **c} for r, c in zip(rainfall, crops)]
+
+def recommend_crop_pipeline(month, lag1, lag2, lag3, N, P, K, T, H, pH, crop_cache=crop_cache):
+    """Single-row version of recommend_crop_pipeline_batch."""
+    X = np.array([[month, lag1, lag2, lag3, N, P, K, T, H, pH]])
+    return recommend_crop_pipeline_batch(X, crop_cache=crop_cache)[0]
@@ -0,0 +1,312 @@
+"""
+Single shared model registry.
+
+Every entry point (Flask API, ml_service, Streamlit) gets its models from
+here, so each process holds exactly one in-memory copy per model file.
+
+- Lazy: a model is unpickled on first use, not at import time (joblib
+  itself is only imported then). warm() / warm_in_background() load
+  ahead of the first request; readiness() reports how far that got.
+- Hot reload: at most every MODEL_RELOAD_INTERVAL seconds the file's
+  mtime/size is checked; when it changed, a background thread verifies the
+  sha256 checksum (if enabled) and loads the new file, then swaps it in
+  atomically. Requests keep getting the old model until the swap, so none
+  of them waits for the checksum or the unpickling, and nothing in flight
+  is dropped.
+"""
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import project_config as cfg
+
+logger = logging.getLogger(__name__)
+
+CROP = "crop"
+RAINFALL = "rainfall"
+
+# Seconds between file checks; <= 0 disables hot reload.
+RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", "5"))
+# Compare sha256 as well as mtime/size before reloading (skips reloads on `touch`).
+VERIFY_CHECKSUM = os.environ.get("MODEL_RELOAD_CHECKSUM", "1") != "0"
+# joblib mmap_mode for uncompressed dumps (see persist_models.py), e.g. "r".
+MMAP_MODE = os.environ.get("MODEL_MMAP_MODE") or None
+# Inference engine per model: "sklearn" (default) or "flat" (forest_engine.FlatForest).
+ENGINES = {
+    CROP: os.environ.get("CROP_MODEL_ENGINE", "sklearn"),
+    RAINFALL: os.environ.get("RAINFALL_MODEL_ENGINE", "sklearn"),
+}
+
+
+def load_model(path):
+    """joblib.load honouring MODEL_MMAP_MODE (ignored by joblib for compressed files)."""
+    import joblib
+
+    return joblib.load(path, mmap_mode=MMAP_MODE)
+
+
+def make_loader(engine):
+    if engine == "sklearn":
+        return load_model
+    if engine == "flat":
+        from forest_engine import FlatForest
+
+        def load_flat(path):
+            model = load_model(path)
+            if isinstance(model, FlatForest):
+                return model
+            return FlatForest.from_sklearn(model)
+
+        return load_flat
+    raise ValueError(f"unknown model engine {engine!r} (expected 'sklearn' or 'flat')")
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when a model file is missing or cannot be loaded."""
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=32)
+def _checksum_for(path, mtime_ns, size):
+    return file_checksum(path)
+
+
+def cached_checksum(path):
+    """sha256 of a file, recomputed only when its mtime/size change."""
+    st = os.stat(path)
+    return _checksum_for(path, st.st_mtime_ns, st.st_size)
+
+
+class _Entry:
+    def __init__(self, name, path, loader):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.model = None
+        self.stat_key = None     # (mtime_ns, size) of the loaded file
+        self.checksum = None
+        self.version = 0         # bumped on every successful (re)load
+        self.current = (None, 0)  # (model, version), swapped as one reference
+        self.loaded_at = None
+        self.last_checked = 0.0
+        self.load_seconds = None
+        self.error = None
+        self.lock = threading.Lock()
+        self.reload_thread = None
+
+
+class ModelRegistry:
+    def __init__(self, reload_interval=RELOAD_INTERVAL, verify_checksum=VERIFY_CHECKSUM):
+        self.reload_interval = reload_interval
+        self.verify_checksum = verify_checksum
+        self._entries = {}
+        self._listeners = []
+        self._warm_thread = None
+        self._reload_lock = threading.Lock()
+
+    # ---------- registration ----------
+    def register(self, name, path, loader=load_model):
+        self._entries[name] = _Entry(name, path, loader)
+
+    def add_reload_listener(self, fn):
+        """fn(name, version) is called after a model is (re)loaded."""
+        self._listeners.append(fn)
+
+    # ---------- lookup ----------
+    def get(self, name):
+        """
+        Return the current model object, loading it on first use. A changed
+        file is reloaded in the background; until then the old model is returned.
+        """
+        entry = self._entries[name]
+        model = entry.model
+
+        if model is None:
+            return self._load(entry)
+
+        if self.reload_interval > 0:
+            now = time.monotonic()
+            if now - entry.last_checked >= self.reload_interval:
+                entry.last_checked = now
+                if self._stat_key(entry.path) != entry.stat_key:
+                    self._reload_in_background(entry)
+
+        return model
+
+    def get_versioned(self, name):
+        """
+        (model, version) from one read, like get(). Use it when something
+        derived from the model is stored under its version: reading the two
+        separately could pair an old model with a newer version.
+        """
+        self.get(name)
+        return self._entries[name].current
+
+    def current(self, name):
+        """The loaded model or None, without loading it or checking the file."""
+        return self._entries[name].current[0]
+
+    def warm(self, names=None):
+        """Load the given (default: all) models now, e.g. in the gunicorn master before fork."""
+        for name in names or list(self._entries):
+            self.get_or_none(name)
+
+    def reload_all(self):
+        """
+        Load every model, and synchronously reload the ones whose file changed
+        (e.g. in the gunicorn master on HUP, where nothing is being served).
+        """
+        for entry in self._entries.values():
+            try:
+                if entry.model is None or self._stat_key(entry.path) != entry.stat_key:
+                    self._load(entry, reload=entry.model is not None)
+            except ModelUnavailableError:
+                pass  # logged and reported by status() / readiness()
+
+    def warm_in_background(self, names=None):
+        """Run warm() in a daemon thread, so startup doesn't wait for the unpickling."""
+        if self._warm_thread is not None and self._warm_thread.is_alive():
+            return self._warm_thread
+        thread = threading.Thread(target=self.warm, args=(names,), name="model-warmup", daemon=True)
+        self._warm_thread = thread
+        thread.start()
+        return thread
+
+    def get_or_none(self, name):
+        try:
+            return self.get(name)
+        except ModelUnavailableError:
+            return None
+
+    def version(self, name):
+        return self._entries[name].version
+
+    def is_loaded(self, name):
+        return self._entries[name].model is not None
+
+    def status(self):
+        return {
+            name: {
+                "path": e.path,
+                "model_type": type(e.model).__name__ if e.model is not None else None,
+                "loaded": e.model is not None,
+                "version": e.version,
+                "checksum": e.checksum,
+                "loaded_at": e.loaded_at,
+                "load_seconds": e.load_seconds,
+                "error": e.error,
+            }
+            for name, e in self._entries.items()
+        }
+
+    def readiness(self):
+        """(ready, details): ready once every registered model is loaded."""
+        models = {}
+        for name, e in self._entries.items():
+            if e.model is not None:
+                state = "loaded"
+            elif e.lock.locked():
+                state = "loading"
+            elif e.error:
+                state = "failed"
+            else:
+                state = "not loaded"
+            models[name] = {"state": state, "error": e.error, "load_seconds": e.load_seconds}
+        warming = self._warm_thread is not None and self._warm_thread.is_alive()
+        ready = all(m["state"] == "loaded" for m in models.values())
+        return ready, {"warming": warming, "models": models}
+
+    # ---------- internals ----------
+    @staticmethod
+    def _stat_key(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload_in_background(self, entry):
+        with self._reload_lock:
+            if entry.reload_thread is not None and entry.reload_thread.is_alive():
+                return
+            entry.reload_thread = threading.Thread(
+                target=self._load, args=(entry, True), name=f"model-reload-{entry.name}", daemon=True
+            )
+            entry.reload_thread.start()
+
+    def _load(self, entry, reload=False):
+        with entry.lock:
+            stat_key = self._stat_key(entry.path)
+
+            # Another thread may have finished the (re)load while we waited.
+            if entry.model is not None and stat_key == entry.stat_key:
+                return entry.model
+
+            if stat_key is None:
+                if entry.model is not None:
+                    # File removed/being replaced: keep serving the old model.
+                    return entry.model
+                entry.error = f"model file not found at {entry.path}"
+                raise ModelUnavailableError(entry.error)
+
+            checksum = None
+            if self.verify_checksum:
+                checksum = file_checksum(entry.path)
+                if entry.model is not None and checksum == entry.checksum:
+                    entry.stat_key = stat_key  # content unchanged (e.g. touched)
+                    return entry.model
+
+            start = time.perf_counter()
+            try:
+                model = entry.loader(entry.path)
+            except Exception as e:
+                entry.error = f"failed to load {entry.path}: {e}"
+                logger.exception("[MODEL] %s", entry.error)
+                if entry.model is not None:
+                    return entry.model
+                raise ModelUnavailableError(entry.error) from e
+
+            entry.load_seconds = time.perf_counter() - start
+            entry.model = model
+            entry.stat_key = stat_key
+            entry.checksum = checksum
+            entry.version += 1
+            entry.current = (model, entry.version)
+            entry.loaded_at = time.time()
+            entry.last_checked = time.monotonic()
+            entry.error = None
+
+        logger.info(
+            "[MODEL] %s %s model from %s in %.2fs (version %d)",
+            "Reloaded" if reload else "Loaded",
+            entry.name, entry.path, entry.load_seconds, entry.version,
+        )
+        for fn in self._listeners:
+            fn(entry.name, entry.version)
+        return model
+
+
+# -------------------------------------------------
+# Process-wide registry
+# -------------------------------------------------
+registry = ModelRegistry()
+registry.register(CROP, cfg.CROP_MODEL_PATH, make_loader(ENGINES[CROP]))
+registry.register(RAINFALL, cfg.RAINFALL_MODEL_PATH, make_loader(ENGINES[RAINFALL]))
+
+
+def get_crop_model():
+    return registry.get(CROP)
+
+
+def get_rainfall_model():
+    return registry.get(RAINFALL)
@@ -0,0 +1,269 @@
+"""
+Named crop model versions: weighted traffic split and shadow scoring.
+
+Versions are declared in models/crop_versions.json (project_config.
+CROP_VERSIONS_PATH, or $CROP_VERSIONS_PATH); without that file only "production" (crop_model.pkl)
+exists and nothing changes:
+
+    {
+      "versions": {"2025-06": "crop_model_2025-06.pkl"},
+      "split":    {"production": 90, "2025-06": 10},
+      "shadow":   ["2025-06"]
+    }
+
+- versions: name -> model file (relative to models/). Each one is a
+  model_registry entry ("crop@<name>"), so it is loaded, hot-reloaded and
+  reported by /health/ready like the production model, and gets its own
+  prediction cache.
+- split: relative weights of the versions that serve responses (default:
+  production only). A request can pin one with ?model_version=<name>.
+- shadow: versions that also score a sample of the requests off the
+  request thread. Request threads only enqueue (served version, features,
+  served results); a small pool of worker threads drains the queue in
+  batches, scores each batch with one predict_proba per shadow version and
+  compares the result with what was served. The worker threads still hold
+  the GIL while they score, so shadow work is capped twice: only a
+  SHADOW_SAMPLE_RATE share of requests is queued, and when the queue is
+  full the request is dropped (counted), never waited for. Measure the cost
+  with `benchmarks/bench_suite.py --shadow`.
+
+Environment:
+    CROP_VERSIONS_PATH   versions file (default models/crop_versions.json)
+    SHADOW_SAMPLE_RATE   share of requests scored in shadow (default 0.1)
+    SHADOW_WORKERS       shadow scoring threads per process (default 1)
+    SHADOW_QUEUE_SIZE    queued requests before shadow work is dropped (default 1000)
+    SHADOW_BATCH_ROWS    rows scored per shadow batch (default 512)
+"""
+import bisect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+
+import numpy as np
+
+import inference
+import project_config as cfg
+from model_registry import registry, CROP, ENGINES, make_loader
+from prediction_cache import add_crop_cache, crop_cache
+
+logger = logging.getLogger(__name__)
+
+PRODUCTION = "production"
+
+SHADOW_SAMPLE_RATE = float(os.environ.get("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_WORKERS = int(os.environ.get("SHADOW_WORKERS", "1"))
+SHADOW_QUEUE_SIZE = int(os.environ.get("SHADOW_QUEUE_SIZE", "1000"))
+SHADOW_BATCH_ROWS = int(os.environ.get("SHADOW_BATCH_ROWS", "512"))
+
+
+class UnknownVersionError(KeyError):
+    """Raised when a request pins a version that is not configured."""
+
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+def load_config(path=os.environ.get("CROP_VERSIONS_PATH", cfg.CROP_VERSIONS_PATH)):
+    """(versions {name: path}, split {name: weight}, shadow [names]); raises ValueError if invalid."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        raw = {}
+
+    versions = {PRODUCTION: cfg.CROP_MODEL_PATH}
+    for name, file in raw.get("versions", {}).items():
+        if name == PRODUCTION:
+            raise ValueError(f"{path}: '{PRODUCTION}' is always {cfg.CROP_MODEL_PATH}")
+        versions[name] = os.path.join(cfg.MODEL_DIR, file)
+
+    split = {name: float(w) for name, w in raw.get("split", {PRODUCTION: 1}).items()}
+    shadow = list(raw.get("shadow", []))
+    unknown = [name for name in [*split, *shadow] if name not in versions]
+    if unknown:
+        raise ValueError(f"{path}: unknown model versions {unknown}")
+    if any(w < 0 for w in split.values()) or not sum(split.values()) > 0:
+        raise ValueError(f"{path}: split weights must be >= 0 with a positive total")
+    return versions, split, shadow
+
+
+def registry_name(version):
+    return CROP if version == PRODUCTION else f"{CROP}@{version}"
+
+
+VERSIONS, SPLIT, SHADOW = load_config()
+
+_caches = {PRODUCTION: crop_cache}
+for _name, _path in VERSIONS.items():
+    if _name != PRODUCTION:
+        registry.register(registry_name(_name), _path, make_loader(ENGINES[CROP]))
+        _caches[_name] = add_crop_cache(registry_name(_name))
+
+# Weighted choice: bisect a uniform draw into the cumulative weights.
+_split_names = [name for name, w in SPLIT.items() if w > 0]
+_split_cumulative = np.cumsum([SPLIT[name] for name in _split_names]).tolist()
+_served = {name: 0 for name in VERSIONS}
+_served_lock = threading.Lock()
+
+
+# -------------------------------------------------
+# Request path
+# -------------------------------------------------
+def route(pinned=None):
+    """Version to serve a request with: the pinned one, else a weighted draw from SPLIT."""
+    if pinned:
+        if pinned not in VERSIONS:
+            raise UnknownVersionError(pinned)
+        version = pinned
+    elif len(_split_names) == 1:
+        version = _split_names[0]
+    else:
+        draw = random.random() * _split_cumulative[-1]
+        version = _split_names[bisect.bisect_right(_split_cumulative, draw)]
+    with _served_lock:
+        _served[version] += 1
+    return version
+
+
+def get_model(version):
+    return registry.get_or_none(registry_name(version))
+
+
+def cache_for(version):
+    return _caches[version]
+
+
+def shadow(version, X, outputs):
+    """Queue a sampled served batch for comparison with every other shadow version (non-blocking)."""
+    if SHADOW and len(outputs) and random.random() < SHADOW_SAMPLE_RATE:
+        get_shadow_scorer().submit(version, X, outputs)
+
+
+# -------------------------------------------------
+# Shadow scoring
+# -------------------------------------------------
+class ShadowScorer:
+    def __init__(self, versions, workers=SHADOW_WORKERS, queue_size=SHADOW_QUEUE_SIZE,
+                 batch_rows=SHADOW_BATCH_ROWS):
+        self.versions = list(versions)
+        self.batch_rows = batch_rows
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.errors = 0
+        # version -> running totals of the comparisons with the served results
+        self._totals = {v: {"compared": 0, "agree": 0, "top3_agree": 0, "confidence_delta": 0.0}
+                        for v in self.versions}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"shadow-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ---------- request thread ----------
+    def submit(self, served, X, outputs):
+        try:
+            self._queue.put_nowait((served, X, outputs))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    # ---------- worker threads ----------
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0][1])
+            while rows < self.batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[1])
+            for version in self.versions:
+                try:
+                    self._compare(version, batch)
+                except Exception:
+                    with self._lock:
+                        self.errors += 1
+                    logger.exception("[SHADOW] scoring with crop model %s failed", version)
+
+    def _compare(self, version, batch):
+        # requests served by this version itself have nothing to compare with
+        items = [(X, outputs) for served, X, outputs in batch if served != version]
+        if not items:
+            return
+        model = get_model(version)
+        if model is None:
+            with self._lock:
+                self.errors += 1
+            return
+        X = np.concatenate([X for X, _ in items])
+        served = [out for _, outputs in items for out in outputs]
+        labels, proba = inference.crop_top_k(model, X, 3)
+
+        served_crop = np.array([out["crop"] for out in served])
+        served_conf = np.array([out["confidence"] for out in served])
+        agree = labels[:, 0] == served_crop
+        top3_agree = (labels == served_crop[:, np.newaxis]).any(axis=1)
+        with self._lock:
+            totals = self._totals[version]
+            totals["compared"] += len(served)
+            totals["agree"] += int(agree.sum())
+            totals["top3_agree"] += int(top3_agree.sum())
+            totals["confidence_delta"] += float(np.abs(proba[:, 0] - served_conf).sum())
+
+    def stats(self):
+        with self._lock:
+            shadow = {
+                v: {
+                    "compared": t["compared"],
+                    "agreement": t["agree"] / t["compared"] if t["compared"] else None,
+                    "top3_agreement": t["top3_agree"] / t["compared"] if t["compared"] else None,
+                    "mean_confidence_delta": (t["confidence_delta"] / t["compared"]
+                                              if t["compared"] else None),
+                }
+                for v, t in self._totals.items()
+            }
+            dropped, errors = self.dropped, self.errors
+        return {"sample_rate": SHADOW_SAMPLE_RATE, "queued": self._queue.qsize(),
+                "dropped": dropped, "errors": errors, "versions": shadow}
+
+
+_scorer = None
+_scorer_pid = None
+_scorer_lock = threading.Lock()
+
+
+def get_shadow_scorer():
+    """The scorer for this process (created lazily, so each gunicorn worker gets its own threads)."""
+    global _scorer, _scorer_pid
+    if _scorer is None or _scorer_pid != os.getpid():
+        with _scorer_lock:
+            if _scorer is None or _scorer_pid != os.getpid():
+                _scorer = ShadowScorer(SHADOW)
+                _scorer_pid = os.getpid()
+    return _scorer
+
+
+def stats():
+    total = sum(SPLIT.values())
+    with _served_lock:
+        served = dict(_served)
+    return {
+        "versions": {
+            name: {
+                "path": path,
+                "weight": SPLIT.get(name, 0) / total,
+                "shadow": name in SHADOW,
+                "loaded": registry.is_loaded(registry_name(name)),
+                "served": served[name],
+            }
+            for name, path in VERSIONS.items()
+        },
+        "shadow": get_shadow_scorer().stats() if SHADOW else None,
+    }
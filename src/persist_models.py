@@ -0,0 +1,68 @@
+"""
+Re-save the model pickles in an mmap-friendly layout.
+
+joblib can only memory-map numpy arrays from *uncompressed* dumps, where
+each array is stored page-aligned in the file. This rewrites
+models/crop_model.pkl and models/rainfall_model.pkl that way (atomically,
+so a running server hot-reloads the new file).
+
+Usage (from src/):
+    python persist_models.py            # rewrite both models
+    python persist_models.py --check    # only report the current format
+
+Load with MODEL_MMAP_MODE=r to map the arrays read-only. Note that
+scikit-learn copies each tree's node/value arrays into its own buffers on
+unpickle, so the big win for multi-worker gunicorn is preloading in the
+master (see gunicorn.conf.py); mmap mainly avoids the double-buffered
+peak while loading.
+"""
+import argparse
+import os
+import time
+
+import joblib
+
+import project_config as cfg
+
+MODEL_PATHS = [cfg.CROP_MODEL_PATH, cfg.RAINFALL_MODEL_PATH]
+
+# zlib/gzip/bz2/xz/lz4 magic numbers written by joblib's compressors
+_COMPRESSED_PREFIXES = (b"\x78", b"\x1f\x8b", b"BZ", b"\xfd7zXZ", b"\x04\x22\x4d\x18", b"ZF")
+
+
+def is_compressed(path):
+    with open(path, "rb") as f:
+        head = f.read(6)
+    return head.startswith(_COMPRESSED_PREFIXES)
+
+
+def rewrite_uncompressed(path):
+    start = time.perf_counter()
+    model = joblib.load(path)
+    tmp_path = path + ".tmp"
+    joblib.dump(model, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite model pickles as uncompressed joblib dumps.")
+    parser.add_argument("--check", action="store_true", help="only report the current format")
+    args = parser.parse_args()
+
+    for path in MODEL_PATHS:
+        if not os.path.exists(path):
+            print(f"{path}: missing")
+            continue
+        fmt = "compressed" if is_compressed(path) else "uncompressed"
+        size_mb = os.path.getsize(path) / 1e6
+        if args.check:
+            print(f"{path}: {fmt}, {size_mb:.1f} MB")
+            continue
+        seconds = rewrite_uncompressed(path)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{path}: rewritten uncompressed ({size_mb:.1f} MB) in {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
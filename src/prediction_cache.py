@@ -0,0 +1,188 @@
+"""
+In-process LRU/TTL cache in front of the crop and rainfall models.
+
+By default the exact feature vector is the cache key, so repeated soil
+tests and preset scenarios skip the forests entirely and every answer is
+exactly what the model would return. With PREDICTION_CACHE_QUANTIZE=1
+inputs are first bucketed per column (project_config.*_CACHE_QUANTIZATION);
+every input in a bucket then gets the result computed for the first one,
+which trades exactness for hit rate.
+
+A batch is looked up and stored under one lock acquisition each, with the
+keys built from the raw bytes of the (quantized) rows in one NumPy pass.
+Each cache is cleared when the model registry reloads the corresponding
+model, and results are only stored while the model that computed them is
+still the registry's current one (a request may have fetched the model
+just before a reload). Extra crop model versions (model_versions.py) get
+a cache of their own from add_crop_cache().
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+import project_config as cfg
+from model_registry import registry, CROP, RAINFALL
+
+CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "4096"))  # 0 disables
+CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "600"))    # seconds, <= 0 = no expiry
+QUANTIZE = os.environ.get("PREDICTION_CACHE_QUANTIZE", "0") == "1"  # lossy buckets (opt-in)
+
+
+class PredictionCache:
+    """model_name: registry entry whose predictions are cached (None: no model check)."""
+
+    def __init__(self, columns, quantization, maxsize=CACHE_SIZE, ttl=CACHE_TTL, model_name=None):
+        steps = np.array([float(quantization.get(c, 0.0)) for c in columns])
+        self.columns = list(columns)
+        self._exact = steps <= 0
+        self._steps = np.where(self._exact, 1.0, steps)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.model_name = model_name
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def keys_for(self, X):
+        """One hashable key (the row's float64 bytes) per row of X."""
+        X = np.asarray(X, dtype=np.float64)
+        Q = np.where(self._exact, X, np.round(X / self._steps)) + 0.0  # + 0.0: -0.0 -> 0.0
+        Q = np.ascontiguousarray(Q)
+        return Q.view(np.dtype((np.void, Q.shape[1] * Q.itemsize))).ravel().tolist()
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """Values (None for a miss) for a list of keys, under one lock acquisition."""
+        now = time.monotonic()
+        data = self._data
+        outputs = []
+        with self._lock:
+            for key in keys:
+                item = data.get(key)
+                if item is not None:
+                    if item[0] is None or item[0] > now:
+                        data.move_to_end(key)
+                        outputs.append(item[1])
+                        continue
+                    del data[key]
+                outputs.append(None)
+            hits = len(outputs) - outputs.count(None)
+            self.hits += hits
+            self.misses += len(outputs) - hits
+        return outputs
+
+    def put(self, key, value, model=None):
+        self.put_many([key], [value], model)
+
+    def put_many(self, keys, values, model=None):
+        """Store values computed by model; dropped if the registry has replaced it since."""
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        # only the last maxsize entries would survive the evictions below
+        start = max(0, len(keys) - self.maxsize)
+        with self._lock:
+            # Checked under the lock: a reload swaps the model before its
+            # listener clear()s this cache, so a put either sees the new
+            # model here and is dropped, or lands before the clear.
+            if (model is not None and self.model_name is not None
+                    and registry.current(self.model_name) is not model):
+                return
+            data = self._data
+            for key, value in zip(keys[start:], values[start:]):
+                data[key] = (expires_at, value)
+                data.move_to_end(key)
+            self.evictions += start
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def cached_batch(cache, X, compute, model=None):
+    """
+    Look every row of X up in the cache and run compute() once on the misses.
+    model is the one compute() scores with; its results are only stored while
+    it is still the registry's current model for the cache.
+
+    compute(X_miss) must return one output per row. Outputs come back in the
+    order of X. cache=None scores every row (e.g. when the results are
+    explained: a quantized hit could be a neighbour's prediction).
+    """
+    X = np.asarray(X, dtype=float)
+    if cache is None or not cache.enabled or X.shape[0] == 0:
+        return list(compute(X))
+
+    keys = cache.keys_for(X)
+    outputs = cache.get_many(keys)
+    miss_idx = [i for i, out in enumerate(outputs) if out is None]
+    metrics.mark("cache")
+
+    if miss_idx:
+        computed = list(compute(X[miss_idx]))
+        for i, out in zip(miss_idx, computed):
+            outputs[i] = out
+        cache.put_many([keys[i] for i in miss_idx], computed, model)
+
+    return outputs
+
+
+# -------------------------------------------------
+# Process-wide caches
+# -------------------------------------------------
+CROP_QUANTIZATION = cfg.CROP_CACHE_QUANTIZATION if QUANTIZE else {}
+RAIN_QUANTIZATION = cfg.RAIN_CACHE_QUANTIZATION if QUANTIZE else {}
+
+crop_cache = PredictionCache(cfg.CROP_FEATURE_COLS, CROP_QUANTIZATION, model_name=CROP)
+rain_cache = PredictionCache(cfg.RAIN_FEATURE_COLS, RAIN_QUANTIZATION, model_name=RAINFALL)
+
+_CACHES = {CROP: crop_cache, RAINFALL: rain_cache}  # registry name -> cache
+
+
+def add_crop_cache(name):
+    """Separate crop cache for another registry entry (a crop model version)."""
+    cache = _CACHES[name] = PredictionCache(cfg.CROP_FEATURE_COLS, CROP_QUANTIZATION,
+                                            model_name=name)
+    return cache
+
+
+def _on_model_reload(name, version):
+    cache = _CACHES.get(name)
+    if cache is not None and version > 1:
+        cache.clear()
+
+
+registry.add_reload_listener(_on_model_reload)
+
+
+def stats():
+    return {name: cache.stats() for name, cache in _CACHES.items()}
@@ -0,0 +1,258 @@
+"""
+Non-blocking structured prediction log.
+
+Request threads only enqueue a small tuple; a background thread turns the
+records into JSON lines, writes them in batches to a file of its own
+process and rotates it by size, so rotations never race:
+
+- gunicorn workers write logs/predictions.w<slot>.jsonl, where the slot
+  (0..workers-1, gunicorn.conf.py pre_fork) is reused by the worker that
+  replaces a recycled one, so the file count stays bounded;
+- any other process writes logs/predictions.<pid>.jsonl; files of pids
+  that are no longer running are deleted when a writer starts.
+
+Read them together with `cat logs/predictions.*.jsonl` or a log shipper.
+ProcessRotatingFileHandler gives app_flask's text log (predictions.log)
+the same per-process naming.
+When the queue backs up the writer degrades by sampling (errors are
+always kept) and, when full, drops records, so a slow disk never blocks
+a request.
+
+Every line has the same fixed schema:
+    {"ts": <unix seconds>, "kind": "crop" | "rainfall" | ...,
+     "inputs": {...} | null, "output": {...} | null, "error": str | null,
+     "sample_rate": <1 / keep-every-N at the time of logging>}
+
+Environment:
+    PREDICTION_LOG=0           disable prediction logging entirely
+    PREDICTION_LOG_PATH        default logs/predictions.jsonl (relative paths are
+                               resolved against the project root, and the slot
+                               or process id is inserted before the extension)
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+import project_config as cfg
+
+LOG_ENABLED = os.environ.get("PREDICTION_LOG", "1") != "0"
+LOG_PATH = os.path.join(
+    cfg.BASE_DIR,
+    os.environ.get("PREDICTION_LOG_PATH", os.path.join(cfg.LOG_DIR, "predictions.jsonl")),
+)
+
+# (queue fill ratio, keep 1 of every N records) - first matching level wins
+SAMPLING_LEVELS = [(0.9, 16), (0.5, 4)]
+
+
+class PredictionLogWriter:
+    def __init__(self, path, max_bytes=1_000_000, backup_count=3,
+                 queue_size=10_000, batch_size=256, flush_interval=0.5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._queue_size = queue_size
+        self._counter = 0
+        self._stop = threading.Event()
+        self._stream = None
+        self.written = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+        self._thread.start()
+
+    # ---------- request thread ----------
+    def log(self, kind, inputs=None, output=None, error=None):
+        keep_every = 1
+        if error is None:
+            fill = self._queue.qsize() / self._queue_size
+            for level, every in SAMPLING_LEVELS:
+                if fill >= level:
+                    keep_every = every
+                    break
+            if keep_every > 1:
+                self._counter += 1
+                if self._counter % keep_every:
+                    self.sampled_out += 1
+                    return
+        try:
+            self._queue.put_nowait((time.time(), kind, inputs, output, error, 1.0 / keep_every))
+        except queue.Full:
+            self.dropped += 1
+
+    # ---------- writer thread ----------
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write("".join(self._format(item) for item in batch))
+                self.written += len(batch)
+            except OSError:
+                self.dropped += len(batch)
+        if self._stream is not None:
+            self._stream.close()
+
+    @staticmethod
+    def _format(item):
+        ts, kind, inputs, output, error, sample_rate = item
+        return json.dumps(
+            {"ts": ts, "kind": kind, "inputs": inputs, "output": output,
+             "error": error, "sample_rate": sample_rate},
+            separators=(",", ":"), default=str,
+        ) + "\n"
+
+    def _write(self, text):
+        if self._stream is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._stream = open(self.path, "a", encoding="utf-8")
+        if self.max_bytes and self._stream.tell() + len(text) > self.max_bytes:
+            self._rotate()
+        self._stream.write(text)
+        self._stream.flush()
+
+    def _rotate(self):
+        self._stream.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src, dst = f"{self.path}.{i}", f"{self.path}.{i + 1}"
+            if os.path.exists(src):
+                os.replace(src, dst)
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._stream = open(self.path, "w", encoding="utf-8")
+
+    # ---------- lifecycle ----------
+    def close(self, timeout=5.0):
+        """Flush everything still queued and stop the writer thread."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+        }
+
+
+# -------------------------------------------------
+# Process-wide writer
+# -------------------------------------------------
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+_worker_slot = None
+
+
+def set_worker_slot(slot):
+    """Name this process's files after a worker slot instead of its pid (gunicorn post_fork)."""
+    global _worker_slot
+    _worker_slot = slot
+
+
+def process_log_path(path=LOG_PATH):
+    """logs/predictions.jsonl -> logs/predictions.w<slot>.jsonl or logs/predictions.<pid>.jsonl"""
+    root, ext = os.path.splitext(path)
+    if _worker_slot is not None:
+        return f"{root}.w{_worker_slot}{ext}"
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def prune_stale_logs(path=LOG_PATH):
+    """Delete the pid-named files (and their rotations) of processes that are gone."""
+    root, ext = os.path.splitext(path)
+    name = re.escape(os.path.basename(root))
+    pattern = re.compile(name + r"\.(\d+)" + re.escape(ext) + r"(\.\d+)?$")
+    for file in glob.glob(f"{glob.escape(root)}.*{ext}*"):
+        match = pattern.match(os.path.basename(file))
+        if match and int(match.group(1)) != os.getpid() and not _pid_running(int(match.group(1))):
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+
+class ProcessRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler on this process's own file (process_log_path). The
+    name is resolved on the first record of every process, so a handler
+    created before a fork (a preloaded gunicorn app) still ends up with one
+    file per worker.
+    """
+
+    def __init__(self, path, **kwargs):
+        self._template = os.path.abspath(path)
+        self._pid = None
+        super().__init__(process_log_path(self._template), delay=True, **kwargs)
+
+    def emit(self, record):
+        if self._pid != os.getpid():  # called with the handler lock held
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self._pid = os.getpid()
+            self.baseFilename = process_log_path(self._template)
+            prune_stale_logs(self._template)
+        super().emit(record)
+
+
+def get_writer():
+    """
+    The writer for this process (created lazily, so each gunicorn worker gets
+    its own thread and its own file).
+    """
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                prune_stale_logs()
+                _writer = PredictionLogWriter(process_log_path())
+                _writer_pid = os.getpid()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def set_writer(writer):
+    """Replace the process writer (None restores the default), e.g. for benchmarks."""
+    global _writer, _writer_pid
+    _writer, _writer_pid = writer, os.getpid() if writer is not None else None
+
+
+def log(kind, inputs=None, output=None, error=None):
+    if LOG_ENABLED:
+        get_writer().log(kind, inputs, output, error)
+
+
+def stats():
+    if not LOG_ENABLED or _writer is None:
+        return {"enabled": LOG_ENABLED}
+    return {"enabled": True, **_writer.stats()}
@@ -3,12 +3,18 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 MODEL_DIR = os.path.join(BASE_DIR, "models")
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+LOG_DIR = os.path.join(BASE_DIR, "logs")
 
 RAINFALL_CSV = os.path.join(DATA_DIR, "rainfall.csv")
 CROP_CSV = os.path.join(DATA_DIR, "Crop_recommendation.csv")
 
 RAINFALL_MODEL_PATH = os.path.join(MODEL_DIR, "rainfall_model.pkl")
 CROP_MODEL_PATH = os.path.join(MODEL_DIR, "crop_model.pkl")
+# Named crop model versions, traffic split and shadow scoring (model_versions.py)
+CROP_VERSIONS_PATH = os.path.join(MODEL_DIR, "crop_versions.json")
+
+FORECAST_TABLE_PATH = os.path.join(MODEL_DIR, "rainfall_forecast.json")
 
 STATE_COL = "state"
 DIST_COL = "district"
@@ -39,3 +45,44 @@ CROP_FEATURE_COLS = [
 
 CROP_TARGET_COL = "label"
 
+RAIN_FEATURE_COLS = [MONTH_COL, "lag1", "lag2", "lag3"]
+
+# Prediction cache quantization, only with PREDICTION_CACHE_QUANTIZE=1 (the
+# default cache uses exact keys): inputs are bucketed to these step sizes
+# before lookup (0 = exact match) and results are reused within a bucket.
+CROP_CACHE_QUANTIZATION = {
+    "N": 1.0,
+    "P": 1.0,
+    "K": 1.0,
+    "temperature": 0.1,
+    "humidity": 0.5,
+    "ph": 0.01,
+    "rainfall": 1.0,
+}
+
+RAIN_CACHE_QUANTIZATION = {
+    MONTH_COL: 1.0,
+    "lag1": 0.5,
+    "lag2": 0.5,
+    "lag3": 0.5,
+}
+
+# Sample soil/weather scenarios: the Streamlit presets and the what-if preset
+# grids (whatif.PRESETS). Fields as in the /api/pipeline payload.
+SAMPLE_SCENARIOS = {
+    "high-rainfall-tropical": {
+        "label": "High rainfall – tropical",
+        "profile": {"month": 9, "lag1": 260.0, "lag2": 230.0, "lag3": 210.0, "N": 100.0,
+                    "P": 55.0, "K": 60.0, "temperature": 28.0, "humidity": 85.0, "pH": 6.4},
+    },
+    "dry-region-pulses": {
+        "label": "Dry region – pulses",
+        "profile": {"month": 2, "lag1": 40.0, "lag2": 35.0, "lag3": 20.0, "N": 40.0,
+                    "P": 20.0, "K": 30.0, "temperature": 22.0, "humidity": 50.0, "pH": 7.0},
+    },
+    "moderate-fruits": {
+        "label": "Moderate – fruits",
+        "profile": {"month": 6, "lag1": 120.0, "lag2": 90.0, "lag3": 60.0, "N": 70.0,
+                    "P": 45.0, "K": 50.0, "temperature": 26.0, "humidity": 65.0, "pH": 6.2},
+    },
+}
@@ -0,0 +1,146 @@
+"""
+Rainfall feature building shared by training, evaluation and the apps.
+
+Turns the IMD daily rainfall table into one row per (state, district, month)
+with the monthly total and the previous three months' totals (lag1-lag3).
+
+Lags are calendar months: lag k of month m is the district's total for
+month m-k. The dataset holds a single year, so for January-March they wrap
+around to the end of that year (December, November, ...). A lag month the
+district has no row for is NaN: training drops those rows, and the servers
+(lag_index, forecast_table) report the district as having no history. This
+is the only place the definition lives (lag_months).
+
+The CSV is parsed with explicit dtypes, the daily columns are summed as one
+float matrix and all lags are gathered from one (district, month) matrix.
+The resulting feature table is cached as an uncompressed .npz under
+project_config.CACHE_DIR, keyed on the source file's sha256, and memoised
+in-process, so reloads are a file read (or a dict lookup) instead of a parse.
+
+pandas is imported inside the functions that use it: importing this module
+(the API does, for lag_index / forecast_table) stays cheap.
+"""
+import os
+
+import numpy as np
+
+import project_config as cfg
+from model_registry import cached_checksum
+
+N_LAGS = 3
+LAG_COLS = [f"lag{k}" for k in range(1, N_LAGS + 1)]
+TABLE_COLS = [cfg.STATE_COL, cfg.DIST_COL, cfg.MONTH_COL, "total_rainfall"] + LAG_COLS
+# Bumped when the table's contents change, so stale .npz caches are not reused.
+TABLE_VERSION = 2
+
+_memo = {}  # sha256 -> feature table
+
+
+def lag_months(month):
+    """Zero-based month columns of lag1..lag3 for a target month 1-12 (int or int array)."""
+    return [(month - 1 - k) % 12 for k in range(1, N_LAGS + 1)]
+
+
+def load_rainfall_csv(path=cfg.RAINFALL_CSV):
+    import pandas as pd
+
+    dtypes = {cfg.STATE_COL: str, cfg.DIST_COL: str, cfg.MONTH_COL: np.int64}
+    try:
+        df = pd.read_csv(path, sep=";", dtype={**dtypes, **{c: np.float64 for c in cfg.DAILY_COLS}})
+    except ValueError:
+        # Non-numeric daily values: parse as text, build_feature_table coerces them to NaN.
+        df = pd.read_csv(path, sep=";", dtype=dtypes)
+    df.columns = df.columns.str.replace('"', "")
+    return df
+
+
+def build_feature_table(df):
+    """
+    One row per input row, sorted by (state, district, month), with
+    total_rainfall and lag1..lag3 (NaN where the district has no row for
+    that lag month).
+    """
+    import pandas as pd
+
+    daily_cols = [c for c in cfg.DAILY_COLS if c in df.columns]
+    daily = df[daily_cols]
+    if not all(np.issubdtype(t, np.floating) for t in daily.dtypes):
+        daily = daily.apply(pd.to_numeric, errors="coerce")
+
+    table = df[[cfg.STATE_COL, cfg.DIST_COL, cfg.MONTH_COL]].copy()
+    table["total_rainfall"] = np.nansum(daily.to_numpy(dtype=np.float64), axis=1)
+    table = table.sort_values([cfg.STATE_COL, cfg.DIST_COL, cfg.MONTH_COL], kind="stable")
+    table = table.reset_index(drop=True)
+
+    # (district, month) matrix of totals; each lag is one gather from it.
+    group = table.groupby([cfg.STATE_COL, cfg.DIST_COL], sort=False).ngroup().to_numpy()
+    month = table[cfg.MONTH_COL].to_numpy(dtype=np.int64)
+    total = table["total_rainfall"].to_numpy()
+    valid = (month >= 1) & (month <= 12)
+    monthly = np.full((group.max() + 1 if len(group) else 0, 12), np.nan)
+    monthly[group[valid], month[valid] - 1] = total[valid]
+    for col, lag_month in zip(LAG_COLS, lag_months(month)):
+        table[col] = np.where(valid, monthly[group, lag_month], np.nan)
+
+    return table
+
+
+# -------------------------------------------------
+# Columnar cache
+# -------------------------------------------------
+def _cache_path(sha256):
+    return os.path.join(cfg.CACHE_DIR, f"rain_features-v{TABLE_VERSION}-{sha256[:16]}.npz")
+
+
+def _save_table(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        **{c: table[c].to_numpy(dtype=str) for c in (cfg.STATE_COL, cfg.DIST_COL)},
+        **{c: table[c].to_numpy() for c in TABLE_COLS[2:]},
+    )
+    os.replace(tmp_path, path)
+
+
+def _load_table(path):
+    import pandas as pd
+
+    with np.load(path, allow_pickle=False) as npz:
+        return pd.DataFrame({c: npz[c] for c in TABLE_COLS})
+
+
+def feature_table(path=cfg.RAINFALL_CSV):
+    """Cached feature table for the given rainfall CSV."""
+    sha256 = cached_checksum(path)
+    table = _memo.get(sha256)
+    if table is not None:
+        return table
+
+    cache_path = _cache_path(sha256)
+    try:
+        table = _load_table(cache_path)
+    except (OSError, KeyError, ValueError):
+        table = build_feature_table(load_rainfall_csv(path))
+        try:
+            _save_table(table, cache_path)
+        except OSError:
+            pass  # read-only checkout: still works, just without the disk cache
+
+    _memo[sha256] = table
+    return table
+
+
+def prepare_rain_data(df=None):
+    """
+    Training/evaluation matrix: rows with all three lags present.
+
+    With no argument the cached table for project_config.RAINFALL_CSV is used.
+    """
+    table = feature_table() if df is None else build_feature_table(df)
+    rain = table.dropna(subset=LAG_COLS)
+
+    feature_cols = [cfg.MONTH_COL] + LAG_COLS
+    X = rain[feature_cols]
+    y = rain["total_rainfall"]
+    return X, y, feature_cols
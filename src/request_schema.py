@@ -0,0 +1,243 @@
+"""
+Compiled request schemas for the prediction endpoints.
+
+A schema is a fixed list of fields, each with an allowed range and, only
+for fields that are not model inputs, a default used when the key is
+missing, plus a row layout: the model's feature columns, each either a
+field name or an expression over the fields. A missing required field or
+a key the schema doesn't know is an error, so a typo or an empty body
+can't be scored on made-up inputs.
+RequestSchema compiles this once, at import time, into a specialised
+parse function (see RequestSchema.source) that validates every field
+inline and builds the float64 row in one step - no per-field function
+calls or broad exception handlers as with app_flask's old safe_float chain.
+
+Unlike safe_float, bad values are not replaced by defaults: every problem
+is reported per field and the request is rejected before any model work
+happens.
+
+Ranges follow the frontend form (frontend/src/routes/CropForm.schema.js);
+N, P and K are capped at 200.
+"""
+import keyword
+import sys
+
+import numpy as np
+
+# Largest finite float: "no upper bound" while still rejecting inf and huge ints
+UNBOUNDED = sys.float_info.max
+
+
+class _Missing:
+    """Value of a required field that is not in the payload (comparisons raise TypeError)."""
+
+
+_MISSING = _Missing()
+
+
+class RequestValidationError(ValueError):
+    """One or more fields are invalid; .errors maps field -> message."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{k}: {v}" for k, v in errors.items()))
+
+
+class Field:
+    """default=None: the field is required."""
+
+    def __init__(self, name, low=-UNBOUNDED, high=UNBOUNDED, integer=False, default=None):
+        if not name.isidentifier() or keyword.iskeyword(name):
+            raise ValueError(f"field name must be a Python identifier: {name!r}")
+        self.name = name
+        self.default = None if default is None else float(default)
+        self.low = float(low)
+        self.high = float(high)
+        self.integer = integer
+
+    def range_message(self):
+        kind = "an integer" if self.integer else "a number"
+        if self.high == UNBOUNDED:
+            return f"must be {kind} >= {self.low:g}"
+        return f"must be {kind} between {self.low:g} and {self.high:g}"
+
+
+def _literal(bound):
+    # int literals where possible: int-int comparisons are the cheapest
+    return repr(int(bound)) if bound.is_integer() and abs(bound) < 2 ** 53 else repr(bound)
+
+
+def _coerce(value):
+    """Numeric strings are accepted (like zod's z.coerce.number()); anything else is not."""
+    if value.__class__ is str:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None  # None, bool, list, dict, ...
+
+
+class RequestSchema:
+    """
+    fields: Field objects (all validated).
+    layout: one entry per output column - a field name or an expression
+            over field names, e.g. "(lag1 + lag2 + lag3) / 3.0".
+    """
+
+    def __init__(self, fields, layout):
+        self.fields = list(fields)
+        self.layout = list(layout)
+        self.width = len(self.layout)
+        self.source = self._generate()
+        self.names = frozenset(f.name for f in self.fields)
+        namespace = {"_coerce": _coerce, "_array": np.array, "_names": self.names,
+                     "_missing": _MISSING, "RequestValidationError": RequestValidationError}
+        exec(compile(self.source, f"<request_schema {self.layout}>", "exec"), namespace)
+        self._parse = namespace["parse"]
+
+    def _generate(self):
+        lines = ["def parse(data, out=None):",
+                 "    if type(data) is not dict:",
+                 "        raise RequestValidationError({'body': 'expected a JSON object'})",
+                 "    get = data.get",
+                 "    errors = {}",
+                 "    if not data.keys() <= _names:",
+                 "        for key in sorted(map(str, data.keys() - _names)):",
+                 "            errors[key] = 'unknown field'"]
+        for f in self.fields:
+            n = f.name
+            # Numbers take the fast path: one chained comparison (NaN fails it
+            # too). Anything else makes it raise TypeError, which costs nothing
+            # until it happens (3.11+), and is coerced or rejected there.
+            check = f"not ({_literal(f.low)} <= {n} <= {_literal(f.high)})"
+            if f.integer:
+                check += f" or {n} != int({n})"
+            default = "_missing" if f.default is None else repr(f.default)
+            lines += [
+                f"    {n} = get({n!r}, {default})",
+                "    try:",
+                f"        if {check}:",
+                f"            errors[{n!r}] = {f.range_message()!r}",
+                f"        elif {n} is True or {n} is False:",
+                f"            errors[{n!r}] = 'must be a number'",
+                "    except TypeError:",
+                f"        if {n} is _missing:",
+                f"            errors[{n!r}] = 'required'",
+                "        else:",
+                f"            {n} = _coerce({n})",
+                f"            if {n} is None:",
+                f"                errors[{n!r}] = 'must be a number'",
+                f"            elif {check}:",
+                f"                errors[{n!r}] = {f.range_message()!r}",
+            ]
+        lines += ["    if errors:",
+                  "        raise RequestValidationError(errors)",
+                  f"    row = ({', '.join(self.layout)},)",
+                  "    if out is None:",
+                  "        return _array((row,), float)",
+                  "    out[:] = row",
+                  "    return out"]
+        return "\n".join(lines) + "\n"
+
+    def parse(self, data, out=None):
+        """
+        Validate a JSON object into a (1, width) feature matrix, or into the
+        1-D row out (e.g. a row of a preallocated batch matrix) if given.
+
+        Raises RequestValidationError listing every bad field.
+        """
+        return self._parse(data, out)
+
+
+# -------------------------------------------------
+# Endpoint schemas
+# -------------------------------------------------
+MONTH_FIELD = Field("month", 1, 12, integer=True)
+LAG_FIELDS = [Field(f"lag{i}", 0) for i in (1, 2, 3)]
+
+RAIN_SCHEMA = RequestSchema(
+    [MONTH_FIELD, *LAG_FIELDS],
+    layout=["month", "lag1", "lag2", "lag3"],
+)
+
+CROP_FIELDS = [
+    MONTH_FIELD,
+    *LAG_FIELDS,
+    Field("N", 0, 200),
+    Field("P", 0, 200),
+    Field("K", 0, 200),
+    Field("temperature", -10, 60),
+    Field("humidity", 0, 100),
+    Field("pH", 0, 14),
+]
+
+# month is not a crop feature: optional here, validated when sent
+CROP_SCHEMA = RequestSchema(
+    [Field("month", 1, 12, integer=True, default=1), *CROP_FIELDS[1:]],
+    layout=["N", "P", "K", "temperature", "humidity", "pH", "(lag1 + lag2 + lag3) / 3.0"],
+)
+
+# same payload; rainfall comes from the rainfall model (ml_service.recommend_crop_pipeline_batch)
+PIPELINE_SCHEMA = RequestSchema(
+    CROP_FIELDS,
+    layout=["month", "lag1", "lag2", "lag3", "N", "P", "K", "temperature", "humidity", "pH"],
+)
+
+# just the month, for endpoints whose other fields are not numbers (rainfall by location)
+MONTH_SCHEMA = RequestSchema([MONTH_FIELD], layout=["month"])
+
+# the crop feature row itself, rainfall included (similar_fields lookups)
+CROP_FEATURE_SCHEMA = RequestSchema(
+    [*CROP_FIELDS[4:], Field("rainfall", 0)],
+    layout=["N", "P", "K", "temperature", "humidity", "pH", "rainfall"],
+)
+
+
+def parse_crop(data):
+    """(1, 7) crop feature matrix [N, P, K, temperature, humidity, pH, avg_rainfall]."""
+    return CROP_SCHEMA.parse(data)
+
+
+def parse_rain(data):
+    """(1, 4) rainfall feature matrix [month, lag1, lag2, lag3]."""
+    return RAIN_SCHEMA.parse(data)
+
+
+def parse_crop_features(data):
+    """(1, 7) crop feature matrix [N, P, K, temperature, humidity, pH, rainfall]."""
+    return CROP_FEATURE_SCHEMA.parse(data)
+
+
+def parse_month(data):
+    """The "month" of a JSON object as an int 1-12; its other keys are left to the caller."""
+    if type(data) is not dict:
+        raise RequestValidationError({"body": "expected a JSON object"})
+    return int(MONTH_SCHEMA.parse({"month": data["month"]} if "month" in data else {})[0, 0])
+
+
+def parse_pipeline(data):
+    """(1, 10) pipeline matrix [month, lag1, lag2, lag3, N, P, K, temperature, humidity, pH]."""
+    return PIPELINE_SCHEMA.parse(data)
+
+
+def parse_many(items, schema):
+    """
+    Validate a list of records into one preallocated (n_valid, schema.width) matrix.
+
+    items may contain pre-computed error strings (e.g. NDJSON lines that did
+    not parse). Returns (X, valid_idx, errors) with errors mapping input
+    position -> RequestValidationError or str.
+    """
+    X = np.empty((len(items), schema.width), dtype=np.float64)
+    valid_idx, errors = [], {}
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            errors[i] = item
+            continue
+        try:
+            schema.parse(item, out=X[len(valid_idx)])
+        except RequestValidationError as e:
+            errors[i] = e
+            continue
+        valid_idx.append(i)
+    return X[:len(valid_idx)], valid_idx, errors
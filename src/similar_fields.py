@@ -0,0 +1,101 @@
+"""
+"Similar fields": nearest historical rows of Crop_recommendation.csv.
+
+The CROP_FEATURE_COLS columns are standardized (z-scores with the
+dataset's mean and standard deviation, so a 10 kg/ha N difference and a
+0.1 pH difference are weighed by how much each varies) and put in a
+KD-tree (scipy.spatial.cKDTree) once. A query for k neighbours of one or
+many rows is then a single tree query instead of a pandas scan over the
+whole file. pandas and scipy are only imported when the index is first
+built, not when the API imports this module; warm_in_background() builds
+it at startup so that no request has to.
+
+Neighbour features are keyed like the request (request_schema's "pH",
+not the CSV's "ph"), so one API uses one spelling per feature.
+
+Python API:
+    index = get_field_index()
+    index.neighbours([[90, 42, 43, 20.8, 82, 6.5, 202.9]], k=5)
+"""
+import threading
+
+import numpy as np
+
+import project_config as cfg
+from model_registry import cached_checksum
+from request_schema import CROP_FEATURE_SCHEMA
+
+MAX_K = 50
+
+
+class FieldIndex:
+    def __init__(self, table):
+        from scipy.spatial import cKDTree
+
+        self.columns = list(cfg.CROP_FEATURE_COLS)
+        self.names = list(CROP_FEATURE_SCHEMA.layout)  # request keys, in column order
+        self.features = table[self.columns].to_numpy(dtype=np.float64)
+        self.labels = table[cfg.CROP_TARGET_COL].astype(str).to_numpy()
+
+        self.mean = self.features.mean(axis=0)
+        std = self.features.std(axis=0)
+        self.scale = np.where(std > 0, std, 1.0)
+        self._tree = cKDTree((self.features - self.mean) / self.scale)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def query(self, X, k=5):
+        """(distances, row indices), both (n_queries, k), closest first."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.columns))
+        k = max(1, min(k, MAX_K, len(self)))
+        distances, rows = self._tree.query((X - self.mean) / self.scale, k=k)
+        if k == 1:  # cKDTree drops the k axis for k=1
+            distances, rows = distances[:, np.newaxis], rows[:, np.newaxis]
+        return distances, rows
+
+    def neighbours(self, X, k=5):
+        """One list of neighbour dicts per query row: row, label, distance, features."""
+        distances, rows = self.query(X, k)
+        features = self.features[rows].tolist()  # (n, k, n_features)
+        labels = self.labels[rows].tolist()
+        return [
+            [
+                {"row": row, "label": label, "distance": round(dist, 4),
+                 "features": dict(zip(self.names, feats))}
+                for row, label, dist, feats in zip(r, l, d, f)
+            ]
+            for r, l, d, f in zip(rows.tolist(), labels, distances.tolist(), features)
+        ]
+
+
+# -------------------------------------------------
+# Process-wide index (rebuilt when Crop_recommendation.csv changes)
+# -------------------------------------------------
+_lock = threading.Lock()
+_current = {"sha256": None, "index": None}
+_warm_lock = threading.Lock()
+_warm_thread = None
+
+
+def get_field_index(path=cfg.CROP_CSV):
+    sha256 = cached_checksum(path)
+    if _current["sha256"] == sha256:
+        return _current["index"]
+    with _lock:
+        if _current["sha256"] != sha256:
+            import pandas as pd
+
+            _current["index"] = FieldIndex(pd.read_csv(path))
+            _current["sha256"] = sha256
+    return _current["index"]
+
+
+def warm_in_background():
+    """Build this process's index in a daemon thread, so the first request doesn't."""
+    global _warm_thread
+    with _warm_lock:
+        if _current["index"] is None and (_warm_thread is None or not _warm_thread.is_alive()):
+            _warm_thread = threading.Thread(target=get_field_index, name="field-index-warmup",
+                                            daemon=True)
+            _warm_thread.start()
@@ -0,0 +1,239 @@
+"""
+Train the rainfall and crop RandomForests and write versioned artifacts.
+
+Features come from project_config (RAINFALL_CSV via rain_features, CROP_CSV
+with CROP_FEATURE_COLS). Each model goes through a cross-validated grid
+search whose candidates x folds run in parallel worker processes
+(GridSearchCV n_jobs, joblib's loky backend), so wall-clock scales with
+the available cores; the winner is then refit on all rows with n_jobs
+threads.
+
+The grids only contain bounded trees (max_depth / min_samples_leaf /
+max_leaf_nodes), and among the candidates whose CV score is within a
+tolerance of the best (--crop-tolerance: accuracy, --rain-tolerance: MAE
+in mm), the most constrained parameter set is kept: smallest max_depth,
+then smallest max_leaf_nodes, then largest min_samples_leaf (the fitted
+leaf count is not compared). The served models stay small and fast to
+traverse.
+
+Every run writes, per model:
+    models/versions/<name>-<version>.pkl   uncompressed joblib dump (mmap-friendly)
+    models/versions/<name>-<version>.json  metadata: feature order, params, CV
+                                           score, library versions, timings, sizes
+and, unless --no-promote, atomically replaces models/<name>.pkl (which the
+running API hot-reloads) and writes models/<name>.meta.json.
+
+Usage (from src/):
+    python train_models.py                     # both models, all cores
+    python train_models.py --only crop --jobs 4
+    python train_models.py --quick --no-promote
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.model_selection import GridSearchCV, KFold, StratifiedKFold
+
+import project_config as cfg
+from model_registry import file_checksum
+from rain_features import prepare_rain_data
+
+RANDOM_STATE = 42
+
+# Candidate grids: every tree is depth- or leaf-bounded.
+GRIDS = {
+    "rainfall": {
+        "n_estimators": [100],
+        "max_depth": [12, 16, 20],
+        "min_samples_leaf": [1, 4, 16],
+        "max_features": [1.0, 0.5],
+    },
+    "crop": {
+        "n_estimators": [100],
+        "max_depth": [8, 12, 16],
+        "min_samples_leaf": [1, 2, 4],
+        "max_leaf_nodes": [64, 256, None],
+    },
+}
+QUICK_GRIDS = {
+    "rainfall": {"n_estimators": [50], "max_depth": [12, 16], "min_samples_leaf": [4]},
+    "crop": {"n_estimators": [50], "max_depth": [8, 12], "min_samples_leaf": [1]},
+}
+
+
+# -------------------------------------------------
+# Data
+# -------------------------------------------------
+def load_rainfall():
+    X, y, feature_cols = prepare_rain_data()
+    return X.to_numpy(dtype=float), y.to_numpy(dtype=float), feature_cols, cfg.RAINFALL_CSV
+
+
+def load_crop():
+    df = pd.read_csv(cfg.CROP_CSV)
+    X = df[cfg.CROP_FEATURE_COLS].to_numpy(dtype=float)
+    y = df[cfg.CROP_TARGET_COL].astype(str).to_numpy()
+    return X, y, list(cfg.CROP_FEATURE_COLS), cfg.CROP_CSV
+
+
+# -------------------------------------------------
+# Model selection
+# -------------------------------------------------
+def n_leaves(forest):
+    return int(sum(est.tree_.n_leaves for est in forest.estimators_))
+
+
+def smallest_within(tolerance):
+    """
+    GridSearchCV refit callable: among candidates scoring within `tolerance`
+    of the best mean CV score, pick the most constrained one (shallowest,
+    then largest leaves, then fewest leaf nodes).
+    """
+    def select(cv_results):
+        scores = np.asarray(cv_results["mean_test_score"])
+        ok = np.flatnonzero(scores >= scores.max() - tolerance)
+
+        def size_key(i):
+            params = cv_results["params"][i]
+            depth = params.get("max_depth") or np.inf
+            leaves = params.get("max_leaf_nodes") or np.inf
+            return (depth, leaves, -params.get("min_samples_leaf", 1), -scores[i])
+
+        return int(min(ok, key=size_key))
+
+    return select
+
+
+def search(name, X, y, grid, jobs, folds, tolerance):
+    if name == "crop":
+        estimator = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1)
+        cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+        scoring = "accuracy"
+    else:
+        estimator = RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=1)
+        cv = KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+        scoring = "neg_mean_absolute_error"
+
+    # One process per (candidate, fold); each fit is single-threaded so the
+    # processes don't oversubscribe the cores.
+    gs = GridSearchCV(estimator, grid, scoring=scoring, cv=cv, n_jobs=jobs,
+                      refit=False, return_train_score=False)
+    start = time.perf_counter()
+    gs.fit(X, y)
+    search_seconds = time.perf_counter() - start
+
+    best_index = smallest_within(tolerance)(gs.cv_results_)
+    params = gs.cv_results_["params"][best_index]
+
+    # Final fit on every row, trees built in parallel threads.
+    model = estimator.set_params(**params, n_jobs=jobs)
+    start = time.perf_counter()
+    model.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+    model.set_params(n_jobs=None)  # single-row serving is faster without a thread pool
+
+    scores = gs.cv_results_["mean_test_score"]
+    return model, {
+        "scoring": scoring,
+        "cv_folds": folds,
+        "cv_score": float(scores[best_index]),
+        "cv_score_std": float(gs.cv_results_["std_test_score"][best_index]),
+        "best_cv_score": float(scores.max()),
+        "tolerance": tolerance,
+        "candidates": len(scores),
+        "params": params,
+        "search_seconds": round(search_seconds, 2),
+        "fit_seconds": round(fit_seconds, 2),
+    }
+
+
+# -------------------------------------------------
+# Artifacts
+# -------------------------------------------------
+def write_artifacts(name, model, metadata, model_dir, promote):
+    versions_dir = os.path.join(model_dir, "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+    base = os.path.join(versions_dir, f"{name}-{metadata['version']}")
+
+    joblib.dump(model, base + ".pkl", compress=0)
+    metadata["file_bytes"] = os.path.getsize(base + ".pkl")
+    metadata["sha256"] = file_checksum(base + ".pkl")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    if promote:
+        served = os.path.join(model_dir, f"{name}.pkl")
+        tmp_path = served + ".tmp"
+        shutil.copyfile(base + ".pkl", tmp_path)
+        os.replace(tmp_path, served)  # atomic: the registry hot-reloads it
+        shutil.copyfile(base + ".json", os.path.join(model_dir, f"{name}.meta.json"))
+    return base + ".pkl"
+
+
+def train(name, args, version):
+    X, y, feature_cols, data_path = (load_crop if name == "crop" else load_rainfall)()
+    grid = (QUICK_GRIDS if args.quick else GRIDS)[name]
+
+    start = time.perf_counter()
+    model, selection = search(name, X, y, grid, args.jobs, args.folds, args.tolerance[name])
+    metadata = {
+        "name": f"{name}_model",
+        "version": version,
+        "model_type": type(model).__name__,
+        "feature_order": feature_cols,
+        "classes": [str(c) for c in getattr(model, "classes_", [])],
+        "n_rows": int(len(y)),
+        "data_path": os.path.relpath(data_path, cfg.BASE_DIR),
+        "data_sha256": file_checksum(data_path),
+        **selection,
+        "training_seconds": round(time.perf_counter() - start, 2),
+        "n_jobs": args.jobs,
+        "cpu_count": os.cpu_count(),
+        "n_nodes": int(sum(est.tree_.node_count for est in model.estimators_)),
+        "n_leaves": n_leaves(model),
+        "max_depth": int(max(est.tree_.max_depth for est in model.estimators_)),
+        "sklearn_version": sklearn.__version__,
+        "numpy_version": np.__version__,
+        "python_version": platform.python_version(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    path = write_artifacts(f"{name}_model", model, metadata, args.model_dir, not args.no_promote)
+    return path, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the rainfall and crop models.")
+    parser.add_argument("--only", choices=["rainfall", "crop"], help="train just one model")
+    parser.add_argument("--jobs", type=int, default=-1, help="worker processes (-1 = all cores)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="tiny grid, for smoke tests")
+    parser.add_argument("--model-dir", default=cfg.MODEL_DIR)
+    parser.add_argument("--no-promote", action="store_true",
+                        help="only write models/versions/, leave the served models alone")
+    parser.add_argument("--crop-tolerance", type=float, default=0.005,
+                        help="accuracy a smaller crop model may give up (default 0.005)")
+    parser.add_argument("--rain-tolerance", type=float, default=0.5,
+                        help="MAE in mm a smaller rainfall model may give up (default 0.5)")
+    args = parser.parse_args()
+    args.tolerance = {"crop": args.crop_tolerance, "rainfall": args.rain_tolerance}
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    for name in ([args.only] if args.only else ["rainfall", "crop"]):
+        path, meta = train(name, args, version)
+        print(f"{name}: {meta['scoring']} {meta['cv_score']:.4f} "
+              f"(best {meta['best_cv_score']:.4f}, {meta['candidates']} candidates), "
+              f"params {meta['params']}, {meta['n_nodes']} nodes, "
+              f"{meta['file_bytes'] / 1e6:.1f} MB, {meta['training_seconds']}s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
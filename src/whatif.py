@@ -0,0 +1,241 @@
+"""
+What-if sweeps: the crop recommendation over a grid of varied inputs.
+
+A sweep fixes a soil profile (the /api/pipeline payload: month, lag1-3,
+N, P, K, temperature, humidity, pH) and varies one or two of its fields
+over a grid. The whole grid is scored in one vectorized pass:
+
+    profile row, repeated per grid point, varied columns filled from meshgrid
+    -> rainfall model on the distinct [month, lag1, lag2, lag3] rows only
+    -> one crop predict_proba over every grid point
+
+and the full probability surface comes back, shape (*axis lengths, n_classes).
+Sweeps go straight to the models, not through the prediction caches, so a
+big grid does not evict the cached single predictions.
+
+Presets are common soil profiles whose dense month x temperature x humidity
+grid is materialized on first use and kept per process (rebuilt when either
+model is reloaded), so moving a slider is an array lookup (WhatIfGrid.select)
+instead of a model call.
+"""
+import threading
+
+import numpy as np
+
+import inference
+import project_config as cfg
+from model_registry import registry, CROP, RAINFALL
+from request_schema import PIPELINE_SCHEMA, RequestValidationError
+
+MAX_AXES = 2
+MAX_GRID_POINTS = 20_000
+DEFAULT_STEPS = 21
+
+FIELDS = {f.name: f for f in PIPELINE_SCHEMA.fields}
+COLUMNS = PIPELINE_SCHEMA.layout  # [month, lag1, lag2, lag3, N, P, K, temperature, humidity, pH]
+
+PRESETS = cfg.SAMPLE_SCENARIOS  # shared with the Streamlit sample scenarios
+
+# Slider resolution of the materialized preset grids (12 x 71 x 51 points).
+PRESET_AXES = {
+    "month": np.arange(1, 13, dtype=float),
+    "temperature": np.arange(-10.0, 60.5, 1.0),
+    "humidity": np.arange(0.0, 100.5, 2.0),
+}
+
+
+# -------------------------------------------------
+# Grids
+# -------------------------------------------------
+class WhatIfGrid:
+    """
+    axes:     list of (field name, 1-D values)
+    proba:    (*axis lengths, n_classes) crop probabilities
+    rainfall: (*axis lengths,) predicted rainfall fed to the crop model
+    """
+
+    def __init__(self, profile, axes, classes, proba, rainfall):
+        self.profile = profile
+        self.axes = axes
+        self.classes = np.asarray(classes)
+        self.proba = proba
+        self.rainfall = rainfall
+
+    @property
+    def n_points(self):
+        return int(self.rainfall.size)
+
+    def select(self, point):
+        """
+        Nearest grid cell for each field given in point; the other axes are
+        kept. Returns a smaller WhatIfGrid, or a single-result dict once
+        every axis is fixed.
+        """
+        errors = {}
+        index, axes, profile = [], [], dict(self.profile)
+        for name, values in self.axes:
+            if name not in point:
+                index.append(slice(None))
+                axes.append((name, values))
+                continue
+            value = point[name]
+            field = FIELDS[name]
+            if not isinstance(value, (int, float)) or not field.low <= value <= field.high:
+                errors[name] = field.range_message()
+                continue
+            i = int(np.abs(values - value).argmin())
+            index.append(i)
+            profile[name] = float(values[i])
+        if errors:
+            raise RequestValidationError(errors)
+
+        index = tuple(index)
+        if axes:
+            return WhatIfGrid(profile, axes, self.classes, self.proba[index], self.rainfall[index])
+
+        proba = np.round(np.asarray(self.proba[index], dtype=float), 6)  # float32 presets
+        top = inference.top_k_indices(proba[np.newaxis], 3)[0]
+        return {
+            "grid_point": {name: profile[name] for name, _ in self.axes},
+            "rainfall": float(self.rainfall[index]),
+            "crop": str(self.classes[top[0]]),
+            "confidence": float(proba[top[0]]),
+            "top3": [str(self.classes[j]) for j in top],
+            "top3_probs": [float(proba[j]) for j in top],
+        }
+
+    def to_dict(self, decimals=4):
+        best = self.proba.argmax(axis=-1)
+        return {
+            "profile": self.profile,
+            # a list: the order of the axes is the order of the array dimensions
+            "axes": [{"name": name, "values": values.tolist()} for name, values in self.axes],
+            "classes": [str(c) for c in self.classes],
+            "crop": self.classes.astype(str)[best].tolist(),
+            "confidence": np.round(self.proba.max(axis=-1), decimals).tolist(),
+            "rainfall": np.round(self.rainfall, 2).tolist(),
+            "proba": np.round(self.proba, decimals).tolist(),
+        }
+
+
+def evaluate(profile, axes, rain_model, crop_model, dtype=np.float64):
+    """Score every point of the axes grid around a validated profile dict."""
+    row = PIPELINE_SCHEMA.parse(profile)  # (1, 10) in COLUMNS order
+    grids = np.meshgrid(*[values for _, values in axes], indexing="ij")
+    shape = grids[0].shape
+
+    X = np.repeat(row, grids[0].size, axis=0)
+    for (name, _), grid in zip(axes, grids):
+        X[:, COLUMNS.index(name)] = grid.ravel()
+
+    # Rainfall only depends on month and lags: predict each distinct row once.
+    rain_rows, inverse = np.unique(X[:, :4], axis=0, return_inverse=True)
+    rainfall = inference.predict_rainfall_batch(rain_model, rain_rows)[inverse.ravel()]
+
+    X_crop = np.column_stack([X[:, 4:], rainfall])  # N, P, K, T, H, pH, rainfall
+    proba = crop_model.predict_proba(X_crop).astype(dtype, copy=False)
+    return WhatIfGrid(profile, axes, crop_model.classes_,
+                      proba.reshape(*shape, -1), rainfall.reshape(shape))
+
+
+# -------------------------------------------------
+# Ad-hoc sweeps (POST /api/whatif)
+# -------------------------------------------------
+def axis_values(name, spec):
+    """Grid values for one field: a list, or {"min", "max", "steps"}."""
+    if name not in FIELDS:
+        raise RequestValidationError({name: f"cannot vary; expected one of {', '.join(FIELDS)}"})
+    field = FIELDS[name]
+    # Check the size first: nothing is allocated for an oversized axis.
+    if isinstance(spec, dict):
+        steps = spec.get("steps", DEFAULT_STEPS)
+        if isinstance(steps, bool) or not isinstance(steps, int) or not 1 <= steps <= MAX_GRID_POINTS:
+            raise RequestValidationError({name: f"steps must be an integer in 1..{MAX_GRID_POINTS}"})
+    elif isinstance(spec, list) and len(spec) > MAX_GRID_POINTS:
+        raise RequestValidationError({name: f"at most {MAX_GRID_POINTS} values"})
+    try:
+        if isinstance(spec, dict):
+            low, high = float(spec["min"]), float(spec["max"])
+            if high < low:
+                raise ValueError
+            values = np.linspace(low, high, steps)
+        elif isinstance(spec, list) and spec:
+            values = np.asarray(spec, dtype=float)
+        else:
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        raise RequestValidationError(
+            {name: "expected a list of values or {min, max, steps} with min <= max"})
+
+    if field.integer:
+        values = np.round(values)
+    values = np.unique(values)
+    if not (np.all(np.isfinite(values)) and field.low <= values[0] and values[-1] <= field.high):
+        raise RequestValidationError({name: field.range_message()})
+    return values
+
+
+def sweep(data, rain_model, crop_model):
+    """
+    data: {"profile": {...pipeline payload...},
+           "vary": {"temperature": {"min": 10, "max": 40, "steps": 31}, "humidity": [40, 60, 80]}}
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("vary"), dict):
+        raise RequestValidationError({"vary": "expected an object of field -> values"})
+    profile = data.get("profile")
+    if not isinstance(profile, dict):
+        raise RequestValidationError({"profile": "expected an object with the /api/pipeline fields"})
+    if not 1 <= len(data["vary"]) <= MAX_AXES:
+        raise RequestValidationError({"vary": f"vary 1 to {MAX_AXES} fields"})
+
+    PIPELINE_SCHEMA.parse(profile)  # reject a bad profile before building the grid
+    axes = [(name, axis_values(name, spec)) for name, spec in data["vary"].items()]
+    n_points = int(np.prod([len(values) for _, values in axes]))
+    if n_points > MAX_GRID_POINTS:
+        raise RequestValidationError({"vary": f"grid too large ({n_points} > {MAX_GRID_POINTS} points)"})
+    return evaluate(profile, axes, rain_model, crop_model)
+
+
+# -------------------------------------------------
+# Preset grids (materialized once per model version)
+# -------------------------------------------------
+_preset_grids = {}  # name -> ((rainfall version, crop version), WhatIfGrid)
+_preset_lock = threading.Lock()
+# One build lock per preset: a ~1 s grid build only holds up requests for
+# that same preset, never the other presets or preset_stats().
+_build_locks = {name: threading.Lock() for name in PRESETS}
+
+
+def preset_grid(name):
+    """
+    The dense grid of a preset, built on first use and after a model reload.
+
+    Models and versions come from one registry read each, so a grid is never
+    tagged with a version newer than the models it was built with. Raises
+    model_registry.ModelUnavailableError if a model cannot be loaded.
+    """
+    rain_model, rain_version = registry.get_versioned(RAINFALL)
+    crop_model, crop_version = registry.get_versioned(CROP)
+    versions = (rain_version, crop_version)
+    cached = _preset_grids.get(name)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+    with _build_locks[name]:
+        cached = _preset_grids.get(name)
+        if cached is None or cached[0] != versions:
+            axes = list(PRESET_AXES.items())
+            # float32 halves the resident size; values are rounded for JSON anyway
+            grid = evaluate(PRESETS[name]["profile"], axes, rain_model, crop_model, np.float32)
+            cached = (versions, grid)
+            with _preset_lock:
+                _preset_grids[name] = cached
+    return cached[1]
+
+
+def preset_stats():
+    with _preset_lock:
+        return {
+            name: {"points": grid.n_points, "bytes": int(grid.proba.nbytes + grid.rainfall.nbytes),
+                   "model_versions": list(versions)}
+            for name, (versions, grid) in _preset_grids.items()
+        }